@@ -11,15 +11,307 @@
 
 
 import tkinter as tk
-from tkinter import messagebox, simpledialog, filedialog
+from tkinter import messagebox, simpledialog, filedialog, ttk
 import os
-import json
-import shutil
 import platform
 import subprocess
+import bisect
+import queue
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from narrative_guru import instrument
+
+from narrative_guru.storage import (
+    RESOURCE_TYPES, create_project, is_packed_project, open_resource_store,
+    pack_project, unpack_project, recover_project, recover_packed_project, recover_workspace,
+    remove_tree, list_projects, write_text_file, ConflictError, content_version, check_resource_name,
+)
+from narrative_guru.search import SearchIndex
+from narrative_guru.remix import HEADER_FORMATS, format_remix_block, iter_remix_blocks, resolve_header_format
+from narrative_guru.importer import DUPLICATE_POLICIES, import_resources
+from narrative_guru.export import export_format_for, export_project, export_resources
+from narrative_guru.tokens import TokenCounter, count_tokens, fit_to_budget
+from narrative_guru.watcher import ProjectWatcher
+from narrative_guru.client import RemoteWorkspace, server_from_environment
+from narrative_guru.history import diff_lines
+from narrative_guru.blobs import BlobStore, link_from_library, refresh_library_links
+from narrative_guru.bundles import BUNDLES_DIR_NAME, BundleCache
+from narrative_guru.relations import (
+    RelationIndex, expand_links, relation_items, relations_from_items, rename_references,
+)
 
 # NEW: Application Constants
 VERSION = "1.1.0"
+# Catalog rows inserted per event loop step when (re)filling a resource listbox
+CATALOG_FILL_CHUNK = 500
+# Delay in milliseconds between typing in a catalog filter and applying it
+CATALOG_FILTER_DELAY = 150
+# Background I/O: worker threads and how often (ms) the Tk thread collects their results
+IO_WORKER_THREADS = 4
+IO_POLL_INTERVAL = 20
+# Characters inserted into the Preview Window per event loop step, so a body of several MB never freezes the window
+PREVIEW_CHUNK_CHARS = 64 * 1024
+# Delay in milliseconds between editing the Remix Station by hand and recounting its tokens
+REMIX_RECOUNT_DELAY = 300
+# How often (ms) an open Diagnostics window refreshes its figures
+DIAGNOSTICS_REFRESH_INTERVAL = 1000
+# How often (ms) changes made to the workspace outside the app are collected from the watcher
+WATCH_DELIVERY_INTERVAL = 250
+# Delay in milliseconds before hovering over a catalog row shows the resource's summary
+HOVER_DELAY = 600
+EXPORT_FILE_TYPES = [("Text Files", "*.txt"), ("Markdown Files", "*.md"), ("JSON Lines Files", "*.jsonl"),
+                     ("Zip Archives", "*.zip"), ("All Files", "*.*")]
+
+
+class CatalogList:
+    """
+    Keeps a resource listbox in sync with a sorted list of names.
+
+    Filling happens in chunks from the Tk event loop, so a huge catalog never
+    blocks the window, and single names are inserted, removed or renamed in
+    sorted position instead of rebuilding the whole list. A filter text limits
+    the rows to names containing it.
+    """
+
+    def __init__(self, listbox):
+        self.listbox = listbox
+        self.names = []  # every name of the category, sorted
+        self.visible = []  # the names passing the filter, sorted
+        self.filter_text = ""
+        self._filled = 0  # how many of the visible names are already in the listbox
+        self._fill_job = None
+        self._filter_job = None
+        listbox.bind("<Destroy>", self._cancel_jobs, add="+")
+
+    def _cancel_jobs(self, event=None):
+        """Stops pending fill and filter steps, e.g. when the listbox goes away."""
+        for job in (self._fill_job, self._filter_job):
+            if job is not None:
+                self.listbox.after_cancel(job)
+        self._fill_job = self._filter_job = None
+
+    def reset(self):
+        """Empties the catalog and its filter, e.g. before showing another project."""
+        self._cancel_jobs()
+        self.names = []
+        self.visible = []
+        self.filter_text = ""
+        self._filled = 0
+        self.listbox.delete(0, tk.END)
+
+    def set_names(self, names):
+        """Replaces the whole catalog."""
+        self.names = list(names)
+        self._refill()
+
+    def set_filter(self, text):
+        """Shows only the names containing the given text (case insensitive)."""
+        self._filter_job = None
+        text = text.strip().lower()
+        if text != self.filter_text:
+            self.filter_text = text
+            self._refill()
+
+    def schedule_filter(self, text):
+        """Applies a filter once typing pauses."""
+        if self._filter_job is not None:
+            self.listbox.after_cancel(self._filter_job)
+        self._filter_job = self.listbox.after(CATALOG_FILTER_DELAY, lambda: self.set_filter(text))
+
+    def _matches(self, name):
+        return self.filter_text in name.lower()
+
+    def _refill(self):
+        """Restarts filling the listbox from the current names and filter."""
+        if self._fill_job is not None:
+            self.listbox.after_cancel(self._fill_job)
+            self._fill_job = None
+        if self.filter_text:
+            self.visible = [name for name in self.names if self._matches(name)]
+        else:
+            self.visible = list(self.names)
+        self.listbox.delete(0, tk.END)
+        self._filled = 0
+        self._fill_step()
+
+    def _fill_step(self):
+        """Inserts the next chunk of rows and schedules the following one."""
+        self._fill_job = None
+        chunk = self.visible[self._filled:self._filled + CATALOG_FILL_CHUNK]
+        if chunk:
+            with instrument.timed("ui.catalog_fill"):
+                self.listbox.insert(tk.END, *chunk)
+            self._filled += len(chunk)
+        if self._filled < len(self.visible):
+            self._fill_job = self.listbox.after(1, self._fill_step)
+
+    def insert(self, name):
+        """Adds a single name in sorted position."""
+        if name in self.names:
+            return
+        bisect.insort(self.names, name)
+        if self._matches(name):
+            index = bisect.bisect_left(self.visible, name)
+            self.visible.insert(index, name)
+            # Rows beyond the filled part will be added by the pending fill
+            if index < self._filled:
+                self.listbox.insert(index, name)
+                self._filled += 1
+            elif index == self._filled and self._fill_job is None:
+                self.listbox.insert(tk.END, name)
+                self._filled += 1
+
+    def remove(self, name):
+        """Removes a single name."""
+        index = bisect.bisect_left(self.names, name)
+        if index == len(self.names) or self.names[index] != name:
+            return
+        del self.names[index]
+        index = bisect.bisect_left(self.visible, name)
+        if index < len(self.visible) and self.visible[index] == name:
+            del self.visible[index]
+            if index < self._filled:
+                self.listbox.delete(index)
+                self._filled -= 1
+
+    def rename(self, old_name, new_name):
+        """Moves a renamed entry to its new sorted position."""
+        self.remove(old_name)
+        self.insert(new_name)
+
+    def select(self, name):
+        """Selects and shows a name if it is currently listed."""
+        index = bisect.bisect_left(self.visible, name)
+        if index < len(self.visible) and self.visible[index] == name:
+            # Make sure the row exists before selecting it
+            if index >= self._filled:
+                self.listbox.insert(tk.END, *self.visible[self._filled:index + 1])
+                self._filled = index + 1
+            self.listbox.selection_clear(0, tk.END)
+            self.listbox.selection_set(index)
+            self.listbox.see(index)
+            return True
+        return False
+
+
+class IOWorker:
+    """
+    Runs blocking file operations off the Tk thread.
+
+    Results are handed back to the Tk thread by polling a queue with root.after,
+    since Tk must only be touched from the thread running the mainloop. Jobs
+    submitted with a key supersede earlier jobs with the same key: a superseded
+    job is skipped if it has not started, and its result is dropped otherwise,
+    so e.g. scrolling through a catalog only loads the resource it stops on.
+    Jobs submitted as serial run one at a time in submission order, which keeps
+    writes and Remix Station appends in the order the user made them.
+    """
+
+    def __init__(self, root, max_workers=IO_WORKER_THREADS):
+        self.root = root
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="narrative-guru-io")
+        self._serial = ThreadPoolExecutor(max_workers=1, thread_name_prefix="narrative-guru-io-serial")
+        self._results = queue.Queue()
+        self._latest = {}  # key -> generation of the newest job with that key
+        self._generations = itertools.count(1)
+        self._pending = 0
+        self._poll_job = None
+
+    def submit(self, func, *args, on_done=None, on_error=None, on_progress=None, key=None, serial=False):
+        """
+        Runs func(*args) in the background.
+
+        on_done(result) or on_error(exception) is then called on the Tk thread.
+        If on_progress is given, func also receives a 'progress' keyword argument
+        it can call with any arguments; they are passed on to on_progress.
+        """
+        if instrument.enabled:
+            func, on_done, on_error = self._instrumented(func, on_done, on_error)
+        generation = next(self._generations)
+        if key is not None:
+            self._latest[key] = generation
+        self._pending += 1
+        executor = self._serial if serial else self._pool
+        executor.submit(self._run, func, args, on_done, on_error, on_progress, key, generation)
+        if self._poll_job is None:
+            self._poll_job = self.root.after(IO_POLL_INTERVAL, self._poll)
+
+    @staticmethod
+    def _instrumented(func, on_done, on_error):
+        """Wraps a job and its callbacks to record queueing, background and Tk thread time."""
+        name = getattr(func, "__qualname__", "job").replace("<locals>.", "")
+        submitted = time.perf_counter()
+
+        def job(*args, **kwargs):
+            instrument.record("io.wait", time.perf_counter() - submitted)
+            with instrument.timed(f"io.{name}"):
+                return func(*args, **kwargs)
+
+        def timed_callback(callback):
+            if callback is None:
+                return None
+
+            def run(value):
+                with instrument.timed(f"ui.{name}"):
+                    callback(value)
+            return run
+
+        return job, timed_callback(on_done), timed_callback(on_error)
+
+    def _is_current(self, key, generation):
+        return key is None or self._latest.get(key) == generation
+
+    def _run(self, func, args, on_done, on_error, on_progress, key, generation):
+        """Worker thread side: runs a job and queues its outcome."""
+        if not self._is_current(key, generation):
+            self._results.put((None, None, key, generation))
+            return
+        kwargs = {}
+        if on_progress is not None:
+            kwargs["progress"] = lambda *values: self._results.put(("progress", (on_progress, values), key, generation))
+        try:
+            self._results.put(("done", (on_done, func(*args, **kwargs)), key, generation))
+        except Exception as e:
+            self._results.put(("error", (on_error, e), key, generation))
+
+    def _poll(self):
+        """Tk thread side: delivers the queued outcomes."""
+        self._poll_job = None
+        try:
+            while True:
+                try:
+                    kind, payload, key, generation = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                current = self._is_current(key, generation)
+                if kind == "progress":
+                    if current:
+                        callback, values = payload
+                        callback(*values)
+                    continue
+
+                self._pending -= 1
+                if not current or kind is None:
+                    continue
+                if key is not None:
+                    del self._latest[key]
+                callback, value = payload
+                if callback is not None:
+                    callback(value)
+                elif kind == "error":
+                    messagebox.showerror("Error", str(value))
+        finally:
+            # Keep polling even if a callback failed, other jobs are still waiting
+            if self._pending > 0 and self._poll_job is None:
+                self._poll_job = self.root.after(IO_POLL_INTERVAL, self._poll)
+
+    def shutdown(self):
+        """Waits for running jobs, so writes in progress are not cut short on exit."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._serial.shutdown(wait=True)
+
 
 class NarrativeGuruApp:
     def __init__(self, root):
@@ -43,28 +335,296 @@ class NarrativeGuruApp:
         # Define application state variables
         self.current_project = None
         self.project_path = "NarrativeGuru"
+        self.server = None  # RemoteWorkspace when the projects come from a server instead of project_path
         self.resource_type = None
+        self.store = None  # ResourceStore of the open project
+        self.selected_resource = None  # (resource_type, name) shown in the Preview Window
+        self.preview_version = None  # content_version() of the resource as loaded, checked when saving
+        self.preview_diff = False  # True while the Preview Window shows a read-only diff against a revision
+        self.preview_load_job = None  # next step of a long body being inserted into the Preview Window
+        self.history_window = None
+        self.search_index = None  # SearchIndex of the open project, built on the first search
+        self.search_changes = None  # changes made while the search index is being built
+        self.relation_index = None  # RelationIndex of the open project, built in the background when it opens
+        self.relation_changes = None  # changes made while the relation index is being built
+        self.bundles = None  # BundleCache of the open project's remix templates
+        self.pending_search = None
+        self.search_window = None
+        self.diagnostics_window = None
+        self.details_window = None
+        # Summary popup of the catalog row under the mouse
+        self.hover_job = None
+        self.hover_resource = None
+        self.hover_tip = None
+
+        # Both screens are built once, on first use, and then reused for every project
+        self.welcome_frame = None
+        self.project_frame = None
+        self.current_screen = None
+        # Resources appended to the Remix Station, in order; None once its text was edited by hand
+        self.remix_items = []
+        # Size of the Remix Station, updated per append, and the token budget it was last fitted to
+        self.remix_counter = TokenCounter()
+        self.remix_budget = None
+        self.remix_recount_job = None
+        # How the Remix Station introduces each resource: the preset name or format shown, and its format string
+        self.remix_header_name = "dashes"
+        self.remix_header_format = resolve_header_format(self.remix_header_name)
+
+        # Diagnostics menu; it stays in place across screens
+        self.menubar = tk.Menu(self.root)
+        diagnostics_menu = tk.Menu(self.menubar, tearoff=0)
+        self.record_timings_var = tk.BooleanVar(value=instrument.enabled)
+        diagnostics_menu.add_checkbutton(label="Record Timings", variable=self.record_timings_var,
+                                         command=lambda: instrument.enable(self.record_timings_var.get()))
+        diagnostics_menu.add_command(label="Show Diagnostics...", command=self.show_diagnostics_window)
+        diagnostics_menu.add_command(label="Save Diagnostics...", command=self.save_diagnostics)
+        self.menubar.add_cascade(label="Diagnostics", menu=diagnostics_menu)
+        self.root.config(menu=self.menubar)
+
+        # Disk access runs in the background; results come back through the Tk event loop
+        self.io = IOWorker(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Projects may be served by another machine (python -m narrative_guru serve)
+        server = server_from_environment()
+        if server is not None:
+            try:
+                self.server = RemoteWorkspace(*server)
+                self.root.title(f"NarrativeGuru v{VERSION} - {self.server.url}")
+            except ValueError as e:
+                messagebox.showerror("Error", f"{e}\nUsing the local projects instead.")
+
+        self.watcher = None
+        if self.server is None:
+            # Create the main directory for projects if it doesn't exist
+            os.makedirs(self.project_path, exist_ok=True)
 
-        # Create the main directory for projects if it doesn't exist
-        os.makedirs(self.project_path, exist_ok=True)
+            # Projects in shared folders change under us; the watcher reports what changed
+            self.watcher = ProjectWatcher(self.project_path)
+            self.watcher.start()
+            self.root.after(WATCH_DELIVERY_INTERVAL, self.apply_watch_events)
+
+            # Workspace-wide actions on the local project folders
+            workspace_menu = tk.Menu(self.menubar, tearoff=0)
+            workspace_menu.add_command(label="Share Identical Resources", command=self.share_identical_resources)
+            self.menubar.add_cascade(label="Workspace", menu=workspace_menu)
+
+            # Repair anything a crash or power loss interrupted last time; runs ahead of any new write
+            self.io.submit(recover_workspace, self.project_path, serial=True,
+                           on_done=self.report_repairs, on_error=self.io_error("Recovery check failed"))
 
         # Show the welcome screen first
         self.show_welcome_screen()
 
-    def clear_frame(self):
-        """Clears all widgets from the current frame."""
-        for widget in self.root.winfo_children():
-            widget.destroy()
+    def on_close(self):
+        """Lets pending writes finish before the window closes."""
+        self.root.config(cursor="watch")
+        self.close_store()
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.io.shutdown()
+        if self.server is not None:
+            self.server.close()
+        if instrument.dump_path():
+            try:
+                write_text_file(instrument.dump_path(), instrument.to_json())
+            except OSError:
+                pass  # Diagnostics must never keep the app from closing
+        self.root.destroy()
 
-    def show_welcome_screen(self):
-        """Builds and displays the Welcome Screen."""
-        self.clear_frame()
-        # Reset geometry for welcome screen 
-        self.root.geometry("800x828") 
+    def io_error(self, message, store=None):
+        """
+        Returns an error callback for a background job that reports failures with the given message.
+
+        If a store is given, failures are ignored once that project has been closed.
+        """
+        def on_error(e):
+            if store is not None and self.store is not store:
+                return
+            if isinstance(e, FileExistsError):
+                messagebox.showerror("Error", str(e))
+            else:
+                messagebox.showerror("Error", f"{message}: {e}")
+        return on_error
+
+    def project_screen_is_showing(self, store):
+        """Checks that the project screen of the given store is still on display."""
+        return self.store is store and self.project_frame is not None and self.current_screen is self.project_frame
+
+    def report_repairs(self, repairs):
+        """Tells the user which resources were repaired by a recovery pass."""
+        if not repairs:
+            return
+        lines = [f"{os.path.relpath(path, self.project_path)}: {outcome}" for path, outcome in repairs[:15]]
+        if len(repairs) > 15:
+            lines.append(f"...and {len(repairs) - 15} more")
+        messagebox.showwarning("Recovered Resources",
+                               "Some resources were not saved completely last time and have been repaired:\n\n" + "\n".join(lines))
+
+    def check_project(self, project_name):
+        """Looks through every resource of a project for damaged or half-written files."""
+        project_dir = os.path.join(self.project_path, project_name)
+
+        def check():
+            return recover_project(project_dir) + recover_packed_project(project_dir)
+
+        def on_done(repairs):
+            if repairs:
+                self.report_repairs(repairs)
+            else:
+                messagebox.showinfo("Check Project", f"No damaged resources found in '{project_name}'.")
+
+        self.io.submit(check, serial=True, on_done=on_done, on_error=self.io_error("Failed to check project"))
+
+    def with_project_store(self, project_name, func):
+        """Returns a job running func(store, progress) on a project, with its open store if it is the open one."""
+        project_dir = self.project_location(project_name)
+        store = self.store if self.store is not None and self.store.project_dir == project_dir else None
+
+        def job(progress=None):
+            if store is not None:
+                return func(store, progress)
+            project_store = self.open_project_store(project_name)
+            try:
+                return func(project_store, progress)
+            finally:
+                project_store.close()
+        return job
+
+    def verify_manifest(self, project_name):
+        """Compares a project's manifest with its resource files and offers to rebuild it if they disagree."""
+        window, _ = self.show_progress_window("Verify Manifest", f"Checking '{project_name}'...")
+
+        def on_done(problems):
+            window.destroy()
+            if not problems:
+                messagebox.showinfo("Verify Manifest", f"The manifest of '{project_name}' matches its resources.")
+                return
+            lines = [f"{problem}: {resource_type}/{name}" for problem, resource_type, name in problems[:15]]
+            if len(problems) > 15:
+                lines.append(f"...and {len(problems) - 15} more")
+            if messagebox.askyesno("Verify Manifest", f"The manifest of '{project_name}' differs from its resources:"
+                                   "\n\n" + "\n".join(lines) + "\n\nRebuild the manifest now?"):
+                self.rebuild_manifest(project_name)
+
+        def on_error(e):
+            window.destroy()
+            messagebox.showerror("Error", f"Failed to verify the manifest: {e}")
+
+        self.io.submit(self.with_project_store(project_name, lambda store, progress: store.verify_manifest()),
+                       serial=True, on_done=on_done, on_error=on_error)
+
+    def rebuild_manifest(self, project_name):
+        """Writes a project's manifest anew from its resource files."""
+        window, progress_bar = self.show_progress_window("Rebuild Manifest", f"Reading '{project_name}'...")
 
+        def on_progress(done, total):
+            progress_bar.stop()
+            progress_bar.config(mode="determinate", maximum=total, value=done)
+
+        def on_done(count):
+            window.destroy()
+            messagebox.showinfo("Success", f"Manifest of '{project_name}' rebuilt from {count} resource(s).")
+
+        def on_error(e):
+            window.destroy()
+            messagebox.showerror("Error", f"Failed to rebuild the manifest: {e}")
+
+        self.io.submit(self.with_project_store(project_name, lambda store, progress: store.rebuild_manifest(progress)),
+                       serial=True, on_done=on_done, on_error=on_error, on_progress=on_progress)
+
+    def show_progress_window(self, title, text):
+        """Opens a small window with a progress bar and returns (window, progress bar)."""
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        window.transient(self.root)
+        frame = tk.Frame(window, padx=20, pady=20)
+        frame.pack()
+        tk.Label(frame, text=text).pack(pady=5)
+        progress_bar = ttk.Progressbar(frame, length=300, mode="indeterminate")
+        progress_bar.pack(pady=5)
+        progress_bar.start()
+        return window, progress_bar
+
+    def show_screen(self, screen, geometry):
+        """Puts one of the persistent screens on display in place of the other."""
+        if self.current_screen is not screen:
+            if self.current_screen is not None:
+                self.current_screen.pack_forget()
+            screen.pack(expand=True, fill="both")
+            self.current_screen = screen
+        self.root.geometry(geometry)
+        self.hide_hover()
+        # Search results and revision lists belong to the project that was on display
+        for window in (self.search_window, self.history_window, self.details_window):
+            if window is not None and window.winfo_exists():
+                window.destroy()
+
+    def record_widgets_created(self, screen):
+        """Counts the widgets a screen was built with, for the Diagnostics window."""
+        if instrument.enabled:
+            instrument.record("ui.widgets_created", count=count_widgets(screen))
+
+    def measure_redraw(self, name):
+        """Records the time until Tk has laid out and drawn a freshly built screen."""
+        if not instrument.enabled:
+            return
+        start = time.perf_counter()
+        self.root.after_idle(lambda: instrument.record(name, time.perf_counter() - start))
+
+    def show_diagnostics_window(self):
+        """Shows the recorded timings and counts, refreshed while the window is open."""
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+        window = self.diagnostics_window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+
+        status = tk.Label(window, anchor="w", padx=10)
+        status.pack(fill="x", pady=(10, 0))
+        columns = ("count", "total_ms", "mean_ms", "max_ms", "bytes")
+        tree = ttk.Treeview(window, columns=columns, height=20)
+        tree.heading("#0", text="Operation")
+        tree.column("#0", width=320)
+        for column, title in zip(columns, ("Calls", "Total ms", "Mean ms", "Max ms", "Bytes")):
+            tree.heading(column, text=title)
+            tree.column(column, width=90, anchor="e")
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        button_frame = tk.Frame(window)
+        button_frame.pack(pady=(0, 10))
+        tk.Button(button_frame, text="Reset", command=instrument.reset).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Save as JSON...", command=self.save_diagnostics).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Close", command=window.destroy).pack(side="left", padx=5)
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            if instrument.enabled:
+                status.config(text="Recording. Times include waiting for locks held by other jobs.")
+            else:
+                status.config(text=f"Not recording. Turn on Diagnostics > Record Timings, or start the app with {instrument.ENV_VAR}=1.")
+            tree.delete(*tree.get_children())
+            for row in instrument.snapshot():
+                tree.insert("", tk.END, text=row["name"], values=[f"{row[column]:,}" for column in columns])
+            window.after(DIAGNOSTICS_REFRESH_INTERVAL, refresh)
+
+        refresh()
+
+    def save_diagnostics(self):
+        """Saves the recorded timings and counts to a JSON file."""
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="narrative-guru-diagnostics.json",
+                                                 filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")])
+        if file_path:
+            self.io.submit(write_text_file, file_path, instrument.to_json(), serial=True,
+                           on_error=self.io_error("Failed to save diagnostics"))
+
+    @instrument.profiled("ui.build_welcome_screen")
+    def build_welcome_screen(self):
+        """Creates the widgets of the Welcome Screen. Done once; the screen is reused afterwards."""
         # Welcome screen title
-        welcome_frame = tk.Frame(self.root, padx=20, pady=20)
-        welcome_frame.pack(expand=True, fill="both")
+        welcome_frame = self.welcome_frame = tk.Frame(self.root, padx=20, pady=20)
 
         tk.Label(welcome_frame, text="NarrativeGuru", font=("Helvetica", 24, "bold")).pack(pady=5)
         
@@ -81,22 +641,40 @@ class NarrativeGuruApp:
         self.projects_listbox.bind("<<ListboxSelect>>", self.on_project_select)
         self.projects_listbox.bind("<Button-3>", self.show_project_context_menu)
         
-        # Populate the listbox with existing projects
-        self.populate_projects_list()
-        
         # Add new project button
         add_project_button = tk.Button(welcome_frame, text="Add New Project", command=self.show_new_project_window)
         add_project_button.pack(pady=10)
+        self.record_widgets_created(welcome_frame)
+
+    @instrument.profiled("ui.show_welcome_screen")
+    def show_welcome_screen(self):
+        """Displays the Welcome Screen."""
+        if self.welcome_frame is None:
+            self.build_welcome_screen()
+        # Reset geometry for welcome screen 
+        self.show_screen(self.welcome_frame, "800x828")
+
+        # Populate the listbox with existing projects
+        self.populate_projects_list()
+        self.measure_redraw("ui.redraw_welcome_screen")
 
     def populate_projects_list(self):
-        """Fills the projects listbox with the names of project folders."""
+        """Fills the projects listbox with the names of project folders (or of the server's projects)."""
+        def list_all():
+            if self.server is not None:
+                return self.server.list_projects()
+            return list_projects(self.project_path)
+
+        self.io.submit(list_all, key="projects", on_done=self.fill_projects_list,
+                       on_error=self.io_error("Could not read project directory"))
+
+    def fill_projects_list(self, projects):
+        """Shows the listed projects, unless the welcome screen has been left meanwhile."""
+        if self.current_screen is not self.welcome_frame:
+            return
         self.projects_listbox.delete(0, tk.END)
-        try:
-            projects = [d for d in os.listdir(self.project_path) if os.path.isdir(os.path.join(self.project_path, d))]
-            for project in sorted(projects):
-                self.projects_listbox.insert(tk.END, project)
-        except OSError as e:
-            messagebox.showerror("Error", f"Could not read project directory: {e}")
+        if projects:
+            self.projects_listbox.insert(tk.END, *projects)
 
     def on_project_select(self, event):
         """Handles a project selection from the listbox."""
@@ -125,9 +703,24 @@ class NarrativeGuruApp:
         project_name = self.projects_listbox.get(index)
         
         context_menu = tk.Menu(self.root, tearoff=0)
+        if self.server is not None:
+            # Renaming, deleting, converting and checking are done on the server's own machine
+            context_menu.add_command(label="Export...", command=lambda: self.export_project_to_file(project_name))
+            context_menu.post(event.x_root, event.y_root)
+            return
         # NEW: Add rename option
         context_menu.add_command(label="Rename", command=lambda: self.show_rename_modal(project_name, "project")) 
         context_menu.add_command(label="Delete", command=lambda: self.delete_project(event))
+        context_menu.add_command(label="Duplicate...", command=lambda: self.duplicate_project(project_name))
+        context_menu.add_separator()
+        if is_packed_project(os.path.join(self.project_path, project_name)):
+            context_menu.add_command(label="Convert to Folders", command=lambda: self.convert_project(project_name, packed=False))
+        else:
+            context_menu.add_command(label="Convert to Packed File", command=lambda: self.convert_project(project_name, packed=True))
+        context_menu.add_command(label="Check for Damaged Resources", command=lambda: self.check_project(project_name))
+        if not is_packed_project(os.path.join(self.project_path, project_name)):
+            context_menu.add_command(label="Verify Manifest", command=lambda: self.verify_manifest(project_name))
+        context_menu.add_command(label="Export...", command=lambda: self.export_project_to_file(project_name))
         context_menu.post(event.x_root, event.y_root)
         
     def delete_project(self, event):
@@ -138,12 +731,144 @@ class NarrativeGuruApp:
             
             if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete the project '{project_to_delete}'?"):
                 project_dir = os.path.join(self.project_path, project_to_delete)
-                try:
-                    shutil.rmtree(project_dir)
+                self.close_store(project_dir)
+                window, progress_bar = self.show_progress_window("Deleting Project", f"Deleting '{project_to_delete}'...")
+
+                def on_progress(done, total):
+                    progress_bar.stop()
+                    progress_bar.config(mode="determinate", maximum=total, value=done)
+
+                def on_done(_):
+                    window.destroy()
                     messagebox.showinfo("Success", f"Project '{project_to_delete}' deleted.")
                     self.populate_projects_list()
-                except OSError as e:
+
+                def on_error(e):
+                    window.destroy()
                     messagebox.showerror("Error", f"Failed to delete project: {e}")
+                    self.populate_projects_list()
+
+                self.io.submit(remove_tree, project_dir, serial=True,
+                               on_done=on_done, on_error=on_error, on_progress=on_progress)
+
+    def duplicate_project(self, project_name):
+        """Copies a project under a new name; its resource files are shared with the original until edited."""
+        new_name = simpledialog.askstring("Duplicate Project", "Enter a name for the copy:",
+                                          initialvalue=f"{project_name} copy", parent=self.root)
+        if new_name is None:
+            return
+        new_name = new_name.strip()
+        try:
+            check_resource_name(new_name)
+        except OSError:
+            messagebox.showerror("Error", f"'{new_name}' cannot be used as a project name.")
+            return
+        window, progress_bar = self.show_progress_window("Duplicating Project", f"Copying '{project_name}'...")
+
+        def on_progress(done, total):
+            progress_bar.stop()
+            progress_bar.config(mode="determinate", maximum=total, value=done)
+
+        def on_done(_):
+            window.destroy()
+            messagebox.showinfo("Success", f"Project '{project_name}' copied to '{new_name}'.")
+            self.populate_projects_list()
+
+        def on_error(e):
+            window.destroy()
+            messagebox.showerror("Error", f"Failed to duplicate project: {e}")
+
+        self.io.submit(BlobStore(self.project_path).copy_project, os.path.join(self.project_path, project_name),
+                       os.path.join(self.project_path, new_name), serial=True,
+                       on_done=on_done, on_error=on_error, on_progress=on_progress)
+
+    def share_identical_resources(self):
+        """Stores identical resource files of all folder projects once, and drops blobs nothing uses any more."""
+        if not messagebox.askyesno("Share Identical Resources",
+                                   "Resources that are identical in several projects will be stored once. "
+                                   "Editing one in the app still changes it in that project only.\n\nContinue?"):
+            return
+        window, progress_bar = self.show_progress_window("Sharing Resources", "Looking for identical resources...")
+        blobs = BlobStore(self.project_path)
+
+        def share(progress):
+            project_dirs = [os.path.join(self.project_path, project) for project in list_projects(self.project_path)]
+            shared, saved = blobs.dedupe(project_dirs, progress=progress)
+            blobs.collect_garbage()
+            return shared, saved
+
+        def on_progress(done, total):
+            progress_bar.stop()
+            progress_bar.config(mode="determinate", maximum=total, value=done)
+
+        def on_done(result):
+            window.destroy()
+            shared, saved = result
+            messagebox.showinfo("Success", f"{shared} resource file(s) now shared, {saved / 1024 / 1024:.1f} MB saved.")
+
+        def on_error(e):
+            window.destroy()
+            messagebox.showerror("Error", f"Failed to share resources: {e}")
+
+        self.io.submit(share, serial=True, on_done=on_done, on_error=on_error, on_progress=on_progress)
+
+    def convert_project(self, project_name, packed):
+        """Converts a project between the folder layout and a single packed file."""
+        project_dir = os.path.join(self.project_path, project_name)
+        layout = "a single packed file" if packed else "one file per resource"
+        if not messagebox.askyesno("Confirm Convert", f"Convert the project '{project_name}' to {layout}?"):
+            return
+        self.close_store(project_dir)
+        window, _ = self.show_progress_window("Converting Project", f"Converting '{project_name}'...")
+
+        def on_done(_):
+            window.destroy()
+            messagebox.showinfo("Success", f"Project '{project_name}' converted to {layout}.")
+
+        def on_error(e):
+            window.destroy()
+            messagebox.showerror("Error", f"Failed to convert project: {e}")
+
+        self.io.submit(pack_project if packed else unpack_project, project_dir, serial=True,
+                       on_done=on_done, on_error=on_error)
+
+    def export_project_to_file(self, project_name):
+        """Streams every resource of a project into a text, Markdown, JSON Lines or zip file."""
+        file_path = filedialog.asksaveasfilename(defaultextension=".zip", filetypes=EXPORT_FILE_TYPES,
+                                                 initialfile=f"{project_name}.zip")
+        if not file_path:
+            return
+        window, progress_bar = self.show_progress_window("Exporting Project", f"Exporting '{project_name}'...")
+        export = self.with_project_store(project_name,
+                                         lambda store, progress: export_project(store, file_path, progress=progress))
+
+        def on_progress(done, total):
+            progress_bar.stop()
+            progress_bar.config(mode="determinate", maximum=total, value=done)
+
+        def on_done(count):
+            window.destroy()
+            messagebox.showinfo("Success", f"{count} resource(s) exported to '{os.path.basename(file_path)}'.")
+
+        def on_error(e):
+            window.destroy()
+            messagebox.showerror("Error", f"Failed to export project: {e}")
+
+        self.io.submit(export, serial=True, on_done=on_done, on_error=on_error, on_progress=on_progress)
+
+    def close_store(self, project_dir=None):
+        """Closes the open resource store, or only the one of the given project folder."""
+        if self.store is not None and (project_dir is None or self.store.project_dir == project_dir):
+            # Closed on the serial lane, after any write still queued for it
+            self.io.submit(self.store.close, serial=True)
+            if self.watcher is not None:
+                self.watcher.watch_project(None)
+            self.store = None
+            self.search_index = None
+            self.search_changes = None
+            self.relation_index = None
+            self.relation_changes = None
+            self.bundles = None
 
     def show_rename_modal(self, old_name, item_type, resource_type=None):
         """Displays a modal window for renaming a project or resource."""
@@ -189,13 +914,12 @@ class NarrativeGuruApp:
         old_dir = os.path.join(self.project_path, old_name)
         new_dir = os.path.join(self.project_path, new_name)
 
-        if os.path.exists(new_dir):
-            messagebox.showerror("Error", f"A project named '{new_name}' already exists.")
-            return
-            
-        try:
+        def rename():
+            if os.path.exists(new_dir):
+                raise FileExistsError(f"A project named '{new_name}' already exists.")
             os.rename(old_dir, new_dir)
-            
+
+        def on_done(_):
             # Update current project if it was the one being renamed
             if self.current_project == old_name:
                 self.current_project = new_name
@@ -205,8 +929,9 @@ class NarrativeGuruApp:
                 
             self.rename_window.destroy()
             messagebox.showinfo("Success", f"Project '{old_name}' renamed to '{new_name}'.")
-        except OSError as e:
-            messagebox.showerror("Error", f"Failed to rename project: {e}")
+
+        self.close_store(old_dir)
+        self.io.submit(rename, serial=True, on_done=on_done, on_error=self.io_error("Failed to rename project"))
 
     def rename_resource(self, old_name, new_name, resource_type):
         """Handles the renaming of a resource (file)."""
@@ -215,28 +940,43 @@ class NarrativeGuruApp:
             messagebox.showerror("Error", "New resource name cannot be empty.")
             return
 
-        old_file = os.path.join(self.project_path, self.current_project, resource_type, f"{old_name}.json")
-        new_file = os.path.join(self.project_path, self.current_project, resource_type, f"{new_name}.json")
-
         singular_type = "piece of clothing" if resource_type == "clothing" else resource_type.rstrip('s')
+        store = self.store
+        # Resources linking to this one are updated to the new name
+        sources = self.relation_index.backlinks(resource_type, old_name) if self.relation_index is not None else None
 
-        if os.path.exists(new_file):
-            messagebox.showerror("Error", f"A {singular_type} named '{new_name}' already exists.")
-            return
-            
-        try:
-            os.rename(old_file, new_file)
+        def rename():
+            # The store refuses an existing name itself, so no other writer can take it between check and rename
+            try:
+                store.rename(resource_type, old_name, new_name)
+            except FileExistsError as e:
+                raise FileExistsError(f"A {singular_type} named '{new_name}' already exists.") from e
+            linking = sources
+            if linking is None:
+                relation_index = RelationIndex(store)
+                relation_index.build()
+                linking = relation_index.backlinks(resource_type, old_name)
+            return rename_references(store, linking, resource_type, old_name, new_name)
+
+        def on_done(updated):
+            self.update_search_index(store, "rename", resource_type, old_name, new_name)
+            self.update_relation_index(store, "rename", resource_type, old_name, new_name)
+            for source, relations in updated:
+                self.update_relation_index(store, "set_links", *source, relations)
+            self.forget_remix_source(store, (resource_type, old_name))
+            if not self.project_screen_is_showing(store):
+                return
             
             # Clear preview/selection if the selected resource was renamed
-            if hasattr(self, 'selected_resource_path') and self.selected_resource_path == old_file:
-                del self.selected_resource_path
-                self.preview_text.delete("1.0", tk.END)
+            if self.selected_resource == (resource_type, old_name):
+                self.selected_resource = None
+                self.clear_preview()
                 
-            self.populate_resource_lists()
+            self.catalogs[resource_type].rename(old_name, new_name)
             self.rename_window.destroy()
             messagebox.showinfo("Success", f"{singular_type.capitalize()} '{old_name}' renamed to '{new_name}'.")
-        except OSError as e:
-            messagebox.showerror("Error", f"Failed to rename resource: {e}")
+
+        self.io.submit(rename, serial=True, on_done=on_done, on_error=self.io_error("Failed to rename resource"))
 
 
     def show_new_project_window(self):
@@ -250,6 +990,9 @@ class NarrativeGuruApp:
         tk.Label(frame, text="Enter a name for the new project:").pack(pady=5)
         self.new_project_name_entry = tk.Entry(frame, width=30)
         self.new_project_name_entry.pack(pady=5)
+
+        self.new_project_packed_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(frame, text="Pack resources into a single file", variable=self.new_project_packed_var).pack(pady=5)
         
         button_frame = tk.Frame(frame)
         button_frame.pack(pady=10)
@@ -264,39 +1007,114 @@ class NarrativeGuruApp:
             messagebox.showerror("Error", "Project name cannot be empty.")
             return
 
-        project_dir = os.path.join(self.project_path, project_name)
-        if os.path.exists(project_dir):
+        project_dir = self.project_location(project_name)
+        if self.server is None and os.path.exists(project_dir):
             messagebox.showerror("Error", f"A project named '{project_name}' already exists.")
             return
 
         try:
-            os.makedirs(os.path.join(project_dir, "characters"))
-            os.makedirs(os.path.join(project_dir, "locations"))
-            os.makedirs(os.path.join(project_dir, "props"))
-            os.makedirs(os.path.join(project_dir, "clothing"))
+            if self.server is not None:
+                self.server.create_project(project_name, packed=self.new_project_packed_var.get())
+            else:
+                create_project(project_dir, packed=self.new_project_packed_var.get())
             messagebox.showinfo("Success", f"Project '{project_name}' created.")
             self.new_project_window.destroy()
             self.current_project = project_name
             self.show_project_screen()
+        except FileExistsError as e:
+            messagebox.showerror("Error", str(e))
         except OSError as e:
             messagebox.showerror("Error", f"Failed to create project: {e}")
 
+    def project_location(self, project_name):
+        """Returns the folder of a project, or its address when the projects come from a server."""
+        if self.server is not None:
+            return self.server.project_location(project_name)
+        return os.path.join(self.project_path, project_name)
+
+    def open_project_store(self, project_name):
+        """Opens the resource store of a project, local or on the server."""
+        if self.server is not None:
+            return self.server.open_store(project_name)
+        return open_resource_store(self.project_location(project_name))
+
+    @instrument.profiled("ui.show_project_screen")
     def show_project_screen(self):
-        """Builds and displays the main Project Screen workspace in a two-column resource layout."""
-        self.clear_frame()
-        self.root.geometry("1100x800") 
+        """Displays the Project Screen for the current project, reusing its widgets."""
+        # Reuse the resource store while the same project stays open
+        project_dir = self.project_location(self.current_project)
+        if self.store is None or self.store.project_dir != project_dir:
+            self.close_store()
+            try:
+                self.store = self.open_project_store(self.current_project)
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to open project: {e}")
+                self.show_welcome_screen()
+                return
+            if self.watcher is not None:
+                self.watcher.watch_project(project_dir)
+                # Resources linked from a library project get the library's latest version
+                store = self.store
+                self.io.submit(refresh_library_links, self.project_path, project_dir, serial=True,
+                               on_done=lambda updated: self.reread_changed_resources(store, updated),
+                               on_error=self.io_error("Could not update the library resources", store))
+            # Rendered remix templates; on disk next to a local project's resources
+            self.bundles = BundleCache(os.path.join(project_dir, BUNDLES_DIR_NAME) if self.server is None else None)
+            # Keeps the revision history of the project within its size limits
+            self.io.submit(self.store.history.compact, serial=True,
+                           on_error=self.io_error("Could not compact the history", self.store))
+            self.build_relation_index()
+
+        if self.project_frame is None:
+            self.build_project_screen()
+        self.reset_project_screen()
+        self.show_screen(self.project_frame, "1100x800")
+
+        self.populate_resource_lists()
+        self.measure_redraw("ui.redraw_project_screen")
+
+    def reset_project_screen(self):
+        """Empties the Project Screen of anything shown for the previous project."""
+        self.project_label.config(text=f"Project: {self.current_project}")
+        self.search_entry.delete(0, tk.END)
+        for resource_type, catalog in self.catalogs.items():
+            self.catalog_filter_entries[resource_type].delete(0, tk.END)
+            catalog.reset()
+        self.selected_resource = None
+        self.preview_version = None
+        self.clear_preview()
+        if self.remix_recount_job is not None:
+            self.root.after_cancel(self.remix_recount_job)
+            self.remix_recount_job = None
+        self.clear_remix()
+
+    @instrument.profiled("ui.build_project_screen")
+    def build_project_screen(self):
+        """Creates the widgets of the Project Screen in a two-column resource layout. Done once."""
+        project_frame = self.project_frame = tk.Frame(self.root)
 
         # Top area: Brand and project info
-        top_frame = tk.Frame(self.root, padx=10, pady=10)
+        top_frame = tk.Frame(project_frame, padx=10, pady=10)
         top_frame.pack(fill="x")
         
         tk.Label(top_frame, text="NarrativeGuru", font=("Helvetica", 18, "bold")).pack(side="left", padx=(0, 20))
         
-        tk.Label(top_frame, text=f"Project: {self.current_project}", font=("Helvetica", 14)).pack(side="left")
+        self.project_label = tk.Label(top_frame, font=("Helvetica", 14))
+        self.project_label.pack(side="left")
         tk.Button(top_frame, text="Back to Projects", command=self.show_welcome_screen).pack(side="right")
+        tk.Button(top_frame, text="Import...", command=self.show_import_window).pack(side="right", padx=(0, 10))
+        if self.server is None:
+            tk.Button(top_frame, text="Add from Library...",
+                      command=self.show_library_window).pack(side="right", padx=(0, 10))
+
+        # Search across all resources of the project
+        tk.Button(top_frame, text="Search", command=self.search_resources).pack(side="right", padx=(5, 20))
+        self.search_entry = tk.Entry(top_frame, width=30)
+        self.search_entry.pack(side="right")
+        self.search_entry.bind("<Return>", lambda event: self.search_resources())
 
         # Bottom area: Left (Resources) and Right (Preview/Remix) panes
-        main_panes = tk.PanedWindow(self.root, orient=tk.HORIZONTAL, sashrelief=tk.SUNKEN)
+        main_panes = tk.PanedWindow(project_frame, orient=tk.HORIZONTAL, sashrelief=tk.SUNKEN)
         main_panes.pack(expand=True, fill="both", padx=10, pady=10)
 
         # Left pane: Resource Catalogs
@@ -315,6 +1133,8 @@ class NarrativeGuruApp:
         col2_frame.pack(side="left", fill="y", expand=True)
 
         # Instantiate Listboxes in a 2x2 grid structure
+        self.catalogs = {}
+        self.catalog_filter_entries = {}
         self.char_listbox = self.create_resource_catalog(col1_frame, "Characters", "characters")
         self.clothing_listbox = self.create_resource_catalog(col1_frame, "Clothing", "clothing")
         self.loc_listbox = self.create_resource_catalog(col2_frame, "Locations", "locations")
@@ -324,26 +1144,56 @@ class NarrativeGuruApp:
         right_pane = tk.Frame(main_panes, padx=10, pady=10)
         main_panes.add(right_pane)
 
-        # Preview Window
+        # Preview Window, with the summary and tags of the resource above its body
         tk.Label(right_pane, text="Preview Window", font=("Helvetica", 12)).pack(anchor="w")
+        self.preview_header_label = tk.Label(right_pane, anchor="w", justify="left", fg="gray30", wraplength=520)
+        self.preview_header_label.pack(fill="x")
         self.preview_text = tk.Text(right_pane, wrap="word", height=20) 
         self.preview_text.pack(fill="x", pady=5)
         preview_button_frame = tk.Frame(right_pane)
         preview_button_frame.pack(fill="x")
         tk.Button(preview_button_frame, text="Copy Context", command=lambda: self.copy_to_clipboard(self.preview_text)).pack(side="left")
         tk.Button(preview_button_frame, text="Update", command=self.update_resource_content).pack(side="right")
+        tk.Button(preview_button_frame, text="History...", command=self.show_history_window).pack(side="right", padx=5)
+        tk.Button(preview_button_frame, text="Details...", command=self.show_details_window).pack(side="right")
+        self.preview_text.tag_configure("diff_added", foreground="dark green")
+        self.preview_text.tag_configure("diff_removed", foreground="red3")
+        self.preview_text.tag_configure("diff_header", foreground="gray40")
         
         # Remix Station
-        tk.Label(right_pane, text="Remix Station", font=("Helvetica", 12)).pack(anchor="w", pady=(20, 0))
+        remix_label_frame = tk.Frame(right_pane)
+        remix_label_frame.pack(fill="x", pady=(20, 0))
+        tk.Label(remix_label_frame, text="Remix Station", font=("Helvetica", 12)).pack(side="left")
+        tk.Label(remix_label_frame, text="Headers:").pack(side="left", padx=(20, 2))
+        # A preset, or a format of your own such as "### {name}"
+        self.remix_header_combo = ttk.Combobox(remix_label_frame, values=list(HEADER_FORMATS), width=24)
+        self.remix_header_combo.set(self.remix_header_name)
+        self.remix_header_combo.pack(side="left")
+        self.remix_header_combo.bind("<<ComboboxSelected>>", self.change_remix_header_format)
+        self.remix_header_combo.bind("<Return>", self.change_remix_header_format)
+        self.remix_count_label = tk.Label(remix_label_frame)
+        self.remix_count_label.pack(side="right")
         self.remix_text = tk.Text(right_pane, wrap="word", height=15) 
         self.remix_text.pack(fill="x", pady=5)
+        self.remix_text.bind("<KeyRelease>", lambda event: self.schedule_remix_recount())
         remix_button_frame = tk.Frame(right_pane)
         remix_button_frame.pack(fill="x")
         tk.Button(remix_button_frame, text="Copy Context", command=lambda: self.copy_to_clipboard(self.remix_text)).pack(side="left")
-        tk.Button(remix_button_frame, text="Clear Context", command=lambda: self.remix_text.delete("1.0", tk.END)).pack(side="left", padx=5)
+        tk.Button(remix_button_frame, text="Clear Context", command=self.clear_remix).pack(side="left", padx=5)
+        tk.Button(remix_button_frame, text="Templates...", command=self.show_templates_window).pack(side="left")
         tk.Button(remix_button_frame, text="Export to File", command=self.export_remix_to_file).pack(side="right")
 
-        self.populate_resource_lists()
+        # Token budget: shortens the remix section by section to a target size
+        tk.Button(remix_button_frame, text="Fit to Budget", command=self.fit_remix_to_budget).pack(side="right", padx=5)
+        self.remix_budget_entry = tk.Entry(remix_button_frame, width=8)
+        self.remix_budget_entry.pack(side="right")
+        self.remix_budget_entry.bind("<KeyRelease>", lambda event: self.update_remix_count())
+        tk.Label(remix_button_frame, text="Token budget:").pack(side="right", padx=(10, 2))
+
+        # Double-clicking a resource brings the resources it links to along when this is on
+        self.remix_links_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(remix_button_frame, text="With links", variable=self.remix_links_var).pack(side="right", padx=5)
+        self.record_widgets_created(project_frame)
 
     def create_resource_catalog(self, parent, label_text, type_name):
         """Creates a resource listbox and its associated 'Add' button."""
@@ -351,14 +1201,23 @@ class NarrativeGuruApp:
         frame.pack(fill="x", pady=5)
 
         tk.Label(frame, text=label_text, font=("Helvetica", 12)).pack(anchor="w")
+
+        # Type-to-filter box above the list
+        filter_entry = tk.Entry(frame, width=25)
+        filter_entry.pack(fill="x", pady=(5, 0))
         
-        listbox = tk.Listbox(frame, width=25, height=13, borderwidth=1, relief="sunken") 
+        listbox = tk.Listbox(frame, width=25, height=12, borderwidth=1, relief="sunken") 
         listbox.pack(pady=5, fill="both", expand=True)
+        catalog = self.catalogs[type_name] = CatalogList(listbox)
+        self.catalog_filter_entries[type_name] = filter_entry
+        filter_entry.bind("<KeyRelease>", lambda event: catalog.schedule_filter(filter_entry.get()))
         
         # Bind events for the listbox
         listbox.bind("<<ListboxSelect>>", lambda event, type_name=type_name: self.on_resource_select(event, type_name))
         listbox.bind("<Double-Button-1>", lambda event, type_name=type_name: self.on_resource_double_click(event, type_name))
         listbox.bind("<Button-3>", lambda event, type_name=type_name: self.show_resource_context_menu(event, type_name))
+        listbox.bind("<Motion>", lambda event, type_name=type_name: self.schedule_hover(event, type_name))
+        listbox.bind("<Leave>", lambda event: self.hide_hover())
         
         tk.Button(frame, text="Add", command=lambda: self.show_new_resource_window(type_name)).pack(pady=5)
         
@@ -366,19 +1225,19 @@ class NarrativeGuruApp:
 
     def populate_resource_lists(self):
         """Fills all resource listboxes with available resources."""
-        self.populate_listbox(self.char_listbox, "characters")
-        self.populate_listbox(self.loc_listbox, "locations")
-        self.populate_listbox(self.clothing_listbox, "clothing")
-        self.populate_listbox(self.prop_listbox, "props")
+        for resource_type in RESOURCE_TYPES:
+            self.populate_listbox(resource_type)
     
-    def populate_listbox(self, listbox, resource_type):
+    def populate_listbox(self, resource_type):
         """Helper function to populate a single listbox."""
-        listbox.delete(0, tk.END)
-        resource_dir = os.path.join(self.project_path, self.current_project, resource_type)
-        if os.path.exists(resource_dir):
-            resources = [f.split('.')[0] for f in os.listdir(resource_dir) if f.endswith('.json')]
-            for res in sorted(resources):
-                listbox.insert(tk.END, res)
+        store = self.store
+
+        def on_done(resources):
+            if self.project_screen_is_showing(store):
+                self.catalogs[resource_type].set_names(resources)
+
+        self.io.submit(store.list_names, resource_type, key=("catalog", resource_type),
+                       on_done=on_done, on_error=self.io_error(f"Could not read {resource_type}", store))
 
     def on_resource_select(self, event, resource_type):
         """Loads and displays the content of a selected resource in the Preview Window."""
@@ -386,18 +1245,29 @@ class NarrativeGuruApp:
         if listbox.curselection():
             index = listbox.curselection()[0]
             resource_name = listbox.get(index)
-            self.resource_type = resource_type # Store the current type for updates
-            
-            file_path = os.path.join(self.project_path, self.current_project, resource_type, f"{resource_name}.json")
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    content = data.get("content", "")
-                self.preview_text.delete("1.0", tk.END)
-                self.preview_text.insert("1.0", content)
-                self.selected_resource_path = file_path # Store the path for updates
-            except (IOError, json.JSONDecodeError) as e:
-                messagebox.showerror("Error", f"Failed to load resource: {e}")
+            self.show_resource_preview(resource_type, resource_name)
+
+    def show_resource_preview(self, resource_type, resource_name):
+        """Displays the content of a resource in the Preview Window."""
+        self.resource_type = resource_type # Store the current type for updates
+        store = self.store
+
+        def load():
+            content = store.read(resource_type, resource_name)
+            return content, content_version(content), store.read_header(resource_type, resource_name)
+
+        def on_done(result):
+            if not self.project_screen_is_showing(store):
+                return
+            content, self.preview_version, header = result
+            self.clear_preview()
+            self.show_preview_header(header)
+            self.load_preview_text(content)
+            self.selected_resource = (resource_type, resource_name) # Store the resource for updates
+
+        # Only the last of several quick selections gets loaded
+        self.io.submit(load, key="preview",
+                       on_done=on_done, on_error=self.io_error("Failed to load resource", store))
 
     def on_resource_double_click(self, event, resource_type):
         """Appends the content of a double-clicked resource to the Remix Station."""
@@ -405,17 +1275,823 @@ class NarrativeGuruApp:
         if listbox.curselection():
             index = listbox.curselection()[0]
             resource_name = listbox.get(index)
-            file_path = os.path.join(self.project_path, self.current_project, resource_type, f"{resource_name}.json")
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    content = data.get("content", "")
-                
-                # Append a header and the content
-                remix_content = f"--- {resource_name} ({resource_type.title()}) ---\n{content}\n\n"
-                self.remix_text.insert(tk.END, remix_content)
-            except (IOError, json.JSONDecodeError) as e:
-                messagebox.showerror("Error", f"Failed to load resource for remix: {e}")
+            self.append_to_remix(resource_type, resource_name, self.remix_links_var.get())
+
+    def append_to_remix(self, resource_type, resource_name, with_links=False):
+        """Appends the content of a resource, and with_links the resources it links to, to the Remix Station."""
+        store = self.store
+        header_format = self.remix_header_format
+
+        def load():
+            items = [(resource_type, resource_name)]
+            if with_links:
+                items = expand_links(store, items)
+            # The blocks' tokens are counted here, off the Tk thread
+            blocks = []
+            for item_type, item_name in items:
+                block = format_remix_block(item_name, item_type, store.read(item_type, item_name), header_format)
+                blocks.append(((item_type, item_name), block, count_tokens(block)))
+            return blocks
+
+        def on_done(blocks):
+            if not self.project_screen_is_showing(store):
+                return
+            # Append a header and the content of each resource
+            for item, block, tokens in blocks:
+                edited = self.remix_text.edit_modified()
+                self.remix_text.insert(tk.END, block)
+                if edited or self.remix_items is None:
+                    self.remix_items = None
+                else:
+                    self.remix_items.append(item)
+                    self.remix_text.edit_modified(False)
+                self.remix_counter.add(block, tokens)
+            self.update_remix_count()
+
+        # Serial, so resources land in the order they were double-clicked
+        self.io.submit(load, serial=True, on_done=on_done,
+                       on_error=self.io_error("Failed to load resource for remix", store))
+
+    def clear_remix(self):
+        """Empties the Remix Station."""
+        self.remix_text.delete("1.0", tk.END)
+        self.remix_text.edit_modified(False)
+        self.remix_items = []
+        self.remix_budget = None
+        self.remix_counter.reset()
+        self.update_remix_count()
+
+    def get_remix_budget(self):
+        """Returns the token budget typed in by the user, or None if there is no valid one."""
+        try:
+            budget = int(self.remix_budget_entry.get().strip().replace(",", ""))
+        except ValueError:
+            return None
+        return budget if budget > 0 else None
+
+    def update_remix_count(self):
+        """Shows the size of the Remix Station, in red once it is over the token budget."""
+        counter = self.remix_counter
+        text = f"~{counter.tokens:,} tokens, {counter.chars:,} characters"
+        budget = self.get_remix_budget()
+        if budget is not None and counter.tokens > budget:
+            self.remix_count_label.config(text=f"{text} (over the {budget:,} token budget)", fg="red")
+        else:
+            self.remix_count_label.config(text=text, fg="black")
+
+    def schedule_remix_recount(self):
+        """Recounts the Remix Station shortly after it was edited by hand."""
+        if not self.remix_text.edit_modified():
+            return
+        if self.remix_recount_job is not None:
+            self.root.after_cancel(self.remix_recount_job)
+        self.remix_recount_job = self.root.after(REMIX_RECOUNT_DELAY, self.recount_remix)
+
+    def recount_remix(self):
+        """Counts the whole Remix Station again, in the background."""
+        self.remix_recount_job = None
+        store = self.store
+        if not self.project_screen_is_showing(store):
+            return
+        text = self.remix_text.get("1.0", "end-1c")
+
+        def on_done(tokens):
+            if self.project_screen_is_showing(store):
+                self.remix_counter.reset(text, tokens)
+                self.update_remix_count()
+
+        self.io.submit(count_tokens, text, key="remix-count", on_done=on_done)
+
+    def fit_remix_to_budget(self):
+        """Rebuilds the Remix Station from its resources, shortened section by section to the token budget."""
+        budget = self.get_remix_budget()
+        if budget is None:
+            messagebox.showerror("Error", "Enter a token budget, e.g. 8000.")
+            return
+        if self.remix_items is None:
+            messagebox.showerror("Error", "The Remix Station was edited by hand. Clear it and add the resources again to fit it to a budget.")
+            return
+        if not self.remix_items:
+            messagebox.showinfo("Fit to Budget", "Remix Station is empty.")
+            return
+
+        store = self.store
+        items = list(self.remix_items)
+        header_format = self.remix_header_format
+
+        def fit():
+            blocks = [(resource_type, name, store.read(resource_type, name)) for resource_type, name in items]
+            fitted, dropped = fit_to_budget(blocks, budget, header_format)
+            text = "".join(format_remix_block(name, resource_type, content, header_format)
+                           for resource_type, name, content in fitted)
+            return text, count_tokens(text), dropped
+
+        def on_done(result):
+            if not self.project_screen_is_showing(store) or self.remix_items != items:
+                return  # The remix changed meanwhile
+            text, tokens, dropped = result
+            self.show_remix(items, text, tokens, budget)
+            if dropped:
+                messagebox.showinfo("Fit to Budget", f"{dropped} resource(s) at the end did not fit the budget and were left out.")
+
+        self.io.submit(fit, key="remix-fit", on_done=on_done,
+                       on_error=self.io_error("Failed to fit the remix to the budget", store))
+
+    def show_remix(self, items, text, tokens, budget=None):
+        """Replaces the Remix Station with text made of the given resources, of a known token count."""
+        self.remix_text.delete("1.0", tk.END)
+        self.remix_text.insert("1.0", text)
+        self.remix_text.edit_modified(False)
+        self.remix_items = items
+        self.remix_budget = budget
+        self.remix_counter.reset(text, tokens)
+        self.update_remix_count()
+
+    def change_remix_header_format(self, event=None):
+        """Introduces the resources of the Remix Station with the chosen header format from now on."""
+        name = self.remix_header_combo.get().strip() or "dashes"
+        try:
+            header_format = resolve_header_format(name)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            self.remix_header_combo.set(self.remix_header_name)
+            return
+        self.remix_header_name = name
+        if header_format == self.remix_header_format:
+            return
+        self.remix_header_format = header_format
+        # Rebuilt from its resources, unless edited by hand
+        if not self.remix_items or self.remix_text.edit_modified():
+            return
+        if self.remix_budget is not None:
+            self.fit_remix_to_budget()
+            return
+        store = self.store
+        items = list(self.remix_items)
+
+        def render():
+            text = "".join(iter_remix_blocks(store, items, header_format))
+            return text, count_tokens(text)
+
+        def on_done(result):
+            if self.project_screen_is_showing(store) and self.remix_items == items \
+                    and self.remix_header_format == header_format:
+                self.show_remix(items, *result)
+
+        self.io.submit(render, key="remix-render", on_done=on_done,
+                       on_error=self.io_error("Failed to rebuild the remix", store))
+
+    def show_templates_window(self):
+        """Displays a popup listing the project's saved remix templates."""
+        self.templates_window = tk.Toplevel(self.root)
+        self.templates_window.title("Remix Templates")
+        self.templates_window.grab_set()
+
+        frame = tk.Frame(self.templates_window, padx=20, pady=20)
+        frame.pack()
+
+        tk.Label(frame, text="Saved Remix Station contexts of this project:").pack(anchor="w", pady=5)
+        self.templates_listbox = tk.Listbox(frame, width=45, height=12)
+        self.templates_listbox.pack(fill="both", expand=True)
+        self.templates_listbox.bind("<Double-Button-1>", lambda event: self.load_remix_template())
+        self.refresh_templates_list()
+
+        button_frame = tk.Frame(frame)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Load", command=self.load_remix_template).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Save Current...", command=self.save_remix_template).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Delete", command=self.delete_remix_template).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Close", command=self.templates_window.destroy).pack(side="left", padx=5)
+
+    def refresh_templates_list(self):
+        """Lists the saved templates in the templates window, if it is still open."""
+        if not self.templates_window.winfo_exists():
+            return
+        store = self.store
+
+        def fill(names):
+            if self.templates_window.winfo_exists():
+                self.templates_listbox.delete(0, tk.END)
+                if names:
+                    self.templates_listbox.insert(tk.END, *names)
+
+        self.io.submit(store.templates.names, key="templates", on_done=fill,
+                       on_error=self.io_error("Could not read the remix templates", store))
+
+    def selected_template(self):
+        """Returns the name of the template selected in the templates window, if any."""
+        selection = self.templates_listbox.curselection()
+        if not selection:
+            messagebox.showerror("Error", "Select a template first.", parent=self.templates_window)
+            return None
+        return self.templates_listbox.get(selection[0])
+
+    def save_remix_template(self):
+        """Saves the resources of the Remix Station, in order and with its header format, as a template."""
+        if not self.remix_items:
+            messagebox.showerror("Error", "Add resources to the Remix Station first. A Remix Station edited by hand "
+                                          "cannot be saved as a template.", parent=self.templates_window)
+            return
+        name = simpledialog.askstring("Save Template", "Template name:", parent=self.templates_window)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        try:
+            check_resource_name(name)
+        except OSError as e:
+            messagebox.showerror("Error", str(e), parent=self.templates_window)
+            return
+        if name in self.templates_listbox.get(0, tk.END) and not messagebox.askyesno(
+                "Save Template", f"Replace the template '{name}'?", parent=self.templates_window):
+            return
+        store = self.store
+        template = {"items": [list(item) for item in self.remix_items], "with_links": False,
+                    "header_format": self.remix_header_name}
+        self.io.submit(store.templates.save, name, template, serial=True,
+                       on_done=lambda _: self.refresh_templates_list(),
+                       on_error=self.io_error("Failed to save the template", store))
+
+    def load_remix_template(self):
+        """Replaces the Remix Station with a template's resources, rendered again only if one of them changed."""
+        name = self.selected_template()
+        if name is None:
+            return
+        self.templates_window.destroy()
+        store = self.store
+        bundles = self.bundles
+
+        def load():
+            template = store.templates.get(name)
+            return template, bundles.render(store, name, template)[0]
+
+        def on_done(result):
+            if not self.project_screen_is_showing(store):
+                return
+            template, bundle = result
+            self.remix_header_name = template["header_format"] or "dashes"
+            self.remix_header_format = resolve_header_format(self.remix_header_name)
+            self.remix_header_combo.set(self.remix_header_name)
+            self.show_remix([tuple(item) for item in bundle["members"]], bundle["text"], bundle["tokens"])
+
+        self.io.submit(load, key="remix-render", on_done=on_done,
+                       on_error=self.io_error("Failed to load the template", store))
+
+    def delete_remix_template(self):
+        name = self.selected_template()
+        if name is None or not messagebox.askyesno("Delete Template", f"Delete the template '{name}'?",
+                                                   parent=self.templates_window):
+            return
+        store = self.store
+        bundles = self.bundles
+
+        def delete():
+            store.templates.delete(name)
+            bundles.discard(name)
+
+        self.io.submit(delete, serial=True,
+                       on_done=lambda _: self.refresh_templates_list(),
+                       on_error=self.io_error("Failed to delete the template", store))
+
+    def forget_remix_source(self, store, resource):
+        """Stops exporting the remix from storage once one of its resources changed since it was appended."""
+        if self.project_screen_is_showing(store) and self.remix_items and resource in self.remix_items:
+            self.remix_items = None
+
+    def search_resources(self):
+        """Searches the names and contents of all resources in the project."""
+        query = self.search_entry.get().strip()
+        if not query:
+            return
+
+        if self.search_index is not None:
+            self.show_search_results(query, self.search_index.search(query))
+            return
+
+        # The first search of a session reads every resource once in the background;
+        # changes made meanwhile are replayed on the new index when it is ready
+        self.pending_search = query
+        if self.search_changes is not None:
+            return
+        self.search_changes = []
+        store = self.store
+        self.root.config(cursor="watch")
+
+        def build():
+            search_index = SearchIndex(store)
+            search_index.build()
+            return search_index
+
+        def on_done(search_index):
+            self.root.config(cursor="")
+            if self.store is not store:
+                return
+            for action, args in self.search_changes:
+                getattr(search_index, action)(*args)
+            self.search_index = search_index
+            self.search_changes = None
+            if self.project_screen_is_showing(store):
+                self.show_search_results(self.pending_search, search_index.search(self.pending_search))
+
+        def on_error(e):
+            self.root.config(cursor="")
+            if self.store is store:
+                self.search_changes = None
+                messagebox.showerror("Error", f"Failed to index resources: {e}")
+
+        self.io.submit(build, on_done=on_done, on_error=on_error)
+
+    def update_search_index(self, store, action, *args):
+        """Applies a resource change (SearchIndex add, remove or rename) to the project's search index."""
+        if self.store is not store:
+            return
+        if self.search_index is not None:
+            getattr(self.search_index, action)(*args)
+        elif self.search_changes is not None:
+            self.search_changes.append((action, args))
+
+    def build_relation_index(self):
+        """Reads the links between the open project's resources in the background."""
+        store = self.store
+        self.relation_index = None
+        self.relation_changes = []
+
+        def build():
+            relation_index = RelationIndex(store)
+            relation_index.build()
+            return relation_index
+
+        def on_done(relation_index):
+            if self.store is not store:
+                return
+            for action, args in self.relation_changes:
+                getattr(relation_index, action)(*args)
+            self.relation_index = relation_index
+            self.relation_changes = None
+
+        def on_error(e):
+            if self.store is store:
+                self.relation_changes = None
+            self.io_error("Could not read the links between resources", store)(e)
+
+        self.io.submit(build, on_done=on_done, on_error=on_error)
+
+    def update_relation_index(self, store, action, *args):
+        """Applies a change (RelationIndex set_links, remove or rename) to the project's relation index."""
+        if self.store is not store:
+            return
+        if self.relation_index is not None:
+            getattr(self.relation_index, action)(*args)
+        elif self.relation_changes is not None:
+            self.relation_changes.append((action, args))
+
+    def apply_watch_events(self):
+        """Collects the changes the watcher noticed since last time and applies them."""
+        events = self.watcher.drain()
+        if events:
+            self.apply_external_changes(events)
+        self.root.after(WATCH_DELIVERY_INTERVAL, self.apply_watch_events)
+
+    def apply_external_changes(self, events):
+        """Updates the projects list, catalogs, search index and preview for changes made outside the app."""
+        store = self.store
+        showing = self.project_screen_is_showing(store)
+        changed = []  # resources whose new content the search index and the preview need
+        for event in events:
+            if event.kind == "projects":
+                if self.current_screen is self.welcome_frame:
+                    self.populate_projects_list()
+                continue
+            if store is None or event.project_dir != store.project_dir:
+                continue  # Noticed in a project that has been closed since
+
+            if event.kind == "changed":
+                # A packed project doesn't tell which contents changed: search starts over on the next query,
+                # the links are read again right away
+                if self.search_changes is None:
+                    self.search_index = None
+                if self.relation_changes is None:
+                    self.build_relation_index()
+                if showing and self.remix_items:
+                    self.remix_items = None
+                if self.selected_resource is not None:
+                    changed.append(self.selected_resource)
+                continue
+
+            resource_type, name = event.resource_type, event.name
+            self.forget_remix_source(store, (resource_type, name))
+            if event.kind == "added":
+                if showing:
+                    self.catalogs[resource_type].insert(name)
+                changed.append((resource_type, name))
+            elif event.kind == "modified":
+                changed.append((resource_type, name))
+            elif event.kind == "removed":
+                self.update_search_index(store, "remove", resource_type, name)
+                self.update_relation_index(store, "remove", resource_type, name)
+                if showing:
+                    self.catalogs[resource_type].remove(name)
+                    if self.selected_resource == (resource_type, name):
+                        self.selected_resource = None
+                        self.clear_preview()
+            elif event.kind == "renamed":
+                self.update_search_index(store, "rename", resource_type, name, event.new_name)
+                self.update_relation_index(store, "rename", resource_type, name, event.new_name)
+                if showing:
+                    self.catalogs[resource_type].rename(name, event.new_name)
+                    if self.selected_resource == (resource_type, name):
+                        self.selected_resource = (resource_type, event.new_name)
+        if changed:
+            self.reread_changed_resources(store, changed)
+
+    def reread_changed_resources(self, store, resources):
+        """
+        Reads resources changed outside the app for the search index, the
+        relation index and, if it shows one, the preview.
+        """
+        indexing = self.search_index is not None or self.search_changes is not None
+        linking = self.relation_index is not None or self.relation_changes is not None
+        if not indexing and not linking:
+            resources = [resource for resource in resources if resource == self.selected_resource]
+        if not resources:
+            return
+        selected = self.selected_resource
+
+        def read():
+            contents = []
+            for resource in dict.fromkeys(resources):
+                try:
+                    content = None
+                    if indexing or resource == selected:
+                        content = store.read(*resource, cache=False)
+                    relations = store.read_header(*resource)["relations"] if linking else None
+                    contents.append((resource, content, relations))
+                except FileNotFoundError:
+                    pass  # Removed again meanwhile; the watcher reports that next
+            return contents
+
+        def on_done(contents):
+            for resource, content, relations in contents:
+                if indexing:
+                    self.update_search_index(store, "add", *resource, content)
+                if linking:
+                    self.update_relation_index(store, "set_links", *resource, relations)
+                if resource == self.selected_resource and content is not None and self.project_screen_is_showing(store):
+                    self.refresh_preview(content)
+
+        self.io.submit(read, on_done=on_done, on_error=self.io_error("Could not read changed resources", store))
+
+    def refresh_preview(self, content):
+        """Shows new content of the previewed resource, unless the preview holds unsaved edits or a diff."""
+        if self.preview_diff or self.preview_has_edits():
+            return
+        if self.preview_load_job is None and self.preview_text.get("1.0", "end-1c") == content:
+            return
+        self.clear_preview(keep_header=True)
+        self.load_preview_text(content)
+        self.preview_version = content_version(content)
+
+    def preview_has_edits(self):
+        """Tells whether the Preview Window holds changes not saved yet; a body still being inserted has none."""
+        return self.preview_text.edit_modified() and not self.preview_diff and self.preview_load_job is None
+
+    def load_preview_text(self, content, modified=False):
+        """
+        Fills the emptied Preview Window with a body. A long body is inserted a
+        chunk per event loop step and stays read-only until it is complete, so
+        selecting a chapter of several MB doesn't freeze the window.
+        """
+        position = 0
+
+        def step():
+            nonlocal position
+            end = min(position + PREVIEW_CHUNK_CHARS, len(content))
+            if end < len(content):
+                # Whole lines lay out faster; break after a newline when there is one
+                newline = content.rfind("\n", position, end)
+                if newline > position:
+                    end = newline + 1
+            self.preview_text.config(state="normal")
+            self.preview_text.insert(tk.END, content[position:end])
+            position = end
+            if position < len(content):
+                self.preview_text.config(state="disabled")
+                self.preview_load_job = self.root.after(1, step)
+            else:
+                self.preview_load_job = None
+                self.preview_text.edit_modified(modified)
+
+        self.cancel_preview_load()
+        step()
+
+    def cancel_preview_load(self):
+        """Stops inserting a long body into the Preview Window."""
+        if self.preview_load_job is not None:
+            self.root.after_cancel(self.preview_load_job)
+            self.preview_load_job = None
+            self.preview_text.config(state="normal")
+
+    def clear_preview(self, keep_header=False):
+        """Empties the Preview Window, leaving the diff view if it shows one."""
+        self.cancel_preview_load()
+        if self.preview_diff:
+            self.preview_diff = False
+            self.preview_text.config(state="normal")
+        self.preview_text.delete("1.0", tk.END)
+        if not keep_header:
+            self.preview_header_label.config(text="")
+
+    def show_preview_header(self, header):
+        """Shows the summary and tags of the previewed resource above its body."""
+        lines = []
+        if header["summary"]:
+            lines.append(header["summary"])
+        if header["tags"]:
+            lines.append("Tags: " + ", ".join(header["tags"]))
+        self.preview_header_label.config(text="\n".join(lines))
+
+    def schedule_hover(self, event, resource_type):
+        """Shows the summary of the catalog row under the mouse once it rests there for a moment."""
+        listbox = event.widget
+        index = listbox.nearest(event.y)
+        if index < 0:
+            return
+        resource = (resource_type, listbox.get(index))
+        if resource == self.hover_resource:
+            return
+        self.hide_hover()
+        self.hover_resource = resource
+        self.hover_job = self.root.after(HOVER_DELAY, lambda: self.load_hover(resource, event.x_root, event.y_root))
+
+    def load_hover(self, resource, x, y):
+        """Reads only the header of the hovered resource, not its body."""
+        self.hover_job = None
+        store = self.store
+
+        def on_done(header):
+            if self.hover_resource != resource or not self.project_screen_is_showing(store):
+                return
+            text = header["summary"] or header["excerpt"].strip()
+            if header["tags"]:
+                text += "\nTags: " + ", ".join(header["tags"])
+            if not text.strip():
+                return
+            self.hover_tip = tk.Toplevel(self.root)
+            self.hover_tip.wm_overrideredirect(True)
+            self.hover_tip.wm_geometry(f"+{x + 15}+{y + 10}")
+            tk.Label(self.hover_tip, text=text, justify="left", wraplength=360, background="lightyellow",
+                     relief="solid", borderwidth=1, padx=4, pady=2).pack()
+
+        # A header read that can't keep up with the mouse is simply dropped
+        self.io.submit(store.read_header, *resource, key="hover", on_done=on_done, on_error=lambda e: None)
+
+    def hide_hover(self):
+        """Removes the summary popup, or stops it from appearing."""
+        self.hover_resource = None
+        if self.hover_job is not None:
+            self.root.after_cancel(self.hover_job)
+            self.hover_job = None
+        if self.hover_tip is not None:
+            self.hover_tip.destroy()
+            self.hover_tip = None
+
+    def show_details_window(self):
+        """Opens a window to edit the summary, tags, attachments and links of the previewed resource."""
+        if self.selected_resource is None:
+            messagebox.showerror("Error", "No resource is selected.")
+            return
+        resource = self.selected_resource
+        store = self.store
+
+        def on_done(header):
+            if not self.project_screen_is_showing(store) or self.selected_resource != resource:
+                return
+            if self.details_window is not None and self.details_window.winfo_exists():
+                self.details_window.destroy()
+            window = self.details_window = tk.Toplevel(self.root)
+            window.title(f"Details: {resource[1]}")
+            frame = tk.Frame(window, padx=10, pady=10)
+            frame.pack(expand=True, fill="both")
+
+            tk.Label(frame, text="Summary:").pack(anchor="w")
+            summary_text = tk.Text(frame, wrap="word", width=50, height=4)
+            summary_text.insert("1.0", header["summary"])
+            summary_text.pack(fill="x", pady=(0, 5))
+            tk.Label(frame, text="Tags (comma separated):").pack(anchor="w")
+            tags_entry = tk.Entry(frame, width=50)
+            tags_entry.insert(0, ", ".join(header["tags"]))
+            tags_entry.pack(fill="x", pady=(0, 5))
+            tk.Label(frame, text="Attachments (one file or link per line):").pack(anchor="w")
+            attachments_text = tk.Text(frame, wrap="none", width=50, height=4)
+            attachments_text.insert("1.0", "\n".join(header["attachments"]))
+            attachments_text.pack(fill="x", pady=(0, 5))
+            tk.Label(frame, text="Links (one per line, e.g. clothing: Red Scarf):").pack(anchor="w")
+            links_text = tk.Text(frame, wrap="none", width=50, height=6)
+            links_text.insert("1.0", "\n".join(f"{item_type}: {item_name}"
+                                                for item_type, item_name in relation_items(header["relations"])))
+            links_text.pack(fill="x", pady=(0, 5))
+
+            def save():
+                links = []
+                for line in links_text.get("1.0", tk.END).splitlines():
+                    if not line.strip():
+                        continue
+                    item_type, _, item_name = line.partition(":")
+                    item_type = item_type.strip().lower()
+                    if item_type not in RESOURCE_TYPES or not item_name.strip():
+                        messagebox.showerror("Error", f"Not a link: '{line.strip()}'. Write the category "
+                                                      f"({', '.join(RESOURCE_TYPES)}), a colon and the name.",
+                                             parent=window)
+                        return
+                    links.append((item_type, item_name.strip()))
+                fields = {
+                    "summary": summary_text.get("1.0", tk.END).strip(),
+                    "tags": [tag.strip() for tag in tags_entry.get().split(",") if tag.strip()],
+                    "attachments": [line.strip() for line in attachments_text.get("1.0", tk.END).splitlines()
+                                    if line.strip()],
+                    "relations": relations_from_items(links),
+                }
+                self.save_resource_details(store, resource, fields)
+
+            button_frame = tk.Frame(frame)
+            button_frame.pack(pady=5)
+            tk.Button(button_frame, text="Save", command=save).pack(side="left", padx=5)
+            tk.Button(button_frame, text="Cancel", command=window.destroy).pack(side="left", padx=5)
+
+        self.io.submit(store.read_header, *resource, on_done=on_done,
+                       on_error=self.io_error("Could not read the resource details", store))
+
+    def save_resource_details(self, store, resource, fields):
+        """Writes edited header fields in the background, leaving the body as it is."""
+        def on_done(header):
+            self.update_relation_index(store, "set_links", *resource, header["relations"])
+            if self.details_window is not None and self.details_window.winfo_exists():
+                self.details_window.destroy()
+            if self.project_screen_is_showing(store) and self.selected_resource == resource and not self.preview_diff:
+                self.show_preview_header(header)
+
+        def save():
+            store.write_header(*resource, fields)
+            return store.read_header(*resource)
+
+        self.io.submit(save, serial=True, on_done=on_done, on_error=self.io_error("Failed to save the details", store))
+
+    def show_preview_diff(self, lines):
+        """Shows a unified diff in the Preview Window, read-only until another resource or revision is shown."""
+        self.clear_preview(keep_header=True)
+        for line in lines:
+            if line.startswith(("---", "+++", "@@")):
+                tag = "diff_header"
+            elif line.startswith("+"):
+                tag = "diff_added"
+            elif line.startswith("-"):
+                tag = "diff_removed"
+            else:
+                tag = ()
+            self.preview_text.insert(tk.END, line + "\n", tag)
+        if not lines:
+            self.preview_text.insert(tk.END, "No differences.")
+        self.preview_text.edit_modified(False)
+        self.preview_text.config(state="disabled")
+        self.preview_diff = True
+
+    def show_history_window(self):
+        """Lists the saved revisions of the previewed resource, to compare with or restore."""
+        if self.selected_resource is None:
+            messagebox.showerror("Error", "No resource is selected.")
+            return
+        resource = self.selected_resource
+        store = self.store
+
+        if self.history_window is None or not self.history_window.winfo_exists():
+            self.history_window = tk.Toplevel(self.root)
+            self.history_window.protocol("WM_DELETE_WINDOW", self.close_history_window)
+            frame = tk.Frame(self.history_window, padx=10, pady=10)
+            frame.pack(expand=True, fill="both")
+            self.history_listbox = tk.Listbox(frame, width=50, height=15, borderwidth=1, relief="sunken")
+            self.history_listbox.pack(expand=True, fill="both", pady=5)
+            self.history_listbox.bind("<Double-Button-1>", lambda event: self.compare_with_revision())
+            button_frame = tk.Frame(frame)
+            button_frame.pack(pady=5)
+            tk.Button(button_frame, text="Compare with Current", command=self.compare_with_revision).pack(side="left", padx=5)
+            tk.Button(button_frame, text="Restore into Preview", command=self.restore_revision).pack(side="left", padx=5)
+            tk.Button(button_frame, text="Close", command=self.close_history_window).pack(side="left", padx=5)
+
+        self.history_window.title(f"History: {resource[1]}")
+        self.history_resource = resource
+        self.history_revisions = []
+        self.history_listbox.delete(0, tk.END)
+        self.history_window.lift()
+
+        def on_done(revisions):
+            if self.history_resource != resource or not self.history_window.winfo_exists():
+                return
+            self.history_revisions = [rev for rev, _, _ in revisions]
+            for rev, created, size in revisions:
+                when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))
+                self.history_listbox.insert(tk.END, f"#{rev}   {when}   {size} characters")
+            if not revisions:
+                self.history_listbox.insert(tk.END, "No revisions saved yet.")
+
+        self.io.submit(store.history.revisions, *resource, key="history",
+                       on_done=on_done, on_error=self.io_error("Could not read the history", store))
+
+    def close_history_window(self):
+        """Closes the revision list and puts the resource back into the Preview Window if it shows a diff."""
+        self.history_window.destroy()
+        if self.preview_diff and self.selected_resource is not None:
+            self.show_resource_preview(*self.selected_resource)
+
+    def selected_revision(self):
+        """Returns the revision chosen in the History window, or None after telling the user to pick one."""
+        selection = self.history_listbox.curselection()
+        if not selection or selection[0] >= len(self.history_revisions):
+            messagebox.showerror("Error", "Select a revision first.")
+            return None
+        if self.history_resource != self.selected_resource:
+            messagebox.showerror("Error", "The Preview Window shows another resource now.")
+            return None
+        return self.history_revisions[selection[0]]
+
+    def compare_with_revision(self):
+        """Shows in the Preview Window what changed between the chosen revision and the saved resource."""
+        rev = self.selected_revision()
+        if rev is None:
+            return
+        if self.preview_has_edits() and not messagebox.askyesno(
+                "Unsaved Changes", "The Preview Window has unsaved changes. Discard them to show the differences?"):
+            return
+        resource = self.history_resource
+        store = self.store
+
+        def compare():
+            old = store.history.get(*resource, rev)
+            current = store.read(*resource)
+            return diff_lines(old, current, f"revision {rev}", "current"), content_version(current)
+
+        def on_done(result):
+            if self.project_screen_is_showing(store) and self.selected_resource == resource:
+                lines, self.preview_version = result
+                self.show_preview_diff(lines)
+
+        self.io.submit(compare, key="preview", on_done=on_done, on_error=self.io_error("Could not compare", store))
+
+    def restore_revision(self):
+        """Loads the chosen revision into the Preview Window, to be saved with Update."""
+        rev = self.selected_revision()
+        if rev is None:
+            return
+        if self.preview_has_edits() and not messagebox.askyesno(
+                "Unsaved Changes", "The Preview Window has unsaved changes. Replace them with the revision?"):
+            return
+        resource = self.history_resource
+        store = self.store
+
+        def on_done(content):
+            if self.project_screen_is_showing(store) and self.selected_resource == resource:
+                self.clear_preview(keep_header=True)
+                # Counts as an edit: Update saves it, checked against the version loaded before
+                self.load_preview_text(content, modified=True)
+
+        self.io.submit(store.history.get, *resource, rev, key="preview",
+                       on_done=on_done, on_error=self.io_error("Could not read the revision", store))
+
+    def show_search_results(self, query, results):
+        """Lists search results in a popup; selecting one previews it, double-clicking remixes it."""
+        self.show_resource_list(f"Search: {query}", f"{len(results)} result(s) for '{query}'",
+                                [(resource_type, name) for _, resource_type, name in results])
+
+    def show_resource_list(self, title, summary, resources):
+        """Lists (resource_type, name) pairs in the results popup shared by search and links."""
+        if self.search_window is None or not self.search_window.winfo_exists():
+            self.search_window = tk.Toplevel(self.root)
+            frame = tk.Frame(self.search_window, padx=10, pady=10)
+            frame.pack(expand=True, fill="both")
+            self.search_summary_label = tk.Label(frame, anchor="w")
+            self.search_summary_label.pack(fill="x")
+            self.search_results_listbox = tk.Listbox(frame, width=60, height=20, borderwidth=1, relief="sunken")
+            self.search_results_listbox.pack(expand=True, fill="both", pady=5)
+            self.search_results_listbox.bind("<<ListboxSelect>>", lambda event: self.on_search_result(event, remix=False))
+            self.search_results_listbox.bind("<Double-Button-1>", lambda event: self.on_search_result(event, remix=True))
+            tk.Button(frame, text="Close", command=self.search_window.destroy).pack(pady=5)
+
+        self.search_window.title(title)
+        self.search_summary_label.config(text=summary)
+        self.search_results = list(resources)
+        self.search_results_listbox.delete(0, tk.END)
+        for resource_type, name in self.search_results:
+            self.search_results_listbox.insert(tk.END, f"{name} ({resource_type.title()})")
+        self.search_window.lift()
+
+    def on_search_result(self, event, remix):
+        """Previews or remixes the search result under the selection."""
+        if self.search_results_listbox.curselection():
+            index = self.search_results_listbox.curselection()[0]
+            resource_type, resource_name = self.search_results[index]
+            if remix:
+                self.append_to_remix(resource_type, resource_name)
+            else:
+                self.catalogs[resource_type].select(resource_name)
+                self.show_resource_preview(resource_type, resource_name)
 
     def show_resource_context_menu(self, event, resource_type):
         """Displays a right-click context menu for renaming and deleting a resource."""
@@ -440,59 +2116,116 @@ class NarrativeGuruApp:
                                       command=lambda: self.show_rename_modal(resource_to_act_on, "resource", resource_type))
             context_menu.add_command(label="Delete", 
                                       command=lambda: self.delete_resource(resource_to_act_on, resource_type))
+            context_menu.add_separator()
+            context_menu.add_command(label="Add with Links to Remix",
+                                     command=lambda: self.append_to_remix(resource_type, resource_to_act_on, True))
+            context_menu.add_command(label="Linked From...",
+                                     command=lambda: self.show_backlinks(resource_type, resource_to_act_on))
             context_menu.post(event.x_root, event.y_root)
+
+    def show_backlinks(self, resource_type, name):
+        """Lists the resources linking to a resource, from the relation index."""
+        if self.relation_index is None:
+            if self.relation_changes is None:
+                self.build_relation_index()
+            messagebox.showinfo("Please Wait", "The links between resources are still being read. "
+                                               "Try again in a moment.")
+            return
+        sources = self.relation_index.backlinks(resource_type, name)
+        self.show_resource_list(f"Linked from: {name}", f"{len(sources)} resource(s) link to '{name}'", sources)
             
     def delete_resource(self, resource_name, resource_type):
         """Deletes a resource file after confirmation."""
         singular_type = "piece of clothing" if resource_type == "clothing" else resource_type.rstrip('s')
         
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete the {singular_type} '{resource_name}'?"):
-            file_path = os.path.join(self.project_path, self.current_project, resource_type, f"{resource_name}.json")
-            try:
-                os.remove(file_path)
+            store = self.store
+
+            def on_done(_):
+                self.update_search_index(store, "remove", resource_type, resource_name)
+                self.update_relation_index(store, "remove", resource_type, resource_name)
+                self.forget_remix_source(store, (resource_type, resource_name))
+                if not self.project_screen_is_showing(store):
+                    return
                 
                 # Clear preview/selection if the selected resource was deleted
-                if hasattr(self, 'selected_resource_path') and self.selected_resource_path == file_path:
-                    del self.selected_resource_path
-                    self.preview_text.delete("1.0", tk.END)
+                if self.selected_resource == (resource_type, resource_name):
+                    self.selected_resource = None
+                    self.clear_preview()
                     
                 messagebox.showinfo("Success", f"{singular_type.capitalize()} '{resource_name}' deleted.")
-                self.populate_resource_lists()
-            except OSError as e:
-                messagebox.showerror("Error", f"Failed to delete resource: {e}")
+                self.catalogs[resource_type].remove(resource_name)
+
+            self.io.submit(store.delete, resource_type, resource_name, serial=True,
+                           on_done=on_done, on_error=self.io_error("Failed to delete resource"))
 
     def update_resource_content(self):
         """Saves the content from the Preview Window back to the JSON file."""
-        if not hasattr(self, 'selected_resource_path'):
+        if self.selected_resource is None:
             messagebox.showerror("Error", "No resource is selected to update.")
             return
+        if self.preview_diff:
+            messagebox.showerror("Error", "The Preview Window shows differences. Close the History window to edit "
+                                 "the resource again.")
+            return
+        if self.preview_load_job is not None:
+            messagebox.showinfo("Update", "The resource is still being loaded into the Preview Window.")
+            return
 
         new_content = self.preview_text.get("1.0", tk.END).strip()
-        try:
-            with open(self.selected_resource_path, 'w', encoding='utf-8') as f:
-                # The format is a simple JSON object with a 'content' key
-                json.dump({"content": new_content}, f, indent=4)
+        resource = self.selected_resource
+        store = self.store
+        expected_version = self.preview_version
+
+        def save():
+            # Refused if someone else saved the resource after it was loaded into the preview
+            store.write(*resource, new_content, expected_version)
+            return content_version(new_content)
+
+        def on_done(version):
+            self.update_search_index(store, "add", *resource, new_content)
+            self.forget_remix_source(store, resource)
+            if self.store is store and self.selected_resource == resource:
+                self.preview_version = version
             messagebox.showinfo("Success", "Resource content updated successfully.")
-        except IOError as e:
-            messagebox.showerror("Error", f"Failed to save changes: {e}")
+
+        def on_error(e):
+            if isinstance(e, ConflictError):
+                messagebox.showerror("Changed Meanwhile",
+                                     f"'{resource[1]}' was changed by someone else after you opened it, so your changes "
+                                     "were not saved. They are still in the Preview Window: copy them, then select the "
+                                     "resource again to see the other version.")
+            else:
+                self.io_error("Failed to save changes")(e)
+
+        self.io.submit(save, serial=True, on_done=on_done, on_error=on_error)
 
     def export_remix_to_file(self):
-        """Saves the content of the Remix Station to a new text file."""
-        remix_content = self.remix_text.get("1.0", tk.END).strip()
-        if not remix_content:
+        """
+        Saves the content of the Remix Station to a text, Markdown, JSON Lines or zip file.
+
+        Unless the remix was edited by hand, it is streamed straight from the
+        project's resources instead of being copied out of the Text widget.
+        """
+        if self.remix_text.compare("end-1c", "==", "1.0"):
             messagebox.showinfo("Export", "Remix Station is empty. Nothing to export.")
             return
 
-        file_path = filedialog.asksaveasfilename(defaultextension=".txt",
-                                                filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")],
+        file_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=EXPORT_FILE_TYPES,
                                                 initialfile="remix.txt")
-        if file_path:
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(remix_content)
-                messagebox.showinfo("Success", f"Content exported to '{os.path.basename(file_path)}' successfully.")
-            except IOError as e:
-                messagebox.showerror("Error", f"Failed to export file: {e}")
+        if not file_path:
+            return
+        on_done = lambda _: messagebox.showinfo("Success", f"Content exported to '{os.path.basename(file_path)}' successfully.")
+        on_error = self.io_error("Failed to export file")
+
+        if self.remix_items and self.remix_budget is None and not self.remix_text.edit_modified():
+            self.io.submit(export_resources, self.store, list(self.remix_items), file_path, None, None,
+                           self.remix_header_format, serial=True, on_done=on_done, on_error=on_error)
+        elif export_format_for(file_path) == "txt":
+            remix_content = self.remix_text.get("1.0", tk.END).strip()
+            self.io.submit(write_text_file, file_path, remix_content, serial=True, on_done=on_done, on_error=on_error)
+        else:
+            messagebox.showerror("Error", "The Remix Station was edited by hand, so it can only be exported as a text file.")
 
     def copy_to_clipboard(self, text_widget):
         """Copies the content of a text widget to the clipboard."""
@@ -539,21 +2272,187 @@ class NarrativeGuruApp:
             messagebox.showerror("Error", "Resource name cannot be empty.")
             return
 
-        file_path = os.path.join(self.project_path, self.current_project, resource_type, f"{resource_name}.json")
         singular_type = "piece of clothing" if resource_type == "clothing" else resource_type.rstrip('s')
 
-        if os.path.exists(file_path):
-            messagebox.showerror("Error", f"A {singular_type} with that name already exists.")
-            return
+        store = self.store
 
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump({"content": resource_content}, f, indent=4)
+        def create():
+            if store.exists(resource_type, resource_name):
+                raise FileExistsError(f"A {singular_type} with that name already exists.")
+            store.create(resource_type, resource_name, resource_content)
+
+        def on_done(_):
+            self.update_search_index(store, "add", resource_type, resource_name, resource_content)
+            if not self.project_screen_is_showing(store):
+                return
             messagebox.showinfo("Success", f"{singular_type.capitalize()} created successfully.")
             self.new_resource_window.destroy()
+            self.catalogs[resource_type].insert(resource_name)
+
+        self.io.submit(create, serial=True, on_done=on_done, on_error=self.io_error("Failed to create resource"))
+
+    def show_import_window(self):
+        """Displays a popup for importing a folder, zip archive or JSON Lines file of resources."""
+        self.import_window = tk.Toplevel(self.root)
+        self.import_window.title("Import Resources")
+        self.import_window.grab_set()
+
+        frame = tk.Frame(self.import_window, padx=20, pady=20)
+        frame.pack()
+
+        tk.Label(frame, text="Folder, zip archive or JSON Lines file to import:").pack(anchor="w", pady=5)
+        source_frame = tk.Frame(frame)
+        source_frame.pack(fill="x")
+        self.import_source_entry = tk.Entry(source_frame, width=45)
+        self.import_source_entry.pack(side="left")
+
+        def browse(folder):
+            if folder:
+                path = filedialog.askdirectory(parent=self.import_window)
+            else:
+                path = filedialog.askopenfilename(parent=self.import_window, filetypes=[
+                    ("Resource files", "*.zip *.jsonl *.ndjson *.json"), ("All files", "*.*")])
+            if path:
+                self.import_source_entry.delete(0, tk.END)
+                self.import_source_entry.insert(0, path)
+
+        tk.Button(source_frame, text="Folder...", command=lambda: browse(True)).pack(side="left", padx=(5, 0))
+        tk.Button(source_frame, text="File...", command=lambda: browse(False)).pack(side="left", padx=(5, 0))
+
+        # Resources whose category is not given by their folder or their "type" field go here
+        tk.Label(frame, text="Category for resources that do not name one:").pack(anchor="w", pady=(10, 5))
+        self.import_type_combo = ttk.Combobox(frame, state="readonly", values=[t.capitalize() for t in RESOURCE_TYPES])
+        self.import_type_combo.current(0)
+        self.import_type_combo.pack(anchor="w")
+
+        tk.Label(frame, text="When a resource with the same name exists:").pack(anchor="w", pady=(10, 5))
+        self.import_policy_var = tk.StringVar(value="skip")
+        labels = {"skip": "Keep the existing one", "rename": "Import under a new name", "replace": "Replace it"}
+        for policy in DUPLICATE_POLICIES:
+            tk.Radiobutton(frame, text=labels[policy], variable=self.import_policy_var, value=policy).pack(anchor="w")
+
+        button_frame = tk.Frame(frame)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Import", command=self.import_into_project).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Cancel", command=self.import_window.destroy).pack(side="left", padx=5)
+
+    def import_into_project(self):
+        """Imports the chosen source into the open project in one batch."""
+        source = self.import_source_entry.get().strip()
+        if not source or not os.path.exists(source):
+            messagebox.showerror("Error", "Choose a folder or file to import.", parent=self.import_window)
+            return
+        default_type = RESOURCE_TYPES[self.import_type_combo.current()]
+        policy = self.import_policy_var.get()
+        self.import_window.destroy()
+
+        store = self.store
+        window, _ = self.show_progress_window("Importing Resources", f"Importing '{os.path.basename(source)}'...")
+
+        def on_done(report):
+            window.destroy()
+            for resource_type, name, content in report.imported:
+                self.update_search_index(store, "add", resource_type, name, content)
+                self.forget_remix_source(store, (resource_type, name))
+            if not self.project_screen_is_showing(store):
+                return
+            # One catalog refresh for the whole batch
             self.populate_resource_lists()
-        except IOError as e:
-            messagebox.showerror("Error", f"Failed to create resource: {e}")
+            messagebox.showinfo("Import Finished", report.summary())
+
+        def on_error(e):
+            window.destroy()
+            self.io_error("Failed to import resources", store)(e)
+
+        self.io.submit(import_resources, store, [source], default_type, policy, serial=True,
+                       on_done=on_done, on_error=on_error)
+
+    def show_library_window(self):
+        """Displays a popup for linking resources of another project into the open one."""
+        if is_packed_project(self.store.project_dir):
+            messagebox.showerror("Error", "Libraries only work between projects in the folder layout.")
+            return
+        libraries = [project for project in list_projects(self.project_path) if project != self.current_project
+                     and not is_packed_project(os.path.join(self.project_path, project))]
+        if not libraries:
+            messagebox.showinfo("Add from Library", "There is no other folder project to use as a library.")
+            return
+        self.library_window = tk.Toplevel(self.root)
+        self.library_window.title("Add from Library")
+        self.library_window.grab_set()
+
+        frame = tk.Frame(self.library_window, padx=20, pady=20)
+        frame.pack()
+
+        tk.Label(frame, text="Library project:").pack(anchor="w", pady=5)
+        self.library_combo = ttk.Combobox(frame, state="readonly", values=libraries)
+        self.library_combo.current(0)
+        self.library_combo.pack(anchor="w")
+
+        tk.Label(frame, text="Category:").pack(anchor="w", pady=(10, 5))
+        self.library_type_combo = ttk.Combobox(frame, state="readonly", values=[t.capitalize() for t in RESOURCE_TYPES])
+        self.library_type_combo.current(0)
+        self.library_type_combo.pack(anchor="w")
+
+        tk.Label(frame, text="Resources to link (they follow the library until edited here):").pack(
+            anchor="w", pady=(10, 5))
+        self.library_listbox = tk.Listbox(frame, width=45, height=12, selectmode=tk.EXTENDED)
+        self.library_listbox.pack(fill="both", expand=True)
+
+        def list_names(library, resource_type):
+            library_store = open_resource_store(os.path.join(self.project_path, library))
+            try:
+                return library_store.list_names(resource_type)
+            finally:
+                library_store.close()
+
+        def fill(names):
+            if self.library_window.winfo_exists():
+                self.library_listbox.delete(0, tk.END)
+                if names:
+                    self.library_listbox.insert(tk.END, *names)
+
+        def list_library(event=None):
+            self.io.submit(list_names, self.library_combo.get(), RESOURCE_TYPES[self.library_type_combo.current()],
+                           key="library", on_done=fill, on_error=self.io_error("Could not read the library"))
+
+        self.library_combo.bind("<<ComboboxSelected>>", list_library)
+        self.library_type_combo.bind("<<ComboboxSelected>>", list_library)
+        list_library()
+
+        button_frame = tk.Frame(frame)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Link", command=self.link_library_resources).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Cancel", command=self.library_window.destroy).pack(side="left", padx=5)
+
+    def link_library_resources(self):
+        """Links the resources selected in the library window into the open project."""
+        resource_type = RESOURCE_TYPES[self.library_type_combo.current()]
+        names = [self.library_listbox.get(index) for index in self.library_listbox.curselection()]
+        if not names:
+            messagebox.showerror("Error", "Select the resources to link.", parent=self.library_window)
+            return
+        library = self.library_combo.get()
+        items = [(resource_type, name) for name in names]
+        self.library_window.destroy()
+        store = self.store
+
+        def on_done(_):
+            for item in items:
+                self.forget_remix_source(store, item)
+            self.reread_changed_resources(store, items)
+            if not self.project_screen_is_showing(store):
+                return
+            self.populate_listbox(resource_type)
+            messagebox.showinfo("Success", f"{len(items)} resource(s) linked from '{library}'.")
+
+        self.io.submit(link_from_library, self.project_path, store.project_dir, library, items, serial=True,
+                       on_done=on_done, on_error=self.io_error("Failed to link resources", store))
+
+def count_widgets(widget):
+    """Returns the number of widgets in a widget's tree, itself included."""
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
 
 # Entry point of the application
 if __name__ == "__main__":
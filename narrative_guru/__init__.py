@@ -0,0 +1,28 @@
+"""
+NarrativeGuru storage and remix logic, usable without the Tk window.
+
+The app (narrative-guru.py) is built on this package; scripts can import it
+directly or use the command line interface (python -m narrative_guru).
+"""
+
+from .storage import (
+    RESOURCE_TYPES, ResourceStore, PackedResourceStore, open_resource_store, create_project,
+    is_packed_project, pack_project, unpack_project, list_projects, ConflictError, content_version, RemixTemplates,
+)
+from .search import SearchIndex
+from .remix import (
+    DEFAULT_HEADER_FORMAT, HEADER_FORMATS, format_remix_header, format_remix_block, iter_remix_blocks, write_remix,
+    resolve_header_format,
+)
+from .importer import ImportReport, import_resources
+from .export import EXPORT_FORMATS, export_resources, export_project
+from .tokens import TokenCounter, count_tokens, fit_to_budget
+from .watcher import ProjectWatcher, WatchEvent
+from .server import WorkspaceServer, serve
+from .client import RemoteWorkspace, RemoteResourceStore, RemoteTemplates
+from .history import ResourceHistory, diff_lines
+from .schema import HEADER_FIELDS, encode_resource, decode_resource, resource_header
+from .relations import RelationIndex, expand_links, rename_references
+from .blobs import BlobStore, link_from_library, refresh_library_links
+from .manifest import ProjectManifest
+from .bundles import BundleCache, render_bundle
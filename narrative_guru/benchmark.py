@@ -0,0 +1,243 @@
+"""
+Benchmarks of project storage and the work behind the app's refresh paths.
+
+Generates synthetic projects in both layouts and times the storage calls the
+window makes, headlessly, printing the results as JSON:
+
+    python -m narrative_guru.benchmark --sizes 1000,10000,100000 -o results.json
+    python -m narrative_guru.benchmark --compare results.json
+
+Operations are named after the app method they stand for:
+
+    populate_projects_list   listing the workspace's projects
+    populate_listbox         listing a category on a freshly opened project
+    on_resource_select       reading a resource, first time and again (cached)
+    create/rename/delete     the resource context menu operations
+    export_remix_to_file     streaming a remix of 50 resources to a file
+    export_project           streaming the whole project into a zip file
+    search                   building the search index, then one query
+
+Resource sizes vary like real projects: mostly short AI exports, some longer
+descriptions and a few very large lore documents.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+
+from .storage import RESOURCE_TYPES, create_project, open_resource_store, list_projects
+from .search import SearchIndex
+from .export import export_project, export_resources
+
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_REPEAT = 20
+DEFAULT_SEED = 1
+REMIX_SIZE = 50
+# (share of resources, smallest and largest content in characters)
+CONTENT_SIZES = ((0.9, 200, 2000), (0.095, 2000, 10000), (0.005, 50000, 250000))
+WORDS = ("the", "old", "sailor", "village", "storm", "red", "cloak", "tavern", "lantern", "sword", "quiet",
+         "forest", "queen", "river", "secret", "map", "night", "harbor", "silver", "scar", "laughs", "remembers")
+
+
+class ContentMaker:
+    """Makes JSON resource bodies of a given size, like AI exports, from a shared pool of text."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        largest = max(size for _, _, size in CONTENT_SIZES)
+        self.pool = " ".join(rng.choices(WORDS, k=largest // 3))
+
+    def make(self, chars):
+        start = self.rng.randrange(len(self.pool) - chars)
+        return json.dumps({"name": self.rng.choice(WORDS).title(), "age": self.rng.randint(16, 90),
+                           "description": self.pool[start:start + chars]}, indent=4)
+
+
+def make_project(project_dir, size, packed, seed):
+    """Creates a project with size resources spread over the categories; returns the names per category."""
+    rng = random.Random(seed)
+    contents = ContentMaker(rng)
+    create_project(project_dir, packed=packed)
+    names = {resource_type: [] for resource_type in RESOURCE_TYPES}
+    items = []
+    for index in range(size):
+        resource_type = RESOURCE_TYPES[index % len(RESOURCE_TYPES)]
+        share = rng.random()
+        for weight, smallest, largest in CONTENT_SIZES:
+            if share < weight:
+                break
+            share -= weight
+        name = f"{rng.choice(WORDS).title()} {index}"
+        names[resource_type].append(name)
+        items.append((resource_type, name, contents.make(rng.randint(smallest, largest))))
+    store = open_resource_store(project_dir)
+    try:
+        # Batches keep the memory of the largest projects in check
+        for start in range(0, len(items), 5000):
+            store.write_many(items[start:start + 5000])
+    finally:
+        store.close()
+    return names
+
+
+def measure(func, repeat):
+    """Calls func repeat times and returns the timings in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+class Results:
+    """Collects timings as result records."""
+
+    def __init__(self):
+        self.records = []
+
+    def add(self, layout, size, operation, timings):
+        record = {"layout": layout, "resources": size, "operation": operation, "repeat": len(timings),
+                  "median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3),
+                  "max_ms": round(max(timings), 3)}
+        self.records.append(record)
+        print(f"{layout:>6} {size:>7} {operation:<32} {record['median_ms']:>10.3f} ms", file=sys.stderr)
+
+
+def bench_project(results, workdir, size, packed, repeat, seed):
+    """Times every operation on one synthetic project."""
+    layout = "packed" if packed else "folder"
+    project_dir = os.path.join(workdir, f"{layout}-{size}")
+    start = time.perf_counter()
+    names = make_project(project_dir, size, packed, seed)
+    results.add(layout, size, "generate (write_many)", [(time.perf_counter() - start) * 1000])
+
+    rng = random.Random(seed)
+    contents = ContentMaker(rng)
+    results.add(layout, size, "populate_projects_list", measure(lambda: list_projects(workdir), repeat))
+
+    def list_cold():
+        store = open_resource_store(project_dir)
+        store.list_names("characters")
+        store.close()
+
+    results.add(layout, size, "populate_listbox (cold)", measure(list_cold, repeat))
+    store = open_resource_store(project_dir)
+    try:
+        store.list_names("characters")
+        results.add(layout, size, "populate_listbox (cached)", measure(lambda: store.list_names("characters"), repeat))
+
+        picks = [(resource_type, rng.choice(names[resource_type])) for resource_type in
+                 rng.choices(RESOURCE_TYPES, k=repeat)]
+        picked = iter(picks)
+        results.add(layout, size, "on_resource_select (first read)", measure(lambda: store.read(*next(picked)), repeat))
+        picked = iter(picks)
+        results.add(layout, size, "on_resource_select (cached)", measure(lambda: store.read(*next(picked)), repeat))
+
+        bodies = [contents.make(2000) for _ in range(repeat)]
+        created = iter(range(repeat))
+        results.add(layout, size, "create_new_resource",
+                    measure(lambda: store.create("props", f"Bench {next(created)}", bodies.pop()), repeat))
+
+        renamed = iter(range(repeat))
+
+        def rename():
+            number = next(renamed)
+            store.rename("props", f"Bench {number}", f"Renamed {number}")
+
+        results.add(layout, size, "rename_resource", measure(rename, repeat))
+        deleted = iter(range(repeat))
+        results.add(layout, size, "delete_resource",
+                    measure(lambda: store.delete("props", f"Renamed {next(deleted)}"), repeat))
+
+        remix = [(resource_type, rng.choice(names[resource_type]))
+                 for resource_type in rng.choices(RESOURCE_TYPES, k=REMIX_SIZE)]
+        export_path = os.path.join(workdir, "remix.txt")
+        results.add(layout, size, "export_remix_to_file",
+                    measure(lambda: export_resources(store, remix, export_path), repeat))
+        zip_path = os.path.join(workdir, "project.zip")
+        results.add(layout, size, "export_project (zip)",
+                    measure(lambda: export_project(store, zip_path), max(1, repeat // 10)))
+
+        index = SearchIndex(store)
+        results.add(layout, size, "search (build index)", measure(index.build, 1))
+        results.add(layout, size, "search (query)", measure(lambda: index.search("silver lantern"), repeat))
+    finally:
+        store.close()
+        shutil.rmtree(project_dir, ignore_errors=True)
+
+
+def compare(records, baseline_path):
+    """Prints how the median timings changed against an earlier results file."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r["layout"], r["resources"], r["operation"]): r for r in json.load(f)["results"]}
+    print(f"{'layout':>6} {'size':>7} {'operation':<32} {'before':>10} {'after':>10} {'change':>8}", file=sys.stderr)
+    for record in records:
+        before = baseline.get((record["layout"], record["resources"], record["operation"]))
+        if before is None or not before["median_ms"]:
+            continue
+        change = (record["median_ms"] / before["median_ms"] - 1) * 100
+        print(f"{record['layout']:>6} {record['resources']:>7} {record['operation']:<32} "
+              f"{before['median_ms']:>10.3f} {record['median_ms']:>10.3f} {change:>+7.1f}%", file=sys.stderr)
+
+
+def build_parser():
+    """Returns the argument parser of the benchmark runner."""
+    parser = argparse.ArgumentParser(prog="python -m narrative_guru.benchmark",
+                                     description="Time NarrativeGuru storage on synthetic projects.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated project sizes in resources (default: %(default)s)")
+    parser.add_argument("--layout", choices=("folder", "packed", "both"), default="both")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="samples per operation (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workdir", help="where to generate the projects (default: a temporary folder)")
+    parser.add_argument("--label", help="name of this run, e.g. a version, stored in the results")
+    parser.add_argument("-o", "--output", default="-", help="results file (default: standard output)")
+    parser.add_argument("--compare", metavar="FILE", help="earlier results to compare against")
+    return parser
+
+
+def main(argv=None):
+    """Runs the benchmarks and writes the results. Returns the exit status."""
+    args = build_parser().parse_args(argv)
+    try:
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    except ValueError:
+        print("benchmark: --sizes must be numbers", file=sys.stderr)
+        return 1
+    if args.repeat < 1 or any(size < len(RESOURCE_TYPES) for size in sizes):
+        print(f"benchmark: --repeat must be at least 1 and sizes at least {len(RESOURCE_TYPES)}", file=sys.stderr)
+        return 1
+    layouts = {"folder": [False], "packed": [True], "both": [False, True]}[args.layout]
+
+    workdir = tempfile.mkdtemp(prefix="narrative-guru-bench-", dir=args.workdir)
+    results = Results()
+    try:
+        for size in sizes:
+            for packed in layouts:
+                bench_project(results, workdir, size, packed, args.repeat, args.seed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"label": args.label, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "platform": platform.platform(), "seed": args.seed, "results": results.records}
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results.records, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
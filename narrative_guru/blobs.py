@@ -0,0 +1,371 @@
+"""
+Sharing identical resources between projects.
+
+Projects stay plain folders of JSON files, but a resource file that is the
+same in several projects can be one file on disk. The workspace's blob store
+(the .blobs folder next to the projects) holds one hard link per distinct
+file content, named by the SHA-1 of its bytes, and every project copy of that
+content is another hard link to the same file. Shared resources are stored
+once, copying a project only creates links, and the body cache (see
+storage.BodyCache, keyed by file rather than by path) parses them once for
+every project that holds them.
+
+The app always writes a resource by replacing its file (see atomic_write), so
+editing a shared resource gives the edited project a file of its own and
+leaves the other copies alone. Tools that edit files in place would change
+every copy at once.
+
+A project can also link resources from another project used as a library,
+e.g. a wardrobe reused by every story. The links are listed in the project's
+.library-links.json; refresh_library_links(), run whenever the project is
+opened, brings them up to the library's latest version unless they were
+edited in the project meanwhile, which detaches them from the library.
+
+Hard links only work within one file system; where they are not supported
+the files are copied instead and nothing is shared.
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+
+from . import instrument
+from .history import HISTORY_DB_NAME
+from .manifest import MANIFEST_DB_NAME
+from .bundles import BUNDLES_DIR_NAME
+from .storage import (
+    RESOURCE_TYPES, PACKED_DB_NAME, JOURNAL_NAME, TEMP_SUFFIX, temp_path_for, atomic_write, fsync_directory,
+    is_packed_project, check_resource_name,
+)
+
+BLOBS_DIR_NAME = ".blobs"
+LIBRARY_LINKS_NAME = ".library-links.json"
+# Files of a project that belong to that project alone and are never copied (nor their SQLite journals)
+PROJECT_PRIVATE_FILES = (HISTORY_DB_NAME, MANIFEST_DB_NAME, JOURNAL_NAME, LIBRARY_LINKS_NAME, BUNDLES_DIR_NAME)
+
+
+def file_digest(file_path):
+    """Returns the SHA-1 of a file's bytes, the name of its blob."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _same_file(stat, other):
+    return (stat.st_dev, stat.st_ino) == (other.st_dev, other.st_ino)
+
+
+def _replace_with_link(source_path, file_path):
+    """Makes file_path a hard link to source_path in one step, so readers never see it missing."""
+    tmp_path = temp_path_for(file_path)
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    os.link(source_path, tmp_path)
+    os.replace(tmp_path, file_path)
+
+
+class BlobStore:
+    """The .blobs folder of a workspace, holding one file per distinct resource file content."""
+
+    def __init__(self, root):
+        self.root = root
+        self.blobs_dir = os.path.join(root, BLOBS_DIR_NAME)
+
+    def blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], f"{digest[2:]}.json")
+
+    def share(self, file_path, digest=None):
+        """
+        Makes a resource file a link to the blob of its content, adding the
+        blob if the content is new. Returns (digest, bytes saved): the file's
+        size if an existing blob took its place, 0 otherwise.
+
+        Raises OSError where the file system has no hard links.
+        """
+        stat = os.stat(file_path)
+        if digest is None:
+            digest = file_digest(file_path)
+        blob_path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        try:
+            os.link(file_path, blob_path)
+            return digest, 0
+        except FileExistsError:
+            pass
+        blob_stat = os.stat(blob_path)
+        if _same_file(stat, blob_stat):
+            return digest, 0
+        if blob_stat.st_size != stat.st_size or file_digest(blob_path) != digest:
+            # The blob was edited in place by some tool; this file becomes the blob instead
+            _replace_with_link(file_path, blob_path)
+            return digest, 0
+        current = os.stat(file_path)
+        if not _same_file(stat, current) or current.st_mtime_ns != stat.st_mtime_ns:
+            return digest, 0  # Written meanwhile; its new content is left alone
+        _replace_with_link(blob_path, file_path)
+        return digest, stat.st_size
+
+    def link_into(self, source_path, file_path):
+        """
+        Places a copy of a resource file at file_path, as a link to its blob
+        where hard links work and as a plain copy elsewhere. Returns the
+        digest of the copied content.
+        """
+        try:
+            digest, _ = self.share(source_path)
+            _replace_with_link(self.blob_path(digest), file_path)
+            return digest
+        except OSError:
+            if not os.path.exists(source_path):
+                raise
+        # No hard links here (or across these folders)
+        digest = file_digest(source_path)
+        tmp_path = temp_path_for(file_path)
+        shutil.copy2(source_path, tmp_path)
+        os.replace(tmp_path, file_path)
+        return digest
+
+    def copy_project(self, src_dir, dst_dir, progress=None):
+        """
+        Copies a project to a new folder. Resource files of the folder layout
+        are linked to their blobs rather than copied; a packed project's
+        database is copied whole. The history, manifest, write journal and
+        library links stay with the original. The copy appears under its name
+        only once it is complete. progress, if given, is called as
+        progress(done, total).
+        """
+        if os.path.exists(dst_dir):
+            raise FileExistsError(f"A project named '{os.path.basename(dst_dir)}' already exists.")
+        parent, name = os.path.split(dst_dir)
+        tmp_dir = os.path.join(parent, f".{name}{TEMP_SUFFIX}")
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        with instrument.timed("blobs.copy_project"):
+            os.makedirs(tmp_dir)
+            try:
+                self._copy_project_files(src_dir, tmp_dir, progress)
+                os.rename(tmp_dir, dst_dir)
+            except BaseException:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+        fsync_directory(parent)
+
+    def _copy_project_files(self, src_dir, dst_dir, progress):
+        resource_files = []
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                dst_path = os.path.join(dst_dir, entry.name)
+                if entry.name.startswith(PROJECT_PRIVATE_FILES) or entry.name.endswith(TEMP_SUFFIX) or (
+                        entry.name.startswith(PACKED_DB_NAME) and entry.name != PACKED_DB_NAME):
+                    continue  # the packed database's journal is part of the backup below
+                if entry.name in RESOURCE_TYPES and entry.is_dir():
+                    os.makedirs(dst_path)
+                    with os.scandir(entry.path) as files:
+                        resource_files.extend((f.path, os.path.join(dst_path, f.name)) for f in files
+                                              if f.name.endswith('.json') and not f.name.startswith('.')
+                                              and f.is_file())
+                elif entry.name == PACKED_DB_NAME:
+                    # The backup API copies a consistent snapshot even while the project is open
+                    src = sqlite3.connect(entry.path)
+                    dst = sqlite3.connect(dst_path)
+                    try:
+                        src.backup(dst)
+                    except sqlite3.Error as e:
+                        raise OSError(f"Could not copy packed project: {e}") from e
+                    finally:
+                        dst.close()
+                        src.close()
+                elif entry.is_dir():
+                    shutil.copytree(entry.path, dst_path)
+                else:
+                    shutil.copy2(entry.path, dst_path)
+        for done, (src_path, dst_path) in enumerate(resource_files, 1):
+            self.link_into(src_path, dst_path)
+            if progress is not None and (done % 100 == 0 or done == len(resource_files)):
+                progress(done, len(resource_files))
+
+    def dedupe(self, project_dirs, progress=None):
+        """
+        Turns identical resource files of the given folder projects into links
+        to one blob. Only files whose size matches another file (or a blob) are
+        read. Returns (files now shared, bytes saved).
+        """
+        files = []
+        sizes = {}
+        for project_dir in project_dirs:
+            if is_packed_project(project_dir):
+                continue
+            for resource_type in RESOURCE_TYPES:
+                resource_dir = os.path.join(project_dir, resource_type)
+                if not os.path.isdir(resource_dir):
+                    continue
+                with os.scandir(resource_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.json') and not entry.name.startswith('.') and entry.is_file():
+                            stat = entry.stat()
+                            files.append((entry.path, stat))
+                            sizes[stat.st_size] = sizes.get(stat.st_size, 0) + 1
+        for _, stat in self._blob_files():
+            sizes[stat.st_size] = sizes.get(stat.st_size, 0) + 1
+
+        shared = saved = 0
+        digests = {}  # (device, inode) -> digest, so linked copies are read once
+        with instrument.timed("blobs.dedupe"):
+            for done, (file_path, stat) in enumerate(files, 1):
+                if sizes[stat.st_size] > 1:
+                    digest, freed = self.share(file_path, digests.get((stat.st_dev, stat.st_ino)))
+                    digests[(stat.st_dev, stat.st_ino)] = digest
+                    if freed:
+                        shared += 1
+                        saved += freed
+                if progress is not None and (done % 100 == 0 or done == len(files)):
+                    progress(done, len(files))
+        return shared, saved
+
+    def _blob_files(self):
+        """Yields (path, stat) of every blob."""
+        if not os.path.isdir(self.blobs_dir):
+            return
+        for prefix in os.listdir(self.blobs_dir):
+            prefix_dir = os.path.join(self.blobs_dir, prefix)
+            if os.path.isdir(prefix_dir):
+                with os.scandir(prefix_dir) as entries:
+                    for entry in entries:
+                        yield entry.path, entry.stat()
+
+    def collect_garbage(self):
+        """Removes the blobs no project links to any more. Returns how many were removed."""
+        removed = 0
+        for blob_path, stat in list(self._blob_files()):
+            if stat.st_nlink <= 1:
+                os.remove(blob_path)
+                removed += 1
+        if os.path.isdir(self.blobs_dir):
+            for prefix in os.listdir(self.blobs_dir):
+                try:
+                    os.rmdir(os.path.join(self.blobs_dir, prefix))
+                except OSError:
+                    pass  # not empty
+        return removed
+
+    def stats(self):
+        """Returns (number of blobs, their total size in bytes)."""
+        count = size = 0
+        for _, stat in self._blob_files():
+            count += 1
+            size += stat.st_size
+        return count, size
+
+
+def read_library_links(project_dir):
+    """Returns a project's library links: {"type/name": {"library": project, "digest": sha1}}."""
+    try:
+        with open(os.path.join(project_dir, LIBRARY_LINKS_NAME), 'r', encoding='utf-8') as f:
+            links = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        return {}  # damaged; the resources simply stop following their library
+    return links if isinstance(links, dict) else {}
+
+
+def _valid_link(key, link):
+    """Tells whether a library link names a resource and a library inside the workspace."""
+    if not isinstance(link, dict) or not isinstance(link.get("library"), str):
+        return False
+    resource_type, _, name = key.partition("/")
+    try:
+        check_resource_name(name)
+        check_resource_name(link["library"])
+    except OSError:
+        return False
+    return resource_type in RESOURCE_TYPES
+
+
+def write_library_links(project_dir, links):
+    path = os.path.join(project_dir, LIBRARY_LINKS_NAME)
+    if links:
+        atomic_write(path, json.dumps(links, indent=4, sort_keys=True))
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def link_from_library(root, project_dir, library, items):
+    """
+    Links resources of another project of the workspace (the library) into a
+    project; they follow the library until edited in the project. items are
+    (resource_type, name) pairs. A resource the project already has is only
+    replaced if it was linked from the same library.
+    """
+    library_dir = os.path.join(root, library)
+    if os.path.abspath(library_dir) == os.path.abspath(project_dir):
+        raise ValueError("A project cannot be its own library.")
+    if is_packed_project(library_dir) or is_packed_project(project_dir):
+        raise ValueError("Libraries only work between projects in the folder layout.")
+    links = read_library_links(project_dir)
+    for resource_type, name in items:
+        check_resource_name(name)
+        if resource_type not in RESOURCE_TYPES:
+            raise ValueError(f"Unknown category '{resource_type}'.")
+        if not os.path.isfile(os.path.join(library_dir, resource_type, f"{name}.json")):
+            raise FileNotFoundError(f"'{library}' has no resource '{name}' in {resource_type}.")
+        link = links.get(f"{resource_type}/{name}")
+        if os.path.exists(os.path.join(project_dir, resource_type, f"{name}.json")) and (
+                link is None or link.get("library") != library):
+            raise FileExistsError(f"Resource '{name}' already exists in the project.")
+
+    blobs = BlobStore(root)
+    with instrument.timed("blobs.link_from_library"):
+        for resource_type, name in items:
+            os.makedirs(os.path.join(project_dir, resource_type), exist_ok=True)
+            digest = blobs.link_into(os.path.join(library_dir, resource_type, f"{name}.json"),
+                                     os.path.join(project_dir, resource_type, f"{name}.json"))
+            links[f"{resource_type}/{name}"] = {"library": library, "digest": digest}
+    write_library_links(project_dir, links)
+
+
+def refresh_library_links(root, project_dir):
+    """
+    Brings a project's library resources up to date with their libraries.
+
+    A resource still holding the content it was linked with gets the
+    library's current version; one edited in the project (or renamed,
+    deleted, or gone from its library) is detached and left as it is.
+    Costs two stats per linked resource when nothing changed. Returns the
+    (resource_type, name) pairs that were updated.
+    """
+    links = read_library_links(project_dir)
+    if not links:
+        return []
+    updated = []
+    changed = False
+    blobs = BlobStore(root)
+    with instrument.timed("blobs.refresh_library_links"):
+        for key, link in list(links.items()):
+            if not _valid_link(key, link):
+                del links[key]  # never follow a path out of the workspace
+                changed = True
+                continue
+            resource_type, _, name = key.partition("/")
+            file_path = os.path.join(project_dir, resource_type, f"{name}.json")
+            library_path = os.path.join(root, link["library"], resource_type, f"{name}.json")
+            try:
+                if _same_file(os.stat(file_path), os.stat(library_path)):
+                    continue
+                if file_digest(file_path) == link.get("digest"):
+                    if file_digest(library_path) != link["digest"]:
+                        link["digest"] = blobs.link_into(library_path, file_path)
+                        updated.append((resource_type, name))
+                        changed = True
+                    continue  # else the same content, copied where hard links are not available
+            except FileNotFoundError:
+                pass
+            del links[key]
+            changed = True
+        if changed:
+            write_library_links(project_dir, links)
+    return updated
@@ -0,0 +1,125 @@
+"""
+Rendered remix templates.
+
+A template (see storage.RemixTemplates) names the resources of a Remix Station
+context that is assembled again and again, e.g. the main cast, the tavern and
+their outfits. BundleCache keeps each template's rendered text together with
+the signatures (see ResourceStore.signatures) of the resources it was rendered
+from, so rendering it again costs one stat per resource instead of reading and
+joining them all; only a template whose resources changed is rendered anew.
+
+Folder projects keep their bundles in a .bundles folder next to the resources,
+so they outlive the session; projects on a server keep them in memory.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+from . import instrument
+from .storage import atomic_write
+from .remix import format_remix_block, resolve_header_format
+from .relations import relation_items
+from .tokens import count_tokens
+
+BUNDLES_DIR_NAME = ".bundles"
+
+
+def render_bundle(store, template):
+    """
+    Renders a template. Returns the bundle: its "text" and "tokens", the
+    "members" it is made of (the template's resources that exist, each
+    followed by its links if the template asks for them) and the
+    "signatures" of every resource that decides its text, missing ones
+    included, so creating one of those is noticed too.
+    """
+    items = [tuple(item) for item in template["items"]]
+    headers = store.read_headers(items) if template["with_links"] else [None] * len(items)
+    watched = list(dict.fromkeys(items))
+    for header in headers:
+        if header is not None:
+            watched.extend(linked for linked in relation_items(header["relations"]) if linked not in watched)
+    signatures = store.signatures(watched)
+    present = {item for item, signature in zip(watched, signatures) if signature is not None}
+
+    members = []
+    for item, header in zip(items, headers):
+        candidates = [item] + (relation_items(header["relations"]) if header is not None else [])
+        members.extend(candidate for candidate in candidates if candidate in present and candidate not in members)
+
+    header_format = resolve_header_format(template["header_format"])
+    blocks = []
+    rendered = []
+    # Read after the signatures were taken: a resource changing meanwhile makes the next use render again
+    for (resource_type, name), content in zip(members, store.read_many(members, cache=False)):
+        if content is not None:
+            blocks.append(format_remix_block(name, resource_type, content, header_format))
+            rendered.append([resource_type, name])
+    text = "".join(blocks)
+    return {"template": template, "watched": [list(item) for item in watched], "signatures": signatures,
+            "members": rendered, "text": text, "tokens": count_tokens(text)}
+
+
+class BundleCache:
+    """
+    Rendered templates of one project, each used until the template or one of
+    its resources changes. Kept in directory if given, otherwise in memory.
+    Safe to use from the background I/O threads.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._bundles = {}  # template name -> bundle, without a directory
+        self._lock = threading.Lock()
+
+    def _path(self, template_name):
+        digest = hashlib.sha1(template_name.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _load(self, template_name):
+        if self.directory is None:
+            with self._lock:
+                return self._bundles.get(template_name)
+        try:
+            with open(self._path(template_name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None  # not rendered yet, or damaged: rendered again
+
+    def _save(self, template_name, bundle):
+        if self.directory is None:
+            with self._lock:
+                self._bundles[template_name] = bundle
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            atomic_write(self._path(template_name), json.dumps(bundle, ensure_ascii=False))
+        except OSError:
+            instrument.record("bundles.save_failed")  # a cache; the next use renders again
+
+    def render(self, store, template_name, template):
+        """
+        Returns (bundle, hit) for a template of the store's project (see
+        render_bundle), hit telling whether it came from the cache.
+        """
+        with instrument.timed("bundles.render"):
+            bundle = self._load(template_name)
+            if bundle is not None and bundle["template"] == template \
+                    and store.signatures([tuple(item) for item in bundle["watched"]]) == bundle["signatures"]:
+                instrument.record("bundles.hit")
+                return bundle, True
+            bundle = render_bundle(store, template)
+            self._save(template_name, bundle)
+            return bundle, False
+
+    def discard(self, template_name):
+        """Forgets the rendering of a template, e.g. once it is deleted."""
+        if self.directory is None:
+            with self._lock:
+                self._bundles.pop(template_name, None)
+            return
+        try:
+            os.remove(self._path(template_name))
+        except OSError:
+            pass
@@ -0,0 +1,546 @@
+"""
+Command line interface, run as `python -m narrative_guru <command>`.
+
+Works on the same workspace folder as the app but never imports tkinter, so it
+runs in scripts and on machines without a display.
+
+    python -m narrative_guru list --project Saga --summary
+    python -m narrative_guru remix --project Saga --characters Ann,Bob --locations Tavern -o out.txt
+    python -m narrative_guru remix --spec specs.jsonl
+    python -m narrative_guru remix --project Saga --characters Ann --with-links
+    python -m narrative_guru remix --project Saga --template "Main cast" --header-format markdown
+    python -m narrative_guru templates --project Saga --save "Main cast" --characters Ann,Bob --with-links
+    python -m narrative_guru links --project Saga --type props --name Sword
+    python -m narrative_guru import --project Saga exports/ more.zip --type characters
+    python -m narrative_guru export --project Saga -o saga.zip
+    python -m narrative_guru history --project Saga --type characters --name Ann --diff 3
+    python -m narrative_guru copy --project Saga --to "Saga draft 2"
+    python -m narrative_guru dedupe
+    python -m narrative_guru manifest --project Saga --verify
+    python -m narrative_guru library --project Saga --from Wardrobe --clothing "Red Scarf,Boots"
+    python -m narrative_guru watch --project Saga
+    python -m narrative_guru serve --host 0.0.0.0 --token SECRET
+    python -m narrative_guru --server http://writers-room:8765 list --project Saga
+
+A spec file holds one remix per line as a JSON object with a "project", an
+optional "output" (standard output if missing) and the resources to include,
+either as "items": [["characters", "Ann"], ...] or per category, e.g.
+"characters": ["Ann", "Bob"], or as the "template" saved in the project. A
+"header_format" (see remix.py) may introduce the resources differently.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from . import instrument
+from .storage import RESOURCE_TYPES, open_resource_store, list_projects, write_text_file, is_packed_project
+from .remix import HEADER_FORMATS, format_remix_block, resolve_header_format, write_remix
+from .importer import DUPLICATE_POLICIES, import_resources
+from .export import EXPORT_FORMATS, export_project
+from .tokens import fit_to_budget
+from .watcher import ProjectWatcher
+from .server import DEFAULT_HOST, DEFAULT_PORT, serve
+from .client import SERVER_ENV_VAR, TOKEN_ENV_VAR, RemoteWorkspace
+from .history import diff_lines
+from .relations import RelationIndex, expand_links, relation_items
+from .blobs import BlobStore, link_from_library, read_library_links, refresh_library_links
+from .bundles import BUNDLES_DIR_NAME, BundleCache
+
+DEFAULT_ROOT = "NarrativeGuru"
+
+
+class CommandError(Exception):
+    """A problem reported to the user as a one-line message."""
+
+
+class _AppendResources(argparse.Action):
+    """Collects --characters/--locations/... values as (type, name) pairs in command line order."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        items = list(getattr(namespace, self.dest) or [])
+        items.extend((self.const, name.strip()) for name in values.split(",") if name.strip())
+        setattr(namespace, self.dest, items)
+
+
+def build_parser():
+    """Returns the argument parser of the command line interface."""
+    parser = argparse.ArgumentParser(prog="narrative-guru", description="NarrativeGuru without the window.")
+    parser.add_argument("--root", default=DEFAULT_ROOT,
+                        help=f"workspace folder holding the projects (default: {DEFAULT_ROOT})")
+    parser.add_argument("--server", default=os.environ.get(SERVER_ENV_VAR) or None,
+                        help=f"use the projects of a workspace server instead of --root (default: ${SERVER_ENV_VAR})")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV_VAR) or None,
+                        help=f"token the server requires, or for serve, to require (default: ${TOKEN_ENV_VAR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="list projects, or the resources of a project")
+    list_parser.add_argument("--project", help="project whose resources to list")
+    list_parser.add_argument("--type", choices=RESOURCE_TYPES, help="only list this category")
+    list_parser.add_argument("--summary", action="store_true",
+                             help="add each resource's summary and tags, read without loading the bodies")
+
+    remix_parser = commands.add_parser("remix", help="assemble Remix Station contexts")
+    remix_parser.add_argument("--project", help="project to take the resources from")
+    for resource_type in RESOURCE_TYPES:
+        remix_parser.add_argument(f"--{resource_type}", dest="items", action=_AppendResources, const=resource_type,
+                                  metavar="NAMES", help=f"comma separated {resource_type} to append, in order")
+    remix_parser.add_argument("-o", "--output", default="-", help="file to write (default: standard output)")
+    remix_parser.add_argument("--spec", action="append", default=[], metavar="FILE",
+                              help="JSON Lines file of remixes to build ('-' reads standard input); repeatable")
+    remix_parser.add_argument("--skip-missing", action="store_true",
+                              help="leave out missing resources instead of failing")
+    remix_parser.add_argument("--budget", type=int, metavar="TOKENS",
+                              help="shorten the remix section by section to about this many tokens")
+    remix_parser.add_argument("--with-links", action="store_true",
+                              help="follow each resource with the resources it links to")
+    remix_parser.add_argument("--template", metavar="NAME",
+                              help="build the remix saved as this template, from its cached rendering if still current")
+    remix_parser.add_argument("--header-format", metavar="FORMAT",
+                              help=f"how to introduce each resource: {', '.join(HEADER_FORMATS)} or a format "
+                                   "such as '## {name} ({type})'")
+
+    templates_parser = commands.add_parser("templates", help="list, save or delete a project's remix templates")
+    templates_parser.add_argument("--project", required=True, help="project holding the templates")
+    for resource_type in RESOURCE_TYPES:
+        templates_parser.add_argument(f"--{resource_type}", dest="items", action=_AppendResources,
+                                      const=resource_type, metavar="NAMES",
+                                      help=f"comma separated {resource_type} of the template, in order")
+    templates_parser.add_argument("--with-links", action="store_true",
+                                  help="follow each resource of the template with the resources it links to")
+    templates_parser.add_argument("--header-format", metavar="FORMAT", help="how the template introduces resources")
+    templates_action = templates_parser.add_mutually_exclusive_group()
+    templates_action.add_argument("--save", metavar="NAME", help="save the given resources as a template")
+    templates_action.add_argument("--delete", metavar="NAME", help="delete a template")
+
+    links_parser = commands.add_parser("links", help="show what a resource links to and what links to it")
+    links_parser.add_argument("--project", required=True, help="project holding the resource")
+    links_parser.add_argument("--type", required=True, choices=RESOURCE_TYPES, help="category of the resource")
+    links_parser.add_argument("--name", required=True, help="name of the resource")
+
+    import_parser = commands.add_parser("import", help="bulk import JSON resources into a project")
+    import_parser.add_argument("--project", required=True, help="project to import into")
+    import_parser.add_argument("sources", nargs="+", metavar="SOURCE",
+                               help="folder, zip archive, JSON or JSON Lines file ('-' reads standard input)")
+    import_parser.add_argument("--type", choices=RESOURCE_TYPES,
+                               help="category for resources whose folder or \"type\" field names none")
+    import_parser.add_argument("--on-duplicate", choices=DUPLICATE_POLICIES, default="skip",
+                               help="what to do when a resource name is taken (default: skip)")
+    import_parser.add_argument("--workers", type=int, help="parsing processes for large imports (default: one per CPU)")
+
+    export_parser = commands.add_parser("export", help="export a whole project to a single file")
+    export_parser.add_argument("--project", required=True, help="project to export")
+    export_parser.add_argument("-o", "--output", required=True, help="file to write")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS,
+                               help="file format (default: from the output's extension, else txt)")
+    export_parser.add_argument("--type", action="append", choices=RESOURCE_TYPES,
+                               help="only export this category; repeatable")
+
+    history_parser = commands.add_parser("history", help="list, show or compare the saved revisions of a resource")
+    history_parser.add_argument("--project", required=True, help="project holding the resource")
+    history_parser.add_argument("--type", choices=RESOURCE_TYPES, help="category of the resource")
+    history_parser.add_argument("--name", help="name of the resource")
+    history_action = history_parser.add_mutually_exclusive_group()
+    history_action.add_argument("--show", type=int, metavar="REV", help="print the content of a revision")
+    history_action.add_argument("--diff", type=int, metavar="REV", help="print what changed since a revision")
+    history_action.add_argument("--compact", action="store_true",
+                                help="drop the oldest revisions of the project beyond the size limits")
+
+    copy_parser = commands.add_parser("copy", help="copy a project, sharing its resource files with the original")
+    copy_parser.add_argument("--project", required=True, help="project to copy")
+    copy_parser.add_argument("--to", required=True, help="name of the copy")
+
+    commands.add_parser("dedupe", help="store resource files that are identical across projects only once")
+
+    library_parser = commands.add_parser("library", help="link resources of another project, or update the links")
+    library_parser.add_argument("--project", required=True, help="project to link the resources into")
+    library_parser.add_argument("--from", dest="library", metavar="LIBRARY", help="project to link them from")
+    for resource_type in RESOURCE_TYPES:
+        library_parser.add_argument(f"--{resource_type}", dest="items", action=_AppendResources, const=resource_type,
+                                    metavar="NAMES", help=f"comma separated {resource_type} to link")
+    library_parser.add_argument("--refresh", action="store_true",
+                                help="bring the linked resources up to date with their libraries")
+
+    manifest_parser = commands.add_parser("manifest", help="check or rebuild the manifest listing a project")
+    manifest_parser.add_argument("--project", required=True, help="project whose manifest to check")
+    manifest_action = manifest_parser.add_mutually_exclusive_group(required=True)
+    manifest_action.add_argument("--verify", action="store_true",
+                                 help="compare the manifest with every resource file and list the differences")
+    manifest_action.add_argument("--rebuild", action="store_true", help="write the manifest anew from the files")
+
+    watch_parser = commands.add_parser("watch", help="print changes to the workspace as JSON lines until interrupted")
+    watch_parser.add_argument("--project", help="project whose resources to watch as well")
+    watch_parser.add_argument("--poll", action="store_true", help="poll for changes instead of using inotify")
+
+    serve_parser = commands.add_parser("serve", help="serve the workspace to other machines over HTTP")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST,
+                              help=f"address to listen on; 0.0.0.0 for all networks (default: {DEFAULT_HOST})")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"(default: {DEFAULT_PORT})")
+    serve_parser.add_argument("--verbose", action="store_true", help="log every request")
+    return parser
+
+
+class ProjectStores:
+    """Opens each project once, however many remixes use it."""
+
+    def __init__(self, root, server=None):
+        self.root = root
+        self.server = server  # RemoteWorkspace, if the projects come from a server
+        self._stores = {}
+        self._bundles = {}
+
+    def get(self, project):
+        if project not in self._stores and self.server is not None:
+            self._stores[project] = self.server.open_store(project)
+        if project not in self._stores:
+            project_dir = os.path.join(self.root, project)
+            if not os.path.isdir(project_dir):
+                raise CommandError(f"project '{project}' not found in '{self.root}'")
+            self._stores[project] = open_resource_store(project_dir)
+        return self._stores[project]
+
+    def bundles(self, project):
+        """Returns the rendered templates of a project; those of a server's project only last the run."""
+        if project not in self._bundles:
+            directory = os.path.join(self.root, project, BUNDLES_DIR_NAME) if self.server is None else None
+            self._bundles[project] = BundleCache(directory)
+        return self._bundles[project]
+
+    def close(self):
+        for store in self._stores.values():
+            store.close()
+        self._stores.clear()
+
+
+def parse_spec(spec):
+    """Turns a spec object into (project, items, output, options), options being its template and header format."""
+    if not isinstance(spec, dict) or not spec.get("project"):
+        raise CommandError("every spec needs a \"project\"")
+    items = [tuple(item) for item in spec.get("items", [])]
+    for resource_type in RESOURCE_TYPES:
+        items.extend((resource_type, name) for name in spec.get(resource_type, []))
+    for item in items:
+        if len(item) != 2 or item[0] not in RESOURCE_TYPES:
+            raise CommandError(f"invalid spec item {list(item)!r}")
+    options = {"template": spec.get("template"), "header_format": spec.get("header_format")}
+    return spec["project"], items, spec.get("output", "-"), options
+
+
+def read_specs(path):
+    """Yields the specs of a JSON Lines file as they are read."""
+    f = sys.stdin if path == "-" else open(path, 'r', encoding='utf-8')
+    try:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield parse_spec(json.loads(line))
+            except ValueError as e:
+                raise CommandError(f"{path}:{line_number}: {e}") from e
+            except CommandError as e:
+                raise CommandError(f"{path}:{line_number}: {e}") from e
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def write_budget_remix(store, items, out, budget, header_format=None):
+    """Writes a remix shortened to a token budget; unlike write_remix this holds all its resources at once."""
+    blocks = [(resource_type, name, store.read(resource_type, name, cache=False)) for resource_type, name in items]
+    fitted, dropped = fit_to_budget(blocks, budget, header_format)
+    for resource_type, name, content in fitted:
+        out.write(format_remix_block(name, resource_type, content, header_format))
+    if dropped:
+        print(f"narrative-guru: {dropped} resource(s) at the end did not fit the budget", file=sys.stderr)
+
+
+def run_remix(stores, project, items, output, skip_missing, budget=None, with_links=False, header_format=None,
+              template=None):
+    """
+    Builds one remix, streaming it to its output. The remix of a template
+    comes from its cached rendering (see bundles.py) unless it has a budget;
+    its resources that are gone are left out.
+    """
+    store = stores.get(project)
+    bundle = None
+    if template is not None:
+        if items:
+            raise CommandError("give either resources or a template, not both")
+        saved = store.templates.get(template)
+        if header_format is not None:
+            saved = dict(saved, header_format=header_format)
+        bundle = stores.bundles(project).render(store, template, saved)[0]
+        present = [tuple(item) for item in bundle["members"]]
+        header_format = saved["header_format"]
+    else:
+        present = []
+        for resource_type, name in items:
+            if store.exists(resource_type, name):
+                present.append((resource_type, name))
+            elif skip_missing:
+                print(f"narrative-guru: skipping missing {resource_type} '{name}' in '{project}'", file=sys.stderr)
+            else:
+                # Checked up front so a typo doesn't leave half a remix behind
+                raise CommandError(f"{resource_type} '{name}' not found in project '{project}'")
+        if with_links:
+            present = expand_links(store, present)
+    header_format = resolve_header_format(header_format)
+
+    if output == "-":
+        out = sys.stdout
+    else:
+        out = open(output, 'w', encoding='utf-8')
+    try:
+        if budget is None and bundle is not None:
+            out.write(bundle["text"])
+        elif budget is None:
+            write_remix(store, present, out, header_format)
+        else:
+            write_budget_remix(store, present, out, budget, header_format)
+        out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def command_remix(args):
+    if (args.items or args.template) and not args.project:
+        raise CommandError("--project is required to pick resources")
+    if not args.project and not args.spec:
+        raise CommandError("nothing to do: give --project with resources, or --spec")
+    if args.budget is not None and args.budget < 1:
+        raise CommandError("--budget must be at least 1")
+
+    stores = ProjectStores(args.root, args.workspace)
+    try:
+        if args.project:
+            run_remix(stores, args.project, args.items or [], args.output, args.skip_missing, args.budget,
+                      args.with_links, args.header_format, args.template)
+        for path in args.spec:
+            for project, items, output, options in read_specs(path):
+                run_remix(stores, project, items, output, args.skip_missing, args.budget, args.with_links,
+                          options["header_format"] or args.header_format, options["template"])
+    finally:
+        stores.close()
+
+
+def command_templates(args):
+    stores = ProjectStores(args.root, args.workspace)
+    try:
+        store = stores.get(args.project)
+        if args.save:
+            if not args.items:
+                raise CommandError("name the template's resources, e.g. --characters Ann,Bob")
+            store.templates.save(args.save, {"items": args.items, "with_links": args.with_links,
+                                             "header_format": args.header_format})
+            print(f"template '{args.save}' saved with {len(args.items)} resource(s)", file=sys.stderr)
+        elif args.delete:
+            store.templates.delete(args.delete)
+            stores.bundles(args.project).discard(args.delete)
+            print(f"template '{args.delete}' deleted", file=sys.stderr)
+        else:
+            for name, template in store.templates.all().items():
+                resources = ", ".join(f"{resource_type}/{resource_name}"
+                                      for resource_type, resource_name in template["items"])
+                print(f"{name}\t{resources}{' (with links)' if template['with_links'] else ''}")
+    finally:
+        stores.close()
+
+
+def command_import(args):
+    if args.workers is not None and args.workers < 1:
+        raise CommandError("--workers must be at least 1")
+    store = ProjectStores(args.root, args.workspace).get(args.project)
+    try:
+        report = import_resources(store, args.sources, args.type, args.on_duplicate, args.workers)
+    finally:
+        store.close()
+    print(report.summary())
+    if report.errors and not report.imported:
+        raise CommandError("nothing imported")
+
+
+def command_export(args):
+    store = ProjectStores(args.root, args.workspace).get(args.project)
+    try:
+        count = export_project(store, args.output, args.format, args.type)
+    finally:
+        store.close()
+    print(f"{count} resource(s) exported to {args.output}", file=sys.stderr)
+
+
+def command_links(args):
+    store = ProjectStores(args.root, args.workspace).get(args.project)
+    try:
+        for resource_type, name in relation_items(store.read_header(args.type, args.name)["relations"]):
+            print(f"links to\t{resource_type}/{name}")
+        # What links here needs every header; that is what the index reads
+        relation_index = RelationIndex(store)
+        relation_index.build()
+        for resource_type, name in relation_index.backlinks(args.type, args.name):
+            print(f"linked from\t{resource_type}/{name}")
+    finally:
+        store.close()
+
+
+def command_history(args):
+    store = ProjectStores(args.root, args.workspace).get(args.project)
+    try:
+        if args.compact:
+            print(f"{store.history.compact()} revision(s) dropped", file=sys.stderr)
+            return
+        if not args.type or not args.name:
+            raise CommandError("--type and --name are required to pick the resource")
+        if args.show is not None:
+            sys.stdout.write(store.history.get(args.type, args.name, args.show))
+        elif args.diff is not None:
+            old = store.history.get(args.type, args.name, args.diff)
+            for line in diff_lines(old, store.read(args.type, args.name), f"revision {args.diff}", "current"):
+                print(line)
+        else:
+            for rev, created, size in store.history.revisions(args.type, args.name):
+                print(f"{rev}\t{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))}\t{size}")
+    finally:
+        store.close()
+
+
+def _local_project_dir(args, project):
+    """Returns the folder of a local project; the blob store commands work on the workspace folder itself."""
+    if args.server:
+        raise CommandError(f"'{args.command}' works on a local workspace only; run it on the server's machine")
+    project_dir = os.path.join(args.root, project)
+    if not os.path.isdir(project_dir):
+        raise CommandError(f"project '{project}' not found in '{args.root}'")
+    return project_dir
+
+
+def command_copy(args):
+    project_dir = _local_project_dir(args, args.project)
+    BlobStore(args.root).copy_project(project_dir, os.path.join(args.root, args.to))
+    print(f"project '{args.project}' copied to '{args.to}'", file=sys.stderr)
+
+
+def command_dedupe(args):
+    _local_project_dir(args, "")
+    blobs = BlobStore(args.root)
+    shared, saved = blobs.dedupe([os.path.join(args.root, project) for project in list_projects(args.root)])
+    removed = blobs.collect_garbage()
+    count, size = blobs.stats()
+    print(f"{shared} resource file(s) now shared, {saved} bytes saved; {removed} unused blob(s) removed, "
+          f"{count} blob(s) of {size} bytes in total", file=sys.stderr)
+
+
+def command_library(args):
+    project_dir = _local_project_dir(args, args.project)
+    if args.items:
+        if not args.library:
+            raise CommandError("--from is required to link resources")
+        link_from_library(args.root, project_dir, args.library, args.items)
+        print(f"{len(args.items)} resource(s) linked from '{args.library}'", file=sys.stderr)
+    elif args.refresh:
+        for resource_type, name in refresh_library_links(args.root, project_dir):
+            print(f"updated\t{resource_type}/{name}")
+    else:
+        for key, link in sorted(read_library_links(project_dir).items()):
+            print(f"{key}\t{link.get('library')}")
+
+
+def command_manifest(args):
+    project_dir = _local_project_dir(args, args.project)
+    if is_packed_project(project_dir):
+        raise CommandError(f"project '{args.project}' is packed; its database is its own manifest")
+    store = open_resource_store(project_dir)
+    try:
+        if args.rebuild:
+            print(f"{store.rebuild_manifest()} resource(s) recorded in the manifest", file=sys.stderr)
+            return
+        problems = store.verify_manifest()
+        for problem, resource_type, name in problems:
+            print(f"{problem}\t{resource_type}/{name}")
+        print(f"{len(problems)} difference(s) between the manifest and the files", file=sys.stderr)
+    finally:
+        store.close()
+
+
+def command_watch(args):
+    if not os.path.isdir(args.root):
+        raise CommandError(f"workspace '{args.root}' not found")
+    watcher = ProjectWatcher(args.root, use_inotify=not args.poll)
+    watcher.start()
+    if args.project:
+        project_dir = os.path.join(args.root, args.project)
+        if not os.path.isdir(project_dir):
+            watcher.stop()
+            raise CommandError(f"project '{args.project}' not found in '{args.root}'")
+        watcher.watch_project(project_dir)
+    print(f"narrative-guru: watching '{args.root}' ({watcher.backend}); press Ctrl+C to stop", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(0.2)
+            for event in watcher.drain():
+                print(json.dumps(event._asdict()), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+
+
+def command_serve(args):
+    def ready(server):
+        host, port = server.server_address[:2]
+        print(f"narrative-guru: serving '{args.root}' on http://{host}:{port}; press Ctrl+C to stop", file=sys.stderr)
+
+    try:
+        serve(args.root, args.host, args.port, args.token, args.verbose, ready)
+    except KeyboardInterrupt:
+        pass
+
+
+def command_list(args):
+    if not args.project:
+        projects = args.workspace.list_projects() if args.workspace is not None else list_projects(args.root)
+        for project in projects:
+            print(project)
+        return
+    store = ProjectStores(args.root, args.workspace).get(args.project)
+    try:
+        for resource_type in [args.type] if args.type else RESOURCE_TYPES:
+            names = store.list_names(resource_type)
+            headers = store.read_headers([(resource_type, name) for name in names]) if args.summary else None
+            for i, name in enumerate(names):
+                line = name if args.type else f"{resource_type}/{name}"
+                if headers is not None and headers[i] is not None:
+                    summary = headers[i]["summary"] or headers[i]["excerpt"]
+                    line += f"\t{' '.join(summary.split())}\t{', '.join(headers[i]['tags'])}"
+                print(line)
+    finally:
+        store.close()
+
+
+def main(argv=None):
+    """Runs the command line interface and returns the exit status."""
+    args = build_parser().parse_args(argv)
+    command = {"list": command_list, "remix": command_remix, "templates": command_templates, "import": command_import,
+               "export": command_export, "links": command_links, "history": command_history, "copy": command_copy,
+               "dedupe": command_dedupe, "library": command_library, "manifest": command_manifest,
+               "watch": command_watch,
+               "serve": command_serve}[args.command]
+    args.workspace = None
+    try:
+        if args.server and args.command not in ("watch", "serve", "copy", "dedupe", "library", "manifest"):
+            args.workspace = RemoteWorkspace(args.server, args.token)
+        command(args)
+        if instrument.dump_path():
+            write_text_file(instrument.dump_path(), instrument.to_json())
+    except BrokenPipeError:
+        # The reader (e.g. `head`) went away; that is not an error
+        return 0
+    except (CommandError, OSError, ValueError) as e:
+        print(f"narrative-guru: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.workspace is not None:
+            args.workspace.close()
+    return 0
@@ -0,0 +1,397 @@
+"""
+Using a workspace served by `python -m narrative_guru serve` (see server.py).
+
+RemoteResourceStore offers the same interface as the local stores, so the app,
+the search index and exports work unchanged on a server's projects. Each
+thread keeps its own HTTP/1.1 connection open, listings of all categories
+come in one request, and resources already read are only sent again when
+they changed (If-None-Match). The app connects to the server named by the
+NARRATIVE_GURU_SERVER environment variable, e.g. http://192.168.1.20:8765,
+with the token in NARRATIVE_GURU_TOKEN if the server requires one.
+"""
+
+import os
+import json
+import time
+import threading
+import http.client
+from collections import OrderedDict
+from urllib.parse import urlsplit, quote
+
+from . import instrument
+from .storage import RESOURCE_TYPES, RESOURCE_CACHE_CHARS, ConflictError, check_resource_name, check_template
+from .schema import check_fields
+
+SERVER_ENV_VAR = "NARRATIVE_GURU_SERVER"
+TOKEN_ENV_VAR = "NARRATIVE_GURU_TOKEN"
+# Seconds to wait for the server
+REMOTE_TIMEOUT = 30
+# Seconds a fetched listing is used without asking the server whether it changed
+REMOTE_LISTING_MAX_AGE = 1.0
+# Resources per request for batch reads and writes
+REMOTE_BATCH_SIZE = 100
+
+
+def server_from_environment():
+    """Returns (url, token) of the server named by the environment, or None to work on local folders."""
+    url = os.environ.get(SERVER_ENV_VAR, "").strip()
+    if not url:
+        return None
+    return url, os.environ.get(TOKEN_ENV_VAR) or None
+
+
+def _error(status, message):
+    """Turns an error answer back into the exception a local store would have raised."""
+    if status == 404:
+        return FileNotFoundError(message)
+    if status == 409:
+        return FileExistsError(message)
+    if status == 412:
+        return ConflictError(message)
+    return OSError(f"Server error {status}: {message}")
+
+
+class ServerConnection:
+    """Kept-alive HTTP connections to a workspace server, one per thread."""
+
+    def __init__(self, url, token=None, timeout=REMOTE_TIMEOUT):
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Not a server address: '{url}'")
+        self.url = f"{parts.scheme}://{parts.netloc}"
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._host, self._port = parts.hostname, parts.port
+        self._token = token
+        self._timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connection_class(self._host, self._port, timeout=self._timeout)
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Sends a request and returns (status, ETag, decoded JSON body or None).
+
+        A connection the server has closed meanwhile is opened again once.
+        Connection failures are raised as OSError, error answers (400 and up)
+        as the exception a local store would raise.
+        """
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            headers["Content-Type"] = "application/json; charset=utf-8"
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+
+        with instrument.timed(f"remote.{method.lower()}") as timer:
+            for attempt in (1, 2):
+                connection = self._connection()
+                reused = connection.sock is not None
+                try:
+                    connection.request(method, path, body=data, headers=headers)
+                    response = connection.getresponse()
+                    payload = response.read()
+                    break
+                except (http.client.HTTPException, ConnectionError) as e:
+                    connection.close()
+                    if not reused or attempt == 2:
+                        raise OSError(f"Lost the connection to {self.url}: {e}") from e
+                except OSError as e:
+                    connection.close()
+                    raise OSError(f"Could not reach {self.url}: {e}") from e
+            timer.size = len(payload)
+
+        value = json.loads(payload) if payload else None
+        if response.status >= 400:
+            message = value.get("error") if isinstance(value, dict) else response.reason
+            raise _error(response.status, message)
+        etag = response.getheader("ETag")
+        return response.status, etag.strip('"') if etag else None, value
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+
+class RemoteWorkspace:
+    """The projects of a workspace server."""
+
+    def __init__(self, url, token=None):
+        self.connection = ServerConnection(url, token)
+        self.url = self.connection.url
+
+    def list_projects(self):
+        """Returns the sorted project names."""
+        return self.connection.request("GET", "/projects")[2]["projects"]
+
+    def create_project(self, name, packed=False):
+        """Creates a project on the server."""
+        self.connection.request("POST", "/projects", {"name": name, "packed": packed})
+
+    def project_location(self, name):
+        """Returns the URL standing in for a project's folder, e.g. as RemoteResourceStore.project_dir."""
+        return f"{self.url}/projects/{quote(name, safe='')}"
+
+    def open_store(self, name):
+        """Returns a store for one of the server's projects."""
+        return RemoteResourceStore(self, name)
+
+    def close(self):
+        self.connection.close()
+
+
+class RemoteHistory:
+    """The revision history of a server's project, with the read side of ResourceHistory."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def _path(self, resource_type, name):
+        return f"/history/{resource_type}/{quote(name, safe='')}"
+
+    def revisions(self, resource_type, name):
+        """Returns (rev, created timestamp, size in characters) of a resource's revisions, newest first."""
+        return [tuple(row) for row in self._store._request("GET", self._path(resource_type, name))[2]["revisions"]]
+
+    def get(self, resource_type, name, rev):
+        """Returns the content of a revision."""
+        return self._store._request("GET", f"{self._path(resource_type, name)}/{int(rev)}")[2]["content"]
+
+    def compact(self, *args):
+        """The server compacts its projects' history itself."""
+        return 0
+
+    def close(self):
+        pass
+
+
+class RemoteTemplates:
+    """The remix templates of a server's project, with the interface of storage.RemixTemplates."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def _path(self, name):
+        return f"/templates/{quote(name, safe='')}"
+
+    def all(self):
+        """Returns {name: template} of every saved template, by name."""
+        return self._store._request("GET", "/templates")[2]["templates"]
+
+    def names(self):
+        return list(self.all())
+
+    def get(self, name):
+        """Returns a saved template."""
+        try:
+            return self.all()[name]
+        except KeyError:
+            raise FileNotFoundError(f"Template '{name}' not found.") from None
+
+    def save(self, name, template):
+        """Saves a template under a name, replacing one of the same name. Returns it as stored."""
+        check_resource_name(name)
+        template = check_template(template)
+        return self._store._request("PUT", self._path(name), {"template": template})[2]["template"]
+
+    def delete(self, name):
+        self._store._request("DELETE", self._path(name))
+
+
+class RemoteResourceStore:
+    """
+    A project on a workspace server, with the interface of ResourceStore.
+
+    Listings are fetched for all categories at once and revalidated with the
+    server at most once a second; resource bodies are kept in a bounded LRU and
+    revalidated by version on every read. Safe to use from the background I/O
+    threads.
+    """
+
+    def __init__(self, workspace, name, cache_chars=RESOURCE_CACHE_CHARS):
+        self.workspace = workspace
+        self.name = name
+        self.project_dir = workspace.project_location(name)
+        self.cache_chars = cache_chars
+        self._path = f"/projects/{quote(name, safe='')}"
+        self._listings = None  # {resource_type: sorted names}
+        self._listing_version = None
+        self._listing_time = 0.0
+        self._bodies = OrderedDict()  # (resource_type, name) -> (version, content)
+        self._cached_chars = 0
+        self._lock = threading.RLock()
+        self.history = RemoteHistory(self)
+        self.templates = RemoteTemplates(self)
+
+    def _request(self, method, path="", body=None, headers=None):
+        return self.workspace.connection.request(method, self._path + path, body, headers)
+
+    def _resource_path(self, resource_type, name):
+        return f"/resources/{resource_type}/{quote(name, safe='')}"
+
+    def _fetch_listings(self, max_age=REMOTE_LISTING_MAX_AGE):
+        """Returns the listings of all categories, asking the server only if they may be out of date."""
+        with self._lock:
+            if self._listings is not None and time.monotonic() - self._listing_time < max_age:
+                instrument.record("storage.listdir.cache_hit")
+                return self._listings
+            headers = {"If-None-Match": f'"{self._listing_version}"'} if self._listings is not None else None
+            status, version, value = self._request("GET", "/resources", headers=headers)
+            if status != 304:
+                self._listings = {resource_type: value["resources"].get(resource_type, [])
+                                  for resource_type in RESOURCE_TYPES}
+                self._listing_version = version
+            self._listing_time = time.monotonic()
+            return self._listings
+
+    def _listings_changed(self):
+        """Makes the next listing come from the server after our own change."""
+        with self._lock:
+            self._listing_time = 0.0
+
+    def list_names(self, resource_type):
+        """Returns the sorted resource names of a category."""
+        return self._fetch_listings()[resource_type]
+
+    def exists(self, resource_type, name):
+        """Checks whether a resource exists on the server."""
+        return name in self._fetch_listings(max_age=0)[resource_type]
+
+    def read(self, resource_type, name, cache=True):
+        """Returns the content of a resource; a cached copy is only sent again if it changed."""
+        key = (resource_type, name)
+        with self._lock:
+            cached = self._bodies.get(key)
+        headers = {"If-None-Match": f'"{cached[0]}"'} if cached is not None else None
+        status, version, value = self._request("GET", self._resource_path(resource_type, name), headers=headers)
+        if status == 304:
+            instrument.record("storage.read.cache_hit")
+            with self._lock:
+                if key in self._bodies:
+                    self._bodies.move_to_end(key)
+            return cached[1]
+        content = value["content"]
+        if cache:
+            self._remember(key, version, content)
+        return content
+
+    def read_many(self, items, cache=True):
+        """Returns the contents of many (resource_type, name) resources in order, None for missing ones."""
+        items = list(items)
+        contents = []
+        for start in range(0, len(items), REMOTE_BATCH_SIZE):
+            batch = [list(item) for item in items[start:start + REMOTE_BATCH_SIZE]]
+            contents.extend(self._request("POST", "/read", {"items": batch})[2]["contents"])
+        return contents
+
+    def read_header(self, resource_type, name):
+        """Returns the header of a resource without sending its body."""
+        header = self.read_headers([(resource_type, name)])[0]
+        if header is None:
+            raise FileNotFoundError(f"Resource '{name}' not found.")
+        return header
+
+    def read_headers(self, items):
+        """Returns the headers of many (resource_type, name) resources in order, None for missing ones."""
+        items = list(items)
+        headers = []
+        for start in range(0, len(items), REMOTE_BATCH_SIZE):
+            batch = [list(item) for item in items[start:start + REMOTE_BATCH_SIZE]]
+            headers.extend(self._request("POST", "/headers", {"items": batch})[2]["headers"])
+        return headers
+
+    def signatures(self, items):
+        """Returns the signatures (see ResourceStore.signatures) the server gives the resources."""
+        items = list(items)
+        signatures = []
+        for start in range(0, len(items), REMOTE_BATCH_SIZE):
+            batch = [list(item) for item in items[start:start + REMOTE_BATCH_SIZE]]
+            signatures.extend(self._request("POST", "/signatures", {"items": batch})[2]["signatures"])
+        return signatures
+
+    def _remember(self, key, version, content):
+        """Stores a body in the LRU, evicting the least recently used ones over the limit."""
+        with self._lock:
+            self._forget(key)
+            self._bodies[key] = (version, content)
+            self._cached_chars += len(content)
+            while self._cached_chars > self.cache_chars and len(self._bodies) > 1:
+                _, (_, evicted) = self._bodies.popitem(last=False)
+                self._cached_chars -= len(evicted)
+
+    def _forget(self, key):
+        with self._lock:
+            cached = self._bodies.pop(key, None)
+            if cached is not None:
+                self._cached_chars -= len(cached[1])
+
+    def _put(self, resource_type, name, body, headers):
+        _, version, _ = self._request("PUT", self._resource_path(resource_type, name), body, headers)
+        self._remember((resource_type, name), version, body["content"])
+
+    def create(self, resource_type, name, content, fields=None):
+        """Creates a new resource, with header fields if given, failing if one with that name already exists."""
+        check_resource_name(name)
+        body = {"content": content}
+        if fields:
+            check_fields(fields)
+            body["fields"] = fields
+        self._put(resource_type, name, body, {"If-None-Match": "*"})
+        self._listings_changed()
+
+    def write(self, resource_type, name, content, expected_version=None):
+        """Overwrites the content of a resource; with expected_version, only if nobody changed it meanwhile."""
+        headers = {"If-Match": f'"{expected_version}"'} if expected_version is not None else None
+        self._put(resource_type, name, {"content": content}, headers)
+
+    def write_header(self, resource_type, name, fields):
+        """Replaces the given header fields of a resource, keeping its body and other fields."""
+        check_fields(fields)
+        self._request("POST", "/write_header", {"type": resource_type, "name": name, "fields": fields})
+
+    def write_many(self, items):
+        """
+        Creates or overwrites many (resource_type, name, content) resources, a
+        batch per request; (resource_type, name, content, fields) items also
+        replace the header fields.
+        """
+        items = list(items)
+        for item in items:
+            check_resource_name(item[1])
+            if len(item) > 3:
+                check_fields(item[3])
+        for start in range(0, len(items), REMOTE_BATCH_SIZE):
+            batch = items[start:start + REMOTE_BATCH_SIZE]
+            self._request("POST", "/write", {"items": [list(item) for item in batch]})
+            for resource_type, name, *_ in batch:
+                self._forget((resource_type, name))
+        self._listings_changed()
+
+    def rename(self, resource_type, old_name, new_name):
+        """Renames a resource, failing if one with the new name already exists."""
+        check_resource_name(new_name)
+        self._request("POST", "/rename", {"type": resource_type, "name": old_name, "new_name": new_name})
+        self._forget((resource_type, old_name))
+        self._listings_changed()
+
+    def delete(self, resource_type, name):
+        """Deletes a resource."""
+        self._request("DELETE", self._resource_path(resource_type, name))
+        self._forget((resource_type, name))
+        self._listings_changed()
+
+    def close(self):
+        """Drops the cached bodies; the connections belong to the workspace."""
+        with self._lock:
+            self._bodies.clear()
+            self._cached_chars = 0
@@ -0,0 +1,166 @@
+"""
+Exporting remixes and whole projects to files.
+
+Resources are streamed from the store to disk a small batch at a time, so
+memory use is bounded by a few resources rather than by the whole export. Files
+are written through a temporary file and only replace the target once
+complete.
+
+    txt    the Remix Station format (header line, content, blank line)
+    md     a Markdown document with a heading per category and resource
+    jsonl  one {"type", "name", "content"} object per line
+    zip    one JSON file per resource in a folder per category, header
+           fields included: the same layout as a project folder (and
+           importable again)
+"""
+
+import io
+import os
+import re
+import json
+import zipfile
+import functools
+
+from .storage import RESOURCE_TYPES, atomic_open
+from .remix import format_remix_header
+from .schema import encode_resource, stored_fields
+
+EXPORT_FORMATS = ("txt", "md", "jsonl", "zip")
+EXPORT_EXTENSIONS = {".txt": "txt", ".md": "md", ".markdown": "md", ".jsonl": "jsonl", ".ndjson": "jsonl",
+                     ".zip": "zip"}
+# Size of the pieces large JSON values are encoded and written in
+EXPORT_CHUNK_CHARS = 64 * 1024
+# Resources read from the store at a time
+EXPORT_READ_BATCH = 50
+
+_encoder = json.JSONEncoder(ensure_ascii=False)
+
+
+def export_format_for(file_path):
+    """Picks the export format from a file name's extension, plain text if unknown."""
+    return EXPORT_EXTENSIONS.get(os.path.splitext(file_path)[1].lower(), "txt")
+
+
+def project_items(store, resource_types=None):
+    """Lists every (resource_type, name) of a project, category by category."""
+    return [(resource_type, name) for resource_type in resource_types or RESOURCE_TYPES
+            for name in store.list_names(resource_type)]
+
+
+def _iter_contents(store, items, with_fields=False):
+    """
+    Yields (resource_type, name, content) of the items, reading them from the
+    store a batch at a time; with_fields adds the header fields worth keeping.
+    """
+    for start in range(0, len(items), EXPORT_READ_BATCH):
+        batch = items[start:start + EXPORT_READ_BATCH]
+        headers = store.read_headers(batch) if with_fields else [None] * len(batch)
+        for (resource_type, name), content, header in zip(batch, store.read_many(batch, cache=False), headers):
+            if content is None:
+                # Read it on its own to raise the actual reason
+                content = store.read(resource_type, name, cache=False)
+            if not with_fields:
+                yield resource_type, name, content
+            elif header is None:
+                yield resource_type, name, content, stored_fields(store.read_header(resource_type, name))
+            else:
+                yield resource_type, name, content, stored_fields(header)
+
+
+def _write_json(out, value):
+    """Encodes a JSON value into a text file in pieces rather than as one string."""
+    pending = []
+    size = 0
+    for piece in _encoder.iterencode(value):
+        pending.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_CHARS:
+            out.write("".join(pending))
+            pending, size = [], 0
+    out.write("".join(pending))
+
+
+def _markdown_fence(content):
+    """Returns a code fence longer than any run of backticks inside the content."""
+    longest = max(map(len, re.findall(r"`+", content)), default=0)
+    return "`" * max(3, longest + 1)
+
+
+def _write_txt(out, resource_type, name, content, previous_type, header_format=None):
+    """Writes a resource as a Remix Station block, without joining its content to the header first."""
+    out.write(format_remix_header(name, resource_type, header_format))
+    out.write("\n")
+    out.write(content)
+    out.write("\n\n")
+
+
+def _write_md(out, resource_type, name, content, previous_type):
+    """Writes a resource as a Markdown section, opening a category heading when the category changes."""
+    if resource_type != previous_type:
+        out.write(f"# {resource_type.title()}\n\n")
+    out.write(f"## {name}\n\n")
+    if content.lstrip().startswith(("{", "[")):
+        # AI exports are JSON; keep them readable and untouched by Markdown rendering
+        fence = _markdown_fence(content)
+        out.write(f"{fence}json\n")
+        out.write(content)
+        out.write(f"\n{fence}\n\n")
+    else:
+        out.write(content)
+        out.write("\n\n")
+
+
+def _write_jsonl(out, resource_type, name, content, previous_type):
+    """Writes a resource as one JSON Lines record."""
+    _write_json(out, {"type": resource_type, "name": name, "content": content})
+    out.write("\n")
+
+
+def _export_zip(store, items, f, progress):
+    """Writes each resource as its own archive member, one at a time, in the format of a resource file."""
+    with zipfile.ZipFile(f, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for done, (resource_type, name, content, fields) in enumerate(_iter_contents(store, items, True), 1):
+            with archive.open(f"{resource_type}/{name}.json", 'w', force_zip64=True) as member:
+                with io.TextIOWrapper(member, encoding='utf-8') as out:
+                    out.write(encode_resource(content, fields))
+            if progress is not None and (done % 100 == 0 or done == len(items)):
+                progress(done, len(items))
+
+
+def export_resources(store, items, file_path, export_format=None, progress=None, header_format=None):
+    """
+    Streams the given (resource_type, name) resources into a file.
+
+    The format defaults to the one matching the file's extension; text files
+    introduce each resource in header_format (see remix.py). progress, if
+    given, is called with (done, total) every 100 resources and at the end.
+    Zip archives hold each resource once. Returns the number of resources
+    written.
+    """
+    export_format = export_format or export_format_for(file_path)
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'.")
+    items = list(items)
+
+    if export_format == "zip":
+        # A remix may hold a resource twice, but an archive member name must be unique; the copies are the same
+        items = list(dict.fromkeys(items))
+        with atomic_open(file_path, 'wb') as f:
+            _export_zip(store, items, f, progress)
+        return len(items)
+
+    write = {"txt": functools.partial(_write_txt, header_format=header_format), "md": _write_md,
+             "jsonl": _write_jsonl}[export_format]
+    previous_type = None
+    with atomic_open(file_path) as out:
+        for done, (resource_type, name, content) in enumerate(_iter_contents(store, items), 1):
+            write(out, resource_type, name, content, previous_type)
+            previous_type = resource_type
+            if progress is not None and (done % 100 == 0 or done == len(items)):
+                progress(done, len(items))
+    return len(items)
+
+
+def export_project(store, file_path, export_format=None, resource_types=None, progress=None):
+    """Streams every resource of a project (or of some categories) into a file. Returns the count."""
+    return export_resources(store, project_items(store, resource_types), file_path, export_format, progress)
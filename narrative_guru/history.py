@@ -0,0 +1,237 @@
+"""
+Revision history of resources.
+
+Every time a resource is overwritten, the new content is recorded as a
+revision in the project's .history.db, next to its resources. Most revisions
+are stored as a zlib-compressed line delta against the revision before them,
+so a large lore file edited dozens of times a day costs little more than its
+edits; every HISTORY_KEYFRAME_INTERVAL revisions a compressed full copy is
+stored instead, so reading any revision applies at most that many deltas.
+
+The history is self-contained: it does not depend on the current resource
+files, so it survives deleted resources and edits made outside the app (the
+content found before a write is recorded too if it is not the last revision).
+compact() bounds its size per resource and per project.
+"""
+
+import os
+import json
+import time
+import zlib
+import difflib
+import hashlib
+import sqlite3
+import threading
+
+from . import instrument
+
+HISTORY_DB_NAME = ".history.db"
+# Every this many revisions of a resource are stored in full rather than as a delta
+HISTORY_KEYFRAME_INTERVAL = 16
+# Compaction limits: revisions kept per resource, and compressed bytes per project
+HISTORY_MAX_REVISIONS = 100
+HISTORY_MAX_BYTES = 64 * 1024 * 1024
+
+
+def content_version(content):
+    """Returns a fingerprint of a resource body; updates name the version they were edited from."""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def make_delta(base, text):
+    """
+    Returns text as a compressed delta against base.
+
+    The delta is a JSON list of [start, end] ranges of base lines to copy and
+    strings to insert, in order.
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, base_lines, lines, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, ensure_ascii=False).encode('utf-8'))
+
+
+def apply_delta(base, delta):
+    """Rebuilds the text a delta was made from, given the same base."""
+    base_lines = base.splitlines(keepends=True)
+    pieces = []
+    for op in json.loads(zlib.decompress(delta)):
+        pieces.append(op if isinstance(op, str) else "".join(base_lines[op[0]:op[1]]))
+    return "".join(pieces)
+
+
+def diff_lines(old, new, old_label="revision", new_label="current"):
+    """Returns a unified diff between two contents, as lines without line ends."""
+    return list(difflib.unified_diff(old.splitlines(), new.splitlines(), old_label, new_label, lineterm=""))
+
+
+class ResourceHistory:
+    """
+    The revisions of a project's resources, in a small SQLite database.
+
+    Safe to use from the background I/O threads, one statement at a time.
+    Database errors are raised as OSError, like the packed store does.
+    """
+
+    def __init__(self, project_dir):
+        self.db_path = os.path.join(project_dir, HISTORY_DB_NAME)
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _connection(self):
+        """Opens the database on first use, so projects without history get no file."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS revisions (
+                                      type TEXT NOT NULL,
+                                      name TEXT NOT NULL,
+                                      rev INTEGER NOT NULL,
+                                      created REAL NOT NULL,
+                                      version TEXT NOT NULL,
+                                      size INTEGER NOT NULL,
+                                      keyframe INTEGER NOT NULL,
+                                      data BLOB NOT NULL,
+                                      PRIMARY KEY (type, name, rev))""")
+        return self._conn
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            try:
+                return self._connection().execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                raise OSError(f"History error: {e}") from e
+
+    def record(self, resource_type, name, old_content, new_content):
+        """
+        Records new_content as the latest revision of a resource.
+
+        old_content is what the resource held before the write (None for a new
+        resource); it is recorded first unless it is already the last revision.
+        """
+        with self._lock, instrument.timed("history.record", len(new_content)):
+            try:
+                with self._connection() as conn:
+                    last = conn.execute("""SELECT rev, version FROM revisions WHERE type = ? AND name = ?
+                                           ORDER BY rev DESC LIMIT 1""", (resource_type, name)).fetchone()
+                    rev = last[0] if last else 0
+                    base = None
+                    if old_content is not None:
+                        if last is None or last[1] != content_version(old_content):
+                            rev += 1
+                            self._insert(conn, resource_type, name, rev, old_content, None)
+                        base = old_content
+                    self._insert(conn, resource_type, name, rev + 1, new_content, base)
+            except sqlite3.Error as e:
+                raise OSError(f"History error: {e}") from e
+
+    def _insert(self, conn, resource_type, name, rev, content, base):
+        """Stores one revision, as a delta against base unless it is due to be a keyframe."""
+        keyframe = base is None or rev % HISTORY_KEYFRAME_INTERVAL == 1
+        data = zlib.compress(content.encode('utf-8')) if keyframe else make_delta(base, content)
+        conn.execute("INSERT INTO revisions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     (resource_type, name, rev, time.time(), content_version(content), len(content), int(keyframe),
+                      data))
+
+    def revisions(self, resource_type, name):
+        """Returns (rev, created timestamp, size in characters) of a resource's revisions, newest first."""
+        return [tuple(row) for row in self._execute("""SELECT rev, created, size FROM revisions
+                                                       WHERE type = ? AND name = ? ORDER BY rev DESC""",
+                                                    (resource_type, name))]
+
+    def get(self, resource_type, name, rev):
+        """Returns the content of a revision, from its keyframe and the deltas after it."""
+        with instrument.timed("history.get"):
+            rows = self._execute("""SELECT rev, keyframe, data FROM revisions WHERE type = ? AND name = ? AND rev <= ?
+                                    AND rev >= (SELECT MAX(rev) FROM revisions
+                                                WHERE type = ? AND name = ? AND rev <= ? AND keyframe = 1)
+                                    ORDER BY rev""", (resource_type, name, rev) * 2)
+            if not rows or rows[-1][0] != rev:
+                raise FileNotFoundError(f"Revision {rev} of '{name}' not found.")
+            content = None
+            for _, keyframe, data in rows:
+                content = zlib.decompress(data).decode('utf-8') if keyframe else apply_delta(content, data)
+            return content
+
+    def rename(self, resource_type, old_name, new_name):
+        """Moves the history of a renamed resource along with it."""
+        with self._lock:
+            try:
+                with self._connection() as conn:
+                    conn.execute("DELETE FROM revisions WHERE type = ? AND name = ?", (resource_type, new_name))
+                    conn.execute("UPDATE revisions SET name = ? WHERE type = ? AND name = ?",
+                                 (new_name, resource_type, old_name))
+            except sqlite3.Error as e:
+                raise OSError(f"History error: {e}") from e
+
+    def size(self):
+        """Returns the compressed size of all revisions in bytes."""
+        if not os.path.exists(self.db_path):
+            return 0
+        return self._execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM revisions")[0][0]
+
+    def _drop_before(self, conn, resource_type, name, rev):
+        """Deletes the revisions of a resource older than rev, turning rev into a keyframe if needed."""
+        row = conn.execute("SELECT keyframe FROM revisions WHERE type = ? AND name = ? AND rev = ?",
+                           (resource_type, name, rev)).fetchone()
+        if row is not None and not row[0]:
+            content = self.get(resource_type, name, rev)
+            conn.execute("UPDATE revisions SET keyframe = 1, data = ? WHERE type = ? AND name = ? AND rev = ?",
+                         (zlib.compress(content.encode('utf-8')), resource_type, name, rev))
+        return conn.execute("DELETE FROM revisions WHERE type = ? AND name = ? AND rev < ?",
+                            (resource_type, name, rev)).rowcount
+
+    def compact(self, max_revisions=HISTORY_MAX_REVISIONS, max_bytes=HISTORY_MAX_BYTES):
+        """
+        Drops the oldest revisions until every resource keeps at most
+        max_revisions and the project's history fits in max_bytes; the last
+        revision of each resource is always kept. Returns the number dropped.
+        """
+        if not os.path.exists(self.db_path):
+            return 0
+        dropped = 0
+        with self._lock, instrument.timed("history.compact"):
+            try:
+                conn = self._connection()
+                with conn:
+                    for resource_type, name, newest in conn.execute(
+                            """SELECT type, name, MAX(rev) FROM revisions GROUP BY type, name
+                               HAVING COUNT(*) > ?""", (max_revisions,)).fetchall():
+                        dropped += self._drop_before(conn, resource_type, name, newest - max_revisions + 1)
+
+                    # Turning the new oldest revision into a keyframe can take more room than was freed, so the
+                    # size is measured again after each pass until it fits or only last revisions are left
+                    while True:
+                        total = conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM revisions").fetchone()[0]
+                        if total <= max_bytes:
+                            break
+                        # Oldest first across the project, never the last revision of a resource
+                        rows = conn.execute("""SELECT r.type, r.name, r.rev, LENGTH(r.data) FROM revisions r
+                                               WHERE r.rev < (SELECT MAX(rev) FROM revisions
+                                                              WHERE type = r.type AND name = r.name)
+                                               ORDER BY r.created, r.rev""").fetchall()
+                        if not rows:
+                            break
+                        cutoffs = {}
+                        for resource_type, name, rev, size in rows:
+                            if total <= max_bytes:
+                                break
+                            cutoffs[(resource_type, name)] = rev + 1
+                            total -= size
+                        for (resource_type, name), rev in cutoffs.items():
+                            dropped += self._drop_before(conn, resource_type, name, rev)
+                if dropped:
+                    conn.execute("VACUUM")
+            except sqlite3.Error as e:
+                raise OSError(f"History error: {e}") from e
+        return dropped
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,274 @@
+"""
+Bulk import of resources exported from AI tools.
+
+A source is a folder of JSON files, a zip archive of them, a single JSON file,
+or a JSON Lines file (or standard input, '-') with one resource per line. Files
+inside a folder or archive named after a category (e.g. characters/Ann.json)
+go to that category; otherwise a resource's own "type" field or the default
+category given to the import decides.
+
+A resource object with a "content" string (or a compressed body, see
+schema.py) is taken as is, named after its "name" field or its file, and its
+other well-formed keys become its header fields, so a zip export of a project
+imports again without losing anything. Any other object is an AI export whose
+whole JSON becomes the content, just like pasting it into the New Resource
+window.
+"""
+
+import os
+import sys
+import json
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .storage import RESOURCE_TYPES, check_resource_name
+from .schema import COMPRESSED_CONTENT_KEY, check_fields, pop_content
+
+# Batches with more files than this are parsed by a pool of processes
+PARALLEL_IMPORT_THRESHOLD = 200
+DUPLICATE_POLICIES = ("skip", "rename", "replace")
+JSON_LINES_EXTENSIONS = (".jsonl", ".ndjson")
+TYPE_ALIASES = {"character": "characters", "location": "locations", "prop": "props",
+                "clothes": "clothing", "outfit": "clothing", "outfits": "clothing"}
+# Keys of a resource object that place it in a project rather than belong to its header
+PLACEMENT_KEYS = ("name", "title", "type", "category")
+
+
+class ImportReport:
+    """What a bulk import did: imported, renamed and skipped resources, and parse errors."""
+
+    def __init__(self):
+        self.imported = []  # (resource_type, name, content)
+        self.renamed = []  # (resource_type, original name, new name)
+        self.skipped = []  # (resource_type, name, reason)
+        self.errors = []  # (source, message)
+
+    def summary(self):
+        """Returns a short human readable account of the import."""
+        lines = [f"{len(self.imported)} resource(s) imported."]
+        if self.renamed:
+            lines.append(f"{len(self.renamed)} renamed to avoid duplicates.")
+        if self.skipped:
+            lines.append(f"{len(self.skipped)} skipped as duplicates.")
+        if self.errors:
+            lines.append(f"{len(self.errors)} could not be imported:")
+            lines.extend(f"  {source}: {message}" for source, message in self.errors[:10])
+            if len(self.errors) > 10:
+                lines.append(f"  ...and {len(self.errors) - 10} more")
+        return "\n".join(lines)
+
+
+def normalize_type(value):
+    """Maps a category name such as 'Character' or 'props' to one of RESOURCE_TYPES, or None."""
+    if not isinstance(value, str):
+        return None
+    value = value.strip().lower()
+    if value in RESOURCE_TYPES:
+        return value
+    return TYPE_ALIASES.get(value)
+
+
+def _type_from_path(relative_path):
+    """Returns the category named by one of the folders of a path inside a source, if any."""
+    for part in reversed(relative_path.replace("\\", "/").split("/")[:-1]):
+        resource_type = normalize_type(part)
+        if resource_type:
+            return resource_type
+    return None
+
+
+def _stem(path):
+    """Returns a file name without folders and extension."""
+    return os.path.splitext(os.path.basename(path.replace("\\", "/")))[0]
+
+
+def _resource_fields(value):
+    """Returns the header fields of a resource object, leaving out its body, its placement and malformed fields."""
+    fields = {}
+    for key, field in value.items():
+        if key in PLACEMENT_KEYS or key in ("content", COMPRESSED_CONTENT_KEY):
+            continue
+        try:
+            check_fields({key: field})
+        except ValueError:
+            continue
+        fields[key] = field
+    return fields
+
+
+def collect_tasks(source):
+    """
+    Lists the parse tasks of a source as (label, file path, data, category hint).
+
+    Folder files are passed by path so the parsing processes read them
+    themselves; archive members and stream lines are passed as data.
+    """
+    tasks = []
+    if source == "-" or source.lower().endswith(JSON_LINES_EXTENSIONS):
+        f = sys.stdin if source == "-" else open(source, 'r', encoding='utf-8-sig')
+        try:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    tasks.append((f"{source}:{line_number}", None, line, None))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    elif os.path.isdir(source):
+        for dir_path, dir_names, file_names in os.walk(source):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.lower().endswith((".json",) + JSON_LINES_EXTENSIONS):
+                    path = os.path.join(dir_path, file_name)
+                    tasks.append((path, path, None, _type_from_path(os.path.relpath(path, source))))
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for member in archive.namelist():
+                if member.lower().endswith((".json",) + JSON_LINES_EXTENSIONS):
+                    data = archive.read(member).decode('utf-8-sig')
+                    tasks.append((f"{source}:{member}", member, data, _type_from_path(member)))
+    else:
+        tasks.append((source, source, None, None))
+    return tasks
+
+
+def parse_task(task):
+    """
+    Parses one task into resources. Runs in the parsing processes.
+
+    Returns (records, errors): records are (resource_type or None, name,
+    content, header fields) and errors are (label, message).
+    """
+    label, path, data, type_hint = task
+    records, errors = [], []
+    try:
+        if data is None:
+            with open(path, 'r', encoding='utf-8-sig') as f:
+                data = f.read()
+        if path is not None and path.lower().endswith(JSON_LINES_EXTENSIONS):
+            values = [json.loads(line) for line in data.splitlines() if line.strip()]
+        else:
+            values = [json.loads(data)]
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return records, [(label, f"not valid JSON ({e})")]
+
+    # A file may also hold a list of resources
+    if len(values) == 1 and isinstance(values[0], list):
+        values = values[0]
+    default_name = _stem(path) if path is not None else None
+    for index, value in enumerate(values, 1):
+        if not isinstance(value, dict):
+            errors.append((label, "expected a JSON object"))
+            continue
+        name = value.get("name") or value.get("title")
+        if not isinstance(name, str) or not name.strip():
+            name = default_name if len(values) == 1 else (f"{default_name} {index}" if default_name else None)
+        fields = {}
+        if isinstance(value.get("content"), str):
+            content = value["content"]
+            fields = _resource_fields(value)
+        elif isinstance(value.get(COMPRESSED_CONTENT_KEY), str):
+            # A long resource copied out of a project folder
+            try:
+                content = pop_content(dict(value))
+            except ValueError as e:
+                errors.append((label, str(e)))
+                continue
+            fields = _resource_fields(value)
+        else:
+            content = json.dumps(value, indent=4, ensure_ascii=False)
+        resource_type = normalize_type(value.get("type") or value.get("category")) or type_hint
+        records.append((resource_type, name.strip() if name else None, content, fields))
+    return records, errors
+
+
+def parse_tasks(tasks, workers=None):
+    """Parses all tasks, in a process pool for large batches. Returns (records, errors)."""
+    if len(tasks) > PARALLEL_IMPORT_THRESHOLD and workers != 1:
+        try:
+            # Spawned rather than forked workers, since the caller may be a threaded GUI
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results = list(pool.map(parse_task, tasks, chunksize=64))
+        except (OSError, NotImplementedError, BrokenProcessPool):
+            # No working process support here (e.g. some sandboxes); parse in this process instead
+            results = [parse_task(task) for task in tasks]
+    else:
+        results = [parse_task(task) for task in tasks]
+
+    records, errors = [], []
+    for task_records, task_errors in results:
+        records.extend(task_records)
+        errors.extend(task_errors)
+    return records, errors
+
+
+def _free_name(name, taken):
+    """Returns 'name (2)', 'name (3)', ... whichever is not taken yet."""
+    number = 2
+    while f"{name} ({number})" in taken:
+        number += 1
+    return f"{name} ({number})"
+
+
+def plan_import(store, records, default_type=None, policy="skip", report=None):
+    """
+    Validates records and resolves name clashes with the project and within the batch.
+
+    Returns the writes to make (see ResourceStore.write_many; resources with
+    header fields replace those of the resource they overwrite) and the report.
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate policy '{policy}'.")
+    report = report if report is not None else ImportReport()
+    taken = {}
+    writes = {}
+    for resource_type, name, content, fields in records:
+        resource_type = resource_type or default_type
+        if resource_type not in RESOURCE_TYPES:
+            report.errors.append((name or "?", "no category; pick one for the import"))
+            continue
+        try:
+            check_resource_name(name)
+        except OSError as e:
+            report.errors.append((name or "?", str(e)))
+            continue
+
+        if resource_type not in taken:
+            taken[resource_type] = set(store.list_names(resource_type))
+        names = taken[resource_type]
+        if name in names:
+            if policy == "skip":
+                report.skipped.append((resource_type, name, "already exists"))
+                continue
+            if policy == "rename":
+                new_name = _free_name(name, names)
+                report.renamed.append((resource_type, name, new_name))
+                name = new_name
+        names.add(name)
+        writes[(resource_type, name)] = (content, fields)
+
+    report.imported = [(resource_type, name, content) for (resource_type, name), (content, _) in writes.items()]
+    return [(resource_type, name, content, fields) if fields else (resource_type, name, content)
+            for (resource_type, name), (content, fields) in writes.items()], report
+
+
+def import_resources(store, sources, default_type=None, policy="skip", workers=None):
+    """
+    Imports every resource found in the given sources into a store.
+
+    Parsing runs in parallel for large batches and everything is written in one
+    batch at the end. Returns an ImportReport.
+    """
+    report = ImportReport()
+    tasks = []
+    for source in sources:
+        try:
+            tasks.extend(collect_tasks(source))
+        except (OSError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+            report.errors.append((source, str(e)))
+    records, parse_errors = parse_tasks(tasks, workers)
+    report.errors.extend(parse_errors)
+    writes, report = plan_import(store, records, default_type, policy, report)
+    store.write_many(writes)
+    return report
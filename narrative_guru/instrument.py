@@ -0,0 +1,136 @@
+"""
+Opt-in timings and counters for storage operations and window updates.
+
+Recording is off unless the NARRATIVE_GURU_PROFILE environment variable is
+set to something other than 0 (or it is switched on from the app's menu), and
+costs next to nothing while off. Each named operation keeps a call count, total
+and longest time, and the bytes it read or wrote (characters for packed
+projects), so a slow click can be put down to disk, JSON parsing or Tk without
+attaching a profiler.
+
+Operation names start with their layer: storage.*, json.*, sqlite.*, io.*
+(background jobs), watch.* (the folder watcher), remote.* and server.* (the
+two ends of a workspace server), history.* (revisions), manifest.* (the per-project
+listing), blobs.* (resources shared between projects), bundles.* (rendered remix
+templates) and ui.* (work on the Tk thread). If the environment
+variable names a .json file, the recordings are saved there on exit.
+"""
+
+import os
+import json
+import time
+import functools
+import threading
+
+ENV_VAR = "NARRATIVE_GURU_PROFILE"
+
+enabled = os.environ.get(ENV_VAR, "0") not in ("", "0")
+
+_lock = threading.Lock()
+_stats = {}  # name -> [count, total seconds, longest seconds, bytes]
+_started = time.time()
+
+
+def dump_path():
+    """Returns the file named by the environment variable to save recordings to on exit, if any."""
+    value = os.environ.get(ENV_VAR, "")
+    return value if value.lower().endswith(".json") else None
+
+
+def enable(on=True):
+    """Switches recording on or off; what was recorded so far is kept."""
+    global enabled
+    enabled = on
+
+
+def record(name, seconds=0.0, size=0, count=1):
+    """Adds calls of an operation with their total time and bytes moved."""
+    if not enabled:
+        return
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = [0, 0.0, 0.0, 0]
+        stats[0] += count
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        stats[3] += size
+
+
+class _Timer:
+    """Times a with-block and records it; size may be set inside the block."""
+
+    __slots__ = ("name", "size", "start")
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start, self.size)
+
+
+class _NullTimer:
+    """Stands in for _Timer while recording is off."""
+
+    __slots__ = ()
+    size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_null_timer = _NullTimer()
+
+
+def timed(name, size=0):
+    """Returns a context manager recording the time of its block under the given name."""
+    return _Timer(name, size) if enabled else _null_timer
+
+
+def profiled(name):
+    """Decorates a function so its calls are recorded under the given name."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with _Timer(name, 0):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """Returns the recorded operations as a list of dicts, slowest in total first."""
+    with _lock:
+        items = [(name, list(stats)) for name, stats in _stats.items()]
+    rows = [{"name": name, "count": count, "total_ms": round(total * 1000, 3),
+             "mean_ms": round(total * 1000 / count, 3) if count else 0.0, "max_ms": round(longest * 1000, 3),
+             "bytes": size} for name, (count, total, longest, size) in items]
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+
+def reset():
+    """Forgets everything recorded so far."""
+    global _started
+    with _lock:
+        _stats.clear()
+        _started = time.time()
+
+
+def to_json():
+    """Returns the recorded operations as a JSON document."""
+    return json.dumps({"enabled": enabled, "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_started)),
+                       "operations": snapshot()}, indent=2)
@@ -0,0 +1,234 @@
+"""
+The manifest of a folder project.
+
+.manifest.db, next to the resources, lists every resource of the project with
+the size and mtime of its file, the content_version() of its body when known,
+its header fields and the beginning of its body. ResourceStore keeps it
+current with each of its own writes and reads it when the project is opened,
+so the catalogs and headers of a large project come from one small database
+instead of scanning four folders and opening every file.
+
+The manifest is only a cache and never trusted blindly. Each category records
+the mtime its folder had when it was last listed, and a folder that changed
+since (resources added, removed or renamed by someone else) is scanned again;
+a resource whose file no longer has the recorded size and mtime is read again.
+An update that fails (e.g. the database is locked by another process) is
+skipped, as the next check notices what it missed, and a damaged manifest is
+deleted and built again. ResourceStore.verify_manifest() and
+rebuild_manifest() compare it with the files and write it anew.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+
+from . import instrument
+
+MANIFEST_DB_NAME = ".manifest.db"
+# Header updates learned from reads are written once this many are pending
+MANIFEST_FLUSH_COUNT = 500
+
+
+class ProjectManifest:
+    """
+    The manifest database of one project.
+
+    Safe to use from the background I/O threads. Methods never raise on
+    database errors; reads then return nothing and writes are dropped.
+    """
+
+    def __init__(self, project_dir):
+        self.db_path = os.path.join(project_dir, MANIFEST_DB_NAME)
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pending = {}  # (resource_type, name) -> row learned from a read, written in batches
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=1)
+            # A cache: a write lost in a crash is noticed and redone, so nothing is flushed to disk
+            self._conn.execute("PRAGMA synchronous = OFF")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS folders (
+                                      type TEXT PRIMARY KEY,
+                                      mtime INTEGER)""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                                      type TEXT NOT NULL,
+                                      name TEXT NOT NULL,
+                                      mtime INTEGER,
+                                      size INTEGER,
+                                      version TEXT,
+                                      fields TEXT,
+                                      excerpt TEXT,
+                                      PRIMARY KEY (type, name))""")
+        return self._conn
+
+    def _run(self, work, default=None):
+        """Runs work(connection) in a transaction; database errors give default."""
+        with self._lock:
+            try:
+                conn = self._connection()
+                with conn:
+                    return work(conn)
+            except sqlite3.OperationalError:
+                instrument.record("manifest.skipped")  # busy or locked; the next check catches up
+            except sqlite3.DatabaseError:
+                instrument.record("manifest.damaged")
+                self._discard()
+            return default
+
+    def _discard(self):
+        """Deletes a damaged manifest; it is built again as the project is used."""
+        self.close()
+        for suffix in ("", "-journal"):
+            try:
+                os.remove(self.db_path + suffix)
+            except OSError:
+                pass
+
+    def names(self, resource_type, folder_mtime):
+        """
+        Returns the sorted names of a category if its folder still has the
+        mtime recorded with them, None if it has to be scanned.
+        """
+        def load(conn):
+            row = conn.execute("SELECT mtime FROM folders WHERE type = ?", (resource_type,)).fetchone()
+            if row is None or row[0] != folder_mtime:
+                return None
+            # SQLite compares UTF-8 bytes, which sorts like Python compares strings
+            return [name for name, in conn.execute("SELECT name FROM entries WHERE type = ? ORDER BY name",
+                                                   (resource_type,))]
+
+        with instrument.timed("manifest.names"):
+            return self._run(load)
+
+    def set_names(self, resource_type, folder_mtime, names):
+        """Records the names found by scanning a category folder with the given mtime."""
+        def store(conn):
+            known = {name for name, in conn.execute("SELECT name FROM entries WHERE type = ?", (resource_type,))}
+            conn.executemany("DELETE FROM entries WHERE type = ? AND name = ?",
+                             [(resource_type, name) for name in known - names])
+            conn.executemany("INSERT INTO entries (type, name) VALUES (?, ?)",
+                             [(resource_type, name) for name in names - known])
+            conn.execute("INSERT OR REPLACE INTO folders VALUES (?, ?)", (resource_type, folder_mtime))
+
+        with instrument.timed("manifest.set_names"):
+            self._run(store)
+
+    def headers(self, resource_type, names):
+        """Returns {name: ((mtime, size), fields, excerpt)} of the given resources whose header is recorded."""
+        def load(conn):
+            found = {}
+            for start in range(0, len(names), 500):
+                batch = names[start:start + 500]
+                placeholders = ", ".join("?" * len(batch))
+                for name, mtime, size, fields, excerpt in conn.execute(
+                        f"""SELECT name, mtime, size, fields, excerpt FROM entries
+                            WHERE type = ? AND fields IS NOT NULL AND name IN ({placeholders})""",
+                        (resource_type, *batch)):
+                    found[name] = ((mtime, size), json.loads(fields), excerpt)
+            return found
+
+        with self._lock:
+            self._flush()
+        with instrument.timed("manifest.headers"):
+            return self._run(load, {})
+
+    @staticmethod
+    def _folder_update(resource_type, folder_mtimes):
+        """
+        The statement advancing a folder's recorded mtime over our own change,
+        only if nobody else changed the folder before it.
+        """
+        before, after = folder_mtimes
+        return "UPDATE folders SET mtime = ? WHERE type = ? AND mtime = ?", (after, resource_type, before)
+
+    def record(self, resource_type, items, folder_mtimes):
+        """
+        Records resources just written: items are (name, (mtime, size), version,
+        fields, excerpt). folder_mtimes are the mtimes of the category folder
+        before and after the write.
+        """
+        def store(conn):
+            conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(resource_type, name, signature[0], signature[1], version,
+                               json.dumps(fields or {}), excerpt)
+                              for name, signature, version, fields, excerpt in items])
+            conn.execute(*self._folder_update(resource_type, folder_mtimes))
+
+        with self._lock:
+            for name, *_ in items:
+                self._pending.pop((resource_type, name), None)
+        with instrument.timed("manifest.record"):
+            self._run(store)
+
+    def remember(self, resource_type, name, signature, fields, excerpt):
+        """Notes a header learned by reading a file; written with the next batch."""
+        with self._lock:
+            self._pending[(resource_type, name)] = (signature, fields, excerpt)
+            if len(self._pending) >= MANIFEST_FLUSH_COUNT:
+                self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        rows = [(*signature, *signature, json.dumps(fields), excerpt, resource_type, name)
+                for (resource_type, name), (signature, fields, excerpt) in self._pending.items()]
+        self._pending.clear()
+
+        def store(conn):
+            # The content version is kept only while the file is unchanged
+            conn.executemany("""UPDATE entries SET version = CASE WHEN mtime = ? AND size = ? THEN version END,
+                                                   mtime = ?, size = ?, fields = ?, excerpt = ?
+                                WHERE type = ? AND name = ?""", rows)
+
+        with instrument.timed("manifest.flush"):
+            self._run(store)
+
+    def rename(self, resource_type, old_name, new_name, folder_mtimes):
+        def store(conn):
+            conn.execute("DELETE FROM entries WHERE type = ? AND name = ?", (resource_type, new_name))
+            conn.execute("UPDATE entries SET name = ? WHERE type = ? AND name = ?", (new_name, resource_type, old_name))
+            conn.execute(*self._folder_update(resource_type, folder_mtimes))
+
+        with self._lock:
+            self._pending.pop((resource_type, old_name), None)
+            self._run(store)
+
+    def remove(self, resource_type, name, folder_mtimes):
+        def store(conn):
+            conn.execute("DELETE FROM entries WHERE type = ? AND name = ?", (resource_type, name))
+            conn.execute(*self._folder_update(resource_type, folder_mtimes))
+
+        with self._lock:
+            self._pending.pop((resource_type, name), None)
+            self._run(store)
+
+    def entries(self, resource_type):
+        """Returns {name: (mtime, size, version)} of a category as recorded."""
+        with self._lock:
+            self._flush()
+            return self._run(lambda conn: {name: (mtime, size, version) for name, mtime, size, version in conn.execute(
+                "SELECT name, mtime, size, version FROM entries WHERE type = ?", (resource_type,))}, {})
+
+    def folder_mtime(self, resource_type):
+        row = self._run(lambda conn: conn.execute("SELECT mtime FROM folders WHERE type = ?",
+                                                  (resource_type,)).fetchone())
+        return row[0] if row else None
+
+    def clear(self):
+        """Forgets everything, before a rebuild."""
+        def store(conn):
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM folders")
+
+        with self._lock:
+            self._pending.clear()
+            self._run(store)
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,142 @@
+"""
+Links between resources.
+
+A resource lists the resources it is linked to in the "relations" field of
+its header (see schema.py), e.g. a character's
+{"clothing": ["Red Scarf"], "locations": ["Tavern"]}. RelationIndex holds
+those links both ways, so "what is linked to this prop" is answered from
+memory instead of reading every resource.
+"""
+
+from .storage import RESOURCE_TYPES
+
+# Headers read at a time while building the index
+RELATION_READ_BATCH = 200
+
+
+def relation_items(relations):
+    """Returns the (resource_type, name) pairs of a relations field by category, known categories only."""
+    items = []
+    for resource_type in RESOURCE_TYPES:
+        for name in relations.get(resource_type, []):
+            if (resource_type, name) not in items:
+                items.append((resource_type, name))
+    return items
+
+
+def relations_from_items(items):
+    """Returns the relations field listing the given (resource_type, name) pairs."""
+    relations = {}
+    for resource_type, name in items:
+        names = relations.setdefault(resource_type, [])
+        if name not in names:
+            names.append(name)
+    return relations
+
+
+class RelationIndex:
+    """
+    Adjacency index of the links between a project's resources.
+
+    Built once from the resource headers (never the bodies) and then kept
+    current by calling set_links(), remove() and rename() whenever a
+    resource's relations change.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._links = {}  # (resource_type, name) -> [(resource_type, name) it links to]
+        self._backlinks = {}  # (resource_type, name) -> {(resource_type, name) linking to it}
+
+    def build(self):
+        """Reads the relations of every resource of the store."""
+        for resource_type in RESOURCE_TYPES:
+            names = self.store.list_names(resource_type)
+            for start in range(0, len(names), RELATION_READ_BATCH):
+                batch = names[start:start + RELATION_READ_BATCH]
+                headers = self.store.read_headers([(resource_type, name) for name in batch])
+                for name, header in zip(batch, headers):
+                    if header is not None and header["relations"]:
+                        self.set_links(resource_type, name, header["relations"])
+
+    def set_links(self, resource_type, name, relations):
+        """Replaces the links of a resource with those of its relations field."""
+        source = (resource_type, name)
+        self._drop_links(source)
+        targets = relation_items(relations)
+        if targets:
+            self._links[source] = targets
+            for target in targets:
+                self._backlinks.setdefault(target, set()).add(source)
+
+    def _drop_links(self, source):
+        for target in self._links.pop(source, ()):
+            sources = self._backlinks[target]
+            sources.discard(source)
+            if not sources:
+                del self._backlinks[target]
+
+    def remove(self, resource_type, name):
+        """Forgets the links of a removed resource; links to it stay until their sources change."""
+        self._drop_links((resource_type, name))
+
+    def rename(self, resource_type, old_name, new_name):
+        """
+        Moves the links of a renamed resource to its new name. Links to it
+        change with the resources holding them (see rename_references).
+        """
+        targets = self._links.get((resource_type, old_name))
+        self._drop_links((resource_type, old_name))
+        if targets:
+            self.set_links(resource_type, new_name, relations_from_items(targets))
+
+    def links(self, resource_type, name):
+        """Returns the (resource_type, name) pairs a resource links to, by category."""
+        return list(self._links.get((resource_type, name), ()))
+
+    def backlinks(self, resource_type, name):
+        """Returns the sorted (resource_type, name) pairs of the resources linking to a resource."""
+        return sorted(self._backlinks.get((resource_type, name), ()))
+
+    def __len__(self):
+        return len(self._links)
+
+
+def rename_references(store, sources, resource_type, old_name, new_name):
+    """
+    Updates the relations of the given resources (the backlinks of a renamed
+    resource) to its new name. Resources that are gone meanwhile are skipped.
+    Returns (source, new relations) of the resources that were updated.
+    """
+    updated = []
+    for source in sources:
+        try:
+            relations = store.read_header(*source)["relations"]
+        except FileNotFoundError:
+            continue
+        names = relations.get(resource_type, [])
+        if old_name in names:
+            relations[resource_type] = [new_name if name == old_name else name for name in names]
+            store.write_header(*source, {"relations": relations})
+            updated.append((source, relations))
+    return updated
+
+
+def expand_links(store, items):
+    """
+    Returns the (resource_type, name) items each followed by the resources it
+    links to, every resource once. Links to resources that no longer exist
+    are left out.
+    """
+    expanded = []
+    for item in items:
+        if item not in expanded:
+            expanded.append(item)
+        try:
+            relations = store.read_header(*item)["relations"]
+        except FileNotFoundError:
+            continue
+        for linked in relation_items(relations):
+            if linked not in expanded and store.exists(*linked):
+                expanded.append(linked)
+    return expanded
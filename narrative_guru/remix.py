@@ -0,0 +1,70 @@
+"""Assembling Remix Station contexts from project resources."""
+
+import string
+
+# How a resource is introduced in a remix. Formats name the resource as {name}, its
+# category as {type} (e.g. "Characters") or {category} (e.g. "characters").
+DEFAULT_HEADER_FORMAT = "--- {name} ({type}) ---"
+HEADER_FORMATS = {
+    "dashes": DEFAULT_HEADER_FORMAT,
+    "markdown": "## {name} ({type})",
+    "brackets": "[{type}: {name}]",
+}
+HEADER_FORMAT_FIELDS = ("name", "type", "category")
+
+
+def check_header_format(header_format):
+    """Raises ValueError unless header_format is a format naming the resource and only known fields."""
+    try:
+        fields = [field for _, field, _, _ in string.Formatter().parse(header_format) if field is not None]
+    except ValueError as e:
+        raise ValueError(f"Invalid header format '{header_format}': {e}") from e
+    for field in fields:
+        if field not in HEADER_FORMAT_FIELDS:
+            raise ValueError(f"Unknown field '{{{field}}}' in header format; use {{name}}, {{type}} or {{category}}.")
+    if "name" not in fields:
+        raise ValueError("A header format has to name the resource with {name}.")
+    if "\n" in header_format:
+        raise ValueError("A header format has to fit on one line.")
+
+
+def resolve_header_format(header_format):
+    """Returns the format string of a preset name or format; None or empty gives the default."""
+    if not header_format:
+        return DEFAULT_HEADER_FORMAT
+    if header_format in HEADER_FORMATS:
+        return HEADER_FORMATS[header_format]
+    check_header_format(header_format)
+    return header_format
+
+
+def format_remix_header(resource_name, resource_type, header_format=None):
+    """Returns the header line introducing a resource in a remix, in the given format if any."""
+    if header_format is None or header_format == DEFAULT_HEADER_FORMAT:
+        return f"--- {resource_name} ({resource_type.title()}) ---"
+    return header_format.format(name=resource_name, type=resource_type.title(), category=resource_type)
+
+
+def format_remix_block(resource_name, resource_type, content, header_format=None):
+    """Returns the text a resource adds to a remix: its header, its content and a blank line."""
+    return f"{format_remix_header(resource_name, resource_type, header_format)}\n{content}\n\n"
+
+
+def iter_remix_blocks(store, items, header_format=None):
+    """Yields the remix block of each (resource_type, name), reading a resource only when its turn comes."""
+    for resource_type, name in items:
+        yield format_remix_block(name, resource_type, store.read(resource_type, name), header_format)
+
+
+def write_remix(store, items, out, header_format=None):
+    """Streams a remix into a text file object one resource at a time and returns the characters written."""
+    written = 0
+    for resource_type, name in items:
+        # Written piece by piece so a large resource is never copied into a joined block
+        header = format_remix_header(name, resource_type, header_format)
+        content = store.read(resource_type, name, cache=False)
+        out.write(f"{header}\n")
+        out.write(content)
+        out.write("\n\n")
+        written += len(header) + len(content) + 3
+    return written
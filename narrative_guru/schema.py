@@ -0,0 +1,257 @@
+"""
+The resource file format.
+
+A resource file is a JSON object whose "content" is the body of the resource,
+the text the Preview Window and the Remix Station show. Next to it a resource
+may carry header fields:
+
+    summary      a short description, shown when hovering over the catalog
+    tags         a list of strings
+    relations    {category: [names]}, the resources this one is linked to
+    attachments  a list of file names or links
+
+Files with only "content" (everything written before these fields existed)
+are still valid and are written back exactly as before. Keys this version does
+not know are kept as they are.
+
+The app writes the header fields ahead of the body, so a header is read from
+the first few kilobytes of a file without parsing (or even reading) a body of
+several megabytes. Fields placed after the body by hand are only seen when the
+whole resource is read.
+
+Bodies of COMPRESS_MIN_CHARS characters or more (chapter drafts and the like)
+are stored gzip-compressed and base64-encoded in "content_gzip" instead of
+"content", which makes the file several times smaller and faster to read. The
+header and the excerpt are still read from the start of the file: only the
+beginning of the compressed body is inflated for the excerpt. Packed projects
+store the same gzip data, without base64, in their database (see
+compress_body).
+"""
+
+import gzip
+import json
+import zlib
+import base64
+import binascii
+from json.decoder import scanstring
+
+# Header fields and their values when a resource has none
+HEADER_FIELDS = {"summary": "", "tags": [], "relations": {}, "attachments": []}
+# Characters of the body given along with a header, for resources without a summary
+HEADER_EXCERPT_CHARS = 200
+# Characters read from the start of a file at first when only its header is needed
+HEADER_READ_CHARS = 16 * 1024
+# Bodies at least this long are stored compressed, under this key
+COMPRESS_MIN_CHARS = 256 * 1024
+COMPRESSED_CONTENT_KEY = "content_gzip"
+# gzip level: a few MB compress in about 0.1 s, most of what higher levels would save
+COMPRESS_LEVEL = 3
+# At most this much of a compressed body is decoded for its excerpt
+COMPRESSED_EXCERPT_CHARS = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+class _Incomplete(Exception):
+    """The text read so far ends before the header does."""
+
+
+def _gzip(content):
+    # No timestamp in the gzip header, so equal bodies give equal files (see blobs.py)
+    return gzip.compress(content.encode('utf-8'), compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+def compress_content(content):
+    """Returns a body as compressed base64 text, or None if it is too short to be worth it."""
+    if len(content) < COMPRESS_MIN_CHARS:
+        return None
+    packed = base64.b64encode(_gzip(content)).decode('ascii')
+    return packed if len(packed) < len(content) else None
+
+
+def compress_body(content):
+    """Returns a body as gzip bytes for a database, or None if it is too short to be worth it."""
+    if len(content) < COMPRESS_MIN_CHARS:
+        return None
+    compressed = _gzip(content)
+    return compressed if len(compressed) < len(content) else None
+
+
+def inflate_body(data):
+    """Returns the body compressed into gzip bytes, raising ValueError if they are damaged."""
+    try:
+        return gzip.decompress(data).decode('utf-8')
+    except (TypeError, OSError, EOFError, zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(f"damaged compressed content: {e}") from e
+
+
+def inflate_excerpt(data):
+    """Returns the excerpt of a body from the beginning of its gzip bytes, inflating no more than that."""
+    try:
+        inflater = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)  # gzip framing
+        data = inflater.decompress(data, HEADER_EXCERPT_CHARS * 4)
+    except zlib.error:
+        return ""
+    return data.decode('utf-8', errors='ignore')[:HEADER_EXCERPT_CHARS]
+
+
+def pop_content(data):
+    """Removes the body from a resource object and returns it, decompressing it if needed."""
+    packed = data.pop(COMPRESSED_CONTENT_KEY, None)
+    content = data.pop("content", "")
+    if packed is None:
+        return content
+    try:
+        compressed = base64.b64decode(packed)
+    except (TypeError, binascii.Error) as e:
+        raise ValueError(f"damaged compressed content: {e}") from e
+    return inflate_body(compressed)
+
+
+def encode_resource(content, fields=None):
+    """Returns the text of a resource file, header fields first and the body (compressed if long) last."""
+    data = dict(fields or {})
+    data.pop("content", None)
+    data.pop(COMPRESSED_CONTENT_KEY, None)
+    packed = compress_content(content)
+    if packed is not None:
+        data[COMPRESSED_CONTENT_KEY] = packed
+    else:
+        data["content"] = content
+    return json.dumps(data, indent=4)
+
+
+def decode_resource(text):
+    """Returns (content, fields) of a resource file's text."""
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("not a resource object")
+    content = pop_content(data)
+    return content, data
+
+
+def check_fields(fields):
+    """Raises ValueError if header fields have the wrong shape."""
+    if not isinstance(fields, dict):
+        raise ValueError("header fields must be an object")
+    if "content" in fields or COMPRESSED_CONTENT_KEY in fields:
+        raise ValueError("the body is not a header field")
+    if not isinstance(fields.get("summary", ""), str):
+        raise ValueError("summary must be a string")
+    for name in ("tags", "attachments"):
+        value = fields.get(name, [])
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ValueError(f"{name} must be a list of strings")
+    relations = fields.get("relations", {})
+    if not isinstance(relations, dict) or not all(
+            isinstance(names, list) and all(isinstance(name, str) for name in names) for names in relations.values()):
+        raise ValueError("relations must map categories to lists of names")
+
+
+def resource_header(fields, excerpt=""):
+    """
+    Returns the header of a resource: every header field (defaults for the
+    missing or malformed ones), the keys unknown to this version and the
+    beginning of the body as "excerpt".
+    """
+    header = dict(fields)
+    for name, default in HEADER_FIELDS.items():
+        value = header.get(name)
+        if not isinstance(value, type(default)):
+            header[name] = type(default)()
+    header["excerpt"] = excerpt
+    return header
+
+
+def stored_fields(header):
+    """Returns the header fields worth writing out of a header: no excerpt and no fields left at their defaults."""
+    return {name: value for name, value in header.items()
+            if name != "excerpt" and not (name in HEADER_FIELDS and value == HEADER_FIELDS[name])}
+
+
+def _skip(text, pos):
+    while text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _excerpt(text, pos, complete):
+    """Decodes the beginning of the body string starting at pos, however far it is in text."""
+    if text[pos] != '"':
+        return ""
+    piece = text[pos + 1:pos + 1 + HEADER_EXCERPT_CHARS * 6]  # \uXXXX takes six characters
+    if len(piece) < HEADER_EXCERPT_CHARS * 6 and '"' not in piece and not complete:
+        raise _Incomplete()
+    # The piece may end inside an escape; shorten it until it decodes
+    for end in range(len(piece), max(len(piece) - 6, 0) - 1, -1):
+        try:
+            return scanstring(piece[:end] + '"', 0)[0][:HEADER_EXCERPT_CHARS]
+        except ValueError:
+            continue
+    return ""
+
+
+def _compressed_excerpt(text, pos, complete):
+    """Inflates just enough of the compressed body string starting at pos for the excerpt."""
+    if text[pos] != '"':
+        return ""
+    end = text.find('"', pos + 1)
+    piece = text[pos + 1:end if end != -1 else len(text)][:COMPRESSED_EXCERPT_CHARS]
+    try:
+        excerpt = inflate_excerpt(base64.b64decode(piece[:len(piece) // 4 * 4]))
+    except binascii.Error:
+        return ""
+    if len(excerpt) < HEADER_EXCERPT_CHARS and end == -1 and len(piece) < COMPRESSED_EXCERPT_CHARS and not complete:
+        raise _Incomplete()
+    return excerpt
+
+
+def _scan_header(text, complete):
+    """Returns (fields, excerpt) from the start of a resource file's text."""
+    try:
+        pos = _skip(text, 0)
+        if text[pos] != "{":
+            raise ValueError("not a resource object")
+        pos = _skip(text, pos + 1)
+        fields = {}
+        while text[pos] != "}":
+            if text[pos] != '"':
+                raise ValueError(f"expected a key at {pos}")
+            key, pos = scanstring(text, pos + 1)
+            pos = _skip(text, pos)
+            if text[pos] != ":":
+                raise ValueError(f"expected ':' at {pos}")
+            pos = _skip(text, pos + 1)
+            if key == "content":
+                return fields, _excerpt(text, pos, complete)
+            if key == COMPRESSED_CONTENT_KEY:
+                return fields, _compressed_excerpt(text, pos, complete)
+            fields[key], pos = _decoder.raw_decode(text, pos)
+            pos = _skip(text, pos)
+            if text[pos] == ",":
+                pos = _skip(text, pos + 1)
+            elif text[pos] != "}":
+                raise ValueError(f"expected ',' at {pos}")
+        return fields, ""
+    except (ValueError, IndexError):
+        if complete:
+            raise ValueError("not a complete resource object")
+        raise _Incomplete()
+
+
+def read_header_fields(f):
+    """
+    Returns (fields, excerpt) of a resource file opened for reading, reading
+    no further than the start of its body.
+    """
+    text = ""
+    size = HEADER_READ_CHARS
+    while True:
+        chunk = f.read(size)
+        text += chunk
+        complete = len(chunk) < size
+        try:
+            return _scan_header(text, complete)
+        except _Incomplete:
+            size *= 2
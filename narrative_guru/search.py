@@ -0,0 +1,152 @@
+"""Full-text search over the resources of a project."""
+
+import re
+import math
+import heapq
+from collections import Counter
+
+from .storage import RESOURCE_TYPES
+
+# Search ranking: how much more a word in the resource name counts than one in its content
+SEARCH_NAME_WEIGHT = 3
+SEARCH_MAX_RESULTS = 200
+# Resources read at a time while building the index
+SEARCH_READ_BATCH = 100
+
+
+class SearchIndex:
+    """
+    Inverted index over the names and contents of a project's resources.
+
+    The index is built once from the store and then kept current by calling
+    add(), remove() and rename() whenever a resource changes. Queries match all
+    of their words (and "quoted phrases") and are ranked with BM25.
+    """
+
+    TOKEN_RE = re.compile(r"\w+")
+    PHRASE_RE = re.compile(r'"([^"]*)"')
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, store):
+        self.store = store
+        self._postings = {}  # term -> {doc: term frequency}
+        self._doc_terms = {}  # doc -> Counter of its terms
+        self._doc_lengths = {}  # doc -> number of terms
+        self._total_length = 0
+
+    @classmethod
+    def tokenize(cls, text):
+        """Splits text into lowercase word tokens."""
+        return cls.TOKEN_RE.findall(text.lower())
+
+    def build(self):
+        """Indexes every resource of the store."""
+        for resource_type in RESOURCE_TYPES:
+            names = self.store.list_names(resource_type)
+            # Read in batches, which a store on a server fetches in one request each
+            for start in range(0, len(names), SEARCH_READ_BATCH):
+                batch = names[start:start + SEARCH_READ_BATCH]
+                contents = self.store.read_many([(resource_type, name) for name in batch])
+                for name, content in zip(batch, contents):
+                    # Unreadable resources (None) are simply left out of the results
+                    if content is not None:
+                        self.add(resource_type, name, content)
+
+    def add(self, resource_type, name, content):
+        """Indexes a resource, replacing any previous entry for it."""
+        self.remove(resource_type, name)
+        terms = Counter(self.tokenize(content))
+        for term in self.tokenize(name):
+            terms[term] += SEARCH_NAME_WEIGHT
+        self._add_terms((resource_type, name), terms)
+
+    def _add_terms(self, doc, terms):
+        """Records the term frequencies of a document that is not in the index."""
+        self._doc_terms[doc] = terms
+        self._doc_lengths[doc] = sum(terms.values())
+        self._total_length += self._doc_lengths[doc]
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc] = frequency
+
+    def remove(self, resource_type, name):
+        """Removes a resource from the index."""
+        doc = (resource_type, name)
+        terms = self._doc_terms.pop(doc, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+
+    def rename(self, resource_type, old_name, new_name):
+        """Moves the entry of a renamed resource, swapping only its name terms."""
+        terms = self._doc_terms.get((resource_type, old_name))
+        if terms is None:
+            return
+        terms = Counter(terms)
+        for term in self.tokenize(old_name):
+            terms[term] -= SEARCH_NAME_WEIGHT
+        for term in self.tokenize(new_name):
+            terms[term] += SEARCH_NAME_WEIGHT
+        self.remove(resource_type, old_name)
+        self._add_terms((resource_type, new_name), +terms)
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def search(self, query, limit=SEARCH_MAX_RESULTS):
+        """Returns up to 'limit' (score, resource_type, name) tuples, best match first."""
+        phrases = [self.tokenize(p) for p in self.PHRASE_RE.findall(query)]
+        phrases = [p for p in phrases if p]
+        terms = list(dict.fromkeys(self.tokenize(query)))
+        if not terms or not self._doc_terms:
+            return []
+
+        postings = [self._postings.get(term) for term in terms]
+        if not all(postings):
+            return []
+
+        # Intersect starting from the rarest term so the candidate set stays small
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates.intersection_update(other)
+            if not candidates:
+                return []
+
+        doc_count = len(self._doc_terms)
+        average_length = self._total_length / doc_count
+        weights = [(p, math.log(1 + (doc_count - len(p) + 0.5) / (len(p) + 0.5))) for p in postings]
+
+        def score(doc):
+            length_norm = self.K1 * (1 - self.B + self.B * self._doc_lengths[doc] / average_length)
+            total = 0.0
+            for term_postings, idf in weights:
+                frequency = term_postings[doc]
+                total += idf * frequency * (self.K1 + 1) / (frequency + length_norm)
+            return total
+
+        ranked = ((score(doc), doc) for doc in candidates)
+        if not phrases:
+            best = heapq.nlargest(limit, ranked)
+        else:
+            # Phrases are checked against the text itself, best candidates first
+            best = []
+            for doc_score, doc in sorted(ranked, reverse=True):
+                if self._contains_phrases(doc, phrases):
+                    best.append((doc_score, doc))
+                    if len(best) >= limit:
+                        break
+        return [(doc_score, resource_type, name) for doc_score, (resource_type, name) in best]
+
+    def _contains_phrases(self, doc, phrases):
+        """Checks whether a resource contains every phrase as consecutive words."""
+        try:
+            text = " ".join(self.tokenize(doc[1] + "\n" + self.store.read(*doc)))
+        except (OSError, ValueError):
+            return False
+        return all(f" {' '.join(p)} " in f" {text} " for p in phrases)
@@ -0,0 +1,369 @@
+"""
+Serving a workspace to other machines over HTTP.
+
+Instead of everyone opening the projects on a network drive, one machine runs
+
+    python -m narrative_guru serve --root NarrativeGuru --host 0.0.0.0 --port 8765 --token SECRET
+
+and the others point the app at it (see client.py). Every request is a small
+JSON exchange over a kept-alive connection, listings and batches of resources
+travel in one request each, and updates name the version they were edited
+from, so two writers can no longer silently overwrite each other.
+
+    GET    /projects                        {"projects": [names]}
+    POST   /projects                        {"name", "packed"} creates a project
+    GET    /projects/P/resources            {"resources": {type: [names]}}
+    GET    /projects/P/resources/T/N        {"content"}
+    PUT    /projects/P/resources/T/N        {"content"} writes; If-Match: "version"
+                                            fails with 412 if it changed meanwhile,
+                                            If-None-Match: * (creating it, with
+                                            optional header "fields") with 409 if
+                                            it exists
+    DELETE /projects/P/resources/T/N
+    POST   /projects/P/read                 {"items": [[type, name]]} ->
+                                            {"contents": [content or null]}
+    POST   /projects/P/write                {"items": [[type, name, content]]}, items
+                                            with a fourth value replacing the
+                                            header fields
+    POST   /projects/P/rename               {"type", "name", "new_name"}, 409 if
+                                            new_name exists
+    POST   /projects/P/headers              {"items": [[type, name]]} ->
+                                            {"headers": [header or null]}
+    POST   /projects/P/write_header         {"type", "name", "fields"}
+    GET    /projects/P/history/T/N          {"revisions": [[rev, created, size]]}, newest first
+    GET    /projects/P/history/T/N/REV      {"content"} of one revision
+    POST   /projects/P/signatures           {"items": [[type, name]]} ->
+                                            {"signatures": [signature or null]}
+    GET    /projects/P/templates            {"templates": {name: template}}
+    PUT    /projects/P/templates/NAME       {"template"} saves a remix template
+    DELETE /projects/P/templates/NAME
+
+Resource responses carry an ETag (the content_version() of the body) and
+answer If-None-Match with 304, so unchanged resources and listings are not
+sent again. Errors come back as {"error": message} with the status telling
+what kind: 400 bad request (e.g. a resource name with a path in it), 404
+missing, 409 already exists, 412 changed meanwhile.
+"""
+
+import os
+import hmac
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote
+
+from . import instrument
+from .blobs import refresh_library_links
+from .storage import (
+    RESOURCE_TYPES, ConflictError, content_version, check_resource_name, create_project, list_projects,
+    open_resource_store, recover_workspace,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Largest request body accepted, in bytes
+SERVER_MAX_REQUEST_BYTES = 256 * 1024 * 1024
+
+
+class RequestError(Exception):
+    """A request the server refuses, with the HTTP status to answer with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def error_status(e):
+    """Returns the HTTP status reporting an exception raised by a store."""
+    if isinstance(e, RequestError):
+        return e.status
+    if isinstance(e, FileNotFoundError):
+        return 404
+    if isinstance(e, FileExistsError):
+        return 409
+    if isinstance(e, ConflictError):
+        return 412
+    if isinstance(e, (ValueError, KeyError, TypeError)):
+        return 400
+    return 500
+
+
+def check_item(resource_type, name):
+    """Refuses a category or resource name that is not one of the project's, before any store sees it."""
+    if resource_type not in RESOURCE_TYPES:
+        raise RequestError(400, f"Unknown category '{resource_type}'.")
+    if not isinstance(name, str):
+        raise RequestError(400, "resource names must be strings")
+    try:
+        check_resource_name(name)
+    except OSError as e:
+        raise RequestError(400, str(e)) from e
+
+
+def _items(body):
+    """Returns the checked (resource_type, name) items of a batch request."""
+    items = [tuple(item) for item in body["items"]]
+    for item in items:
+        if len(item) != 2:
+            raise RequestError(400, "items are [category, name] pairs")
+        check_item(*item)
+    return items
+
+
+def _etag_value(header):
+    """Returns the version named by an If-Match or If-None-Match header."""
+    value = header.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    return value.strip('"')
+
+
+def listing_version(listings):
+    """Returns a fingerprint of a project's names, the ETag of its listing."""
+    digest = hashlib.sha1()
+    for resource_type in RESOURCE_TYPES:
+        digest.update(resource_type.encode('utf-8') + b"\0")
+        for name in listings[resource_type]:
+            digest.update(name.encode('utf-8') + b"\0")
+    return digest.hexdigest()
+
+
+class WorkspaceServer(ThreadingHTTPServer):
+    """
+    Serves the projects of a workspace folder; each project's store is opened
+    once and shared. When a project is opened its history is compacted and its
+    library resources are brought up to date (see blobs.py).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, root, address=(DEFAULT_HOST, DEFAULT_PORT), token=None, verbose=False):
+        super().__init__(address, RequestHandler)
+        self.root = root
+        self.token = token
+        self.verbose = verbose
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def project_dir(self, project):
+        """Returns the folder of a project, refusing names that would lead outside the workspace."""
+        try:
+            check_resource_name(project)
+        except OSError as e:
+            raise RequestError(400, str(e)) from e
+        return os.path.join(self.root, project)
+
+    def store(self, project):
+        """Returns the open store of a project."""
+        project_dir = self.project_dir(project)
+        with self._lock:
+            store = self._stores.get(project)
+            if store is None:
+                if not os.path.isdir(project_dir):
+                    raise FileNotFoundError(f"Project '{project}' not found.")
+                refresh_library_links(self.root, project_dir)
+                store = self._stores[project] = open_resource_store(project_dir)
+                store.history.compact()
+            return store
+
+    def server_close(self):
+        super().server_close()
+        with self._lock:
+            for store in self._stores.values():
+                store.close()
+            self._stores.clear()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Answers the JSON API described in the module docstring."""
+
+    protocol_version = "HTTP/1.1"  # keeps connections open between requests
+    server_version = "NarrativeGuru"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _dispatch(self, method):
+        with instrument.timed(f"server.{method.lower()}"):
+            try:
+                # The body is always read, so an error answer leaves the connection usable
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > SERVER_MAX_REQUEST_BYTES:
+                    self.close_connection = True
+                    raise RequestError(413, "request too large")
+                self._raw_body = self.rfile.read(length)
+                self._check_token()
+                parts = [unquote(part) for part in urlsplit(self.path).path.strip("/").split("/")]
+                self._route(method, parts)
+            except Exception as e:
+                status = error_status(e)
+                if status == 500:
+                    self.log_error("%s %s failed: %r", method, self.path, e)
+                self._send(status, {"error": str(e)})
+
+    def _check_token(self):
+        if self.server.token is None:
+            return
+        expected = f"Bearer {self.server.token}"
+        if not hmac.compare_digest(self.headers.get("Authorization", "").encode('utf-8'), expected.encode('utf-8')):
+            raise RequestError(401, "missing or wrong token")
+
+    def _route(self, method, parts):
+        if parts == ["projects"]:
+            if method == "GET":
+                return self._send(200, {"projects": list_projects(self.server.root)})
+            if method == "POST":
+                return self._create_project(self._body())
+        elif len(parts) >= 3 and parts[0] == "projects":
+            store = self.server.store(parts[1])
+            if len(parts) == 3:
+                if parts[2] == "resources" and method == "GET":
+                    return self._send_listing(store)
+                if method == "POST" and parts[2] in ("read", "write", "rename", "headers", "write_header",
+                                                     "signatures"):
+                    return getattr(self, f"_{parts[2]}")(store, self._body())
+                if parts[2] == "templates" and method == "GET":
+                    return self._send(200, {"templates": store.templates.all()})
+            elif len(parts) == 4 and parts[2] == "templates":
+                if method == "PUT":
+                    return self._send(200, {"template": store.templates.save(parts[3], self._body()["template"])})
+                if method == "DELETE":
+                    store.templates.delete(parts[3])
+                    return self._send(200, {})
+            elif len(parts) == 5 and parts[2] == "resources":
+                resource_type, name = parts[3], parts[4]
+                if resource_type not in RESOURCE_TYPES:
+                    raise RequestError(404, f"Unknown category '{resource_type}'.")
+                check_item(resource_type, name)
+                if method == "GET":
+                    return self._send_resource(store, resource_type, name)
+                if method == "PUT":
+                    return self._put_resource(store, resource_type, name, self._body())
+                if method == "DELETE":
+                    store.delete(resource_type, name)
+                    return self._send(200, {})
+            elif len(parts) in (5, 6) and parts[2] == "history" and method == "GET":
+                check_item(parts[3], parts[4])
+                if len(parts) == 5:
+                    return self._send(200, {"revisions": store.history.revisions(parts[3], parts[4])})
+                content = store.history.get(parts[3], parts[4], int(parts[5]))
+                return self._send(200, {"content": content}, content_version(content))
+        raise RequestError(404, f"No such endpoint: {method} {self.path}")
+
+    def _body(self):
+        """Returns the JSON object sent with the request."""
+        body = json.loads(self._raw_body or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("expected a JSON object")
+        return body
+
+    def _send(self, status, value=None, etag=None):
+        data = b"" if value is None else json.dumps(value, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if etag is not None:
+            self.send_header("ETag", f'"{etag}"')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_modified(self, version):
+        """Answers 304 if the client already holds this version."""
+        cached = self.headers.get("If-None-Match")
+        if cached is not None and _etag_value(cached) == version:
+            self._send(304, None, version)
+            return True
+        return False
+
+    def _create_project(self, body):
+        project_dir = self.server.project_dir(body["name"])
+        if os.path.exists(project_dir):
+            raise FileExistsError(f"A project named '{body['name']}' already exists.")
+        create_project(project_dir, packed=bool(body.get("packed")))
+        self._send(201, {})
+
+    def _send_listing(self, store):
+        listings = {resource_type: store.list_names(resource_type) for resource_type in RESOURCE_TYPES}
+        version = listing_version(listings)
+        if not self._not_modified(version):
+            self._send(200, {"resources": listings}, version)
+
+    def _send_resource(self, store, resource_type, name):
+        content = store.read(resource_type, name)
+        version = content_version(content)
+        if not self._not_modified(version):
+            self._send(200, {"content": content}, version)
+
+    def _put_resource(self, store, resource_type, name, body):
+        content = body["content"]
+        if not isinstance(content, str):
+            raise ValueError("content must be a string")
+        expected = self.headers.get("If-Match")
+        if self.headers.get("If-None-Match", "").strip() == "*":
+            store.create(resource_type, name, content, body.get("fields"))
+        elif expected is not None:
+            store.write(resource_type, name, content, expected_version=_etag_value(expected))
+        else:
+            store.write(resource_type, name, content)
+        self._send(200, {}, content_version(content))
+
+    def _read(self, store, body):
+        self._send(200, {"contents": store.read_many(_items(body))})
+
+    def _write(self, store, body):
+        items = [tuple(item) for item in body["items"]]
+        for item in items:
+            if len(item) not in (3, 4) or not isinstance(item[2], str):
+                raise ValueError("invalid item to write")
+            check_item(*item[:2])
+        store.write_many(items)
+        self._send(200, {})
+
+    def _rename(self, store, body):
+        check_item(body["type"], body["name"])
+        check_item(body["type"], body["new_name"])
+        store.rename(body["type"], body["name"], body["new_name"])
+        self._send(200, {})
+
+    def _headers(self, store, body):
+        self._send(200, {"headers": store.read_headers(_items(body))})
+
+    def _write_header(self, store, body):
+        check_item(body["type"], body["name"])
+        store.write_header(body["type"], body["name"], body["fields"])
+        self._send(200, {})
+
+    def _signatures(self, store, body):
+        self._send(200, {"signatures": store.signatures(_items(body))})
+
+
+def serve(root, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None, verbose=False, ready=None):
+    """
+    Serves a workspace until interrupted.
+
+    Half-written resources left by a crash are repaired first. ready, if
+    given, is called with the server once it is listening.
+    """
+    os.makedirs(root, exist_ok=True)
+    recover_workspace(root)
+    server = WorkspaceServer(root, (host, port), token, verbose)
+    try:
+        if ready is not None:
+            ready(server)
+        server.serve_forever()
+    finally:
+        server.server_close()
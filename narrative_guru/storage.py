@@ -0,0 +1,1306 @@
+"""
+Project storage for NarrativeGuru.
+
+Projects live in one folder each under the workspace folder (NarrativeGuru by
+default). A project either keeps one JSON file per resource in a folder per
+category, or packs every resource into a single SQLite database. Both layouts
+are accessed through the same store interface, and both keep long bodies
+gzip-compressed (see schema.py).
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from . import instrument
+from .history import ResourceHistory, content_version
+from .manifest import ProjectManifest
+from .remix import resolve_header_format
+from .schema import (
+    HEADER_EXCERPT_CHARS, HEADER_READ_CHARS, check_fields, compress_body, decode_resource, encode_resource,
+    inflate_body, inflate_excerpt, read_header_fields, resource_header,
+)
+
+RESOURCE_TYPES = ("characters", "locations", "props", "clothing")
+# Upper bound (in characters) for resource bodies kept in memory, all folder projects together
+RESOURCE_CACHE_CHARS = 32 * 1024 * 1024
+# File holding all resources of a packed (single-file) project
+PACKED_DB_NAME = "resources.db"
+# Crash safety: suffix of files being written, per-project list of writes in flight,
+# and the suffix given to damaged resources moved out of the way
+TEMP_SUFFIX = ".tmp"
+JOURNAL_NAME = ".write-journal"
+DAMAGED_SUFFIX = ".damaged"
+# Saved Remix Station templates of a project (see RemixTemplates)
+TEMPLATES_NAME = ".remix-templates.json"
+
+
+class ConflictError(OSError):
+    """Raised when a resource was changed by someone else after the version an update was based on."""
+
+
+def temp_path_for(file_path):
+    """Returns the hidden temporary file used while replacing a file."""
+    dir_path, file_name = os.path.split(file_path)
+    return os.path.join(dir_path, f".{file_name}{TEMP_SUFFIX}")
+
+
+def fsync_directory(dir_path):
+    """Flushes a directory entry change (e.g. a rename) to disk where the OS allows it."""
+    try:
+        fd = os.open(dir_path or ".", os.O_RDONLY)
+    except OSError:
+        return  # Windows cannot open directories; its renames are durable on their own
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_open(file_path, mode='w'):
+    """
+    Opens a temporary file that replaces file_path once the block completes.
+
+    Lets large files be streamed to disk with the same guarantees as
+    atomic_write; if the block fails the target is left untouched.
+    """
+    tmp_path = temp_path_for(file_path)
+    try:
+        with open(tmp_path, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    fsync_directory(os.path.dirname(file_path))
+
+
+def atomic_write(file_path, text):
+    """
+    Replaces a file with new text without ever leaving it half written.
+
+    The text goes to a temporary file next to the target, is flushed to disk and
+    then renamed over the target in one step. A crash leaves either the old or
+    the new version, never a truncated file.
+    """
+    with instrument.timed("storage.atomic_write", len(text)):
+        with atomic_open(file_path) as f:
+            f.write(text)
+
+
+def atomic_write_many(files):
+    """
+    Replaces many files with the same guarantees as atomic_write.
+
+    All temporary files are written first and flushed to disk together (one
+    os.sync where the OS has it, instead of an fsync per file), then renamed
+    into place. files is a list of (file path, text).
+    """
+    sync_each = not hasattr(os, "sync")
+    written = []
+    tmp_path = None
+    try:
+        for file_path, text in files:
+            tmp_path = temp_path_for(file_path)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+                if sync_each:
+                    f.flush()
+                    os.fsync(f.fileno())
+            written.append((tmp_path, file_path))
+        if not sync_each:
+            os.sync()
+    except BaseException:
+        for path in [tmp for tmp, _ in written] + [tmp_path]:
+            try:
+                os.remove(path)
+            except (OSError, TypeError):
+                pass
+        raise
+    for tmp_path, file_path in written:
+        os.replace(tmp_path, file_path)
+    for dir_path in {os.path.dirname(file_path) for _, file_path in written}:
+        fsync_directory(dir_path)
+
+
+class WriteJournal:
+    """
+    Write-ahead list of the files a project is replacing.
+
+    Every write is recorded before it starts and the journal is emptied once no
+    write is in flight, so after a crash the recovery pass only has to look at
+    the few files named in it instead of scanning the whole project.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def begin(self, *file_paths):
+        """Records a write (of one file or a batch of files) that is about to start."""
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(file_path) + "\n" for file_path in file_paths))
+                f.flush()
+                os.fsync(f.fileno())
+            self._in_flight += 1
+
+    def end(self):
+        """Marks a write as finished, emptying the journal when it was the last one."""
+        with self._lock:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                open(self.path, 'w').close()
+
+    @staticmethod
+    def read(path):
+        """Returns the file paths recorded in a journal."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return []
+        paths = []
+        for line in lines:
+            try:
+                paths.append(json.loads(line))
+            except ValueError:
+                pass  # A line cut short by the crash; its write never started
+        return paths
+
+
+def is_valid_resource_file(file_path):
+    """Checks that a file holds a complete resource object."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return isinstance(json.load(f), dict)
+    except (OSError, ValueError):
+        return False
+
+
+def recover_resource_file(file_path):
+    """
+    Repairs a resource left behind by an interrupted write.
+
+    A complete temporary file is the newest save and replaces the resource; an
+    incomplete one is discarded. A resource that is itself unreadable is moved
+    aside (not deleted) so it stops breaking the catalog. Returns a description
+    of what was done, or None if nothing needed fixing.
+    """
+    tmp_path = temp_path_for(file_path)
+    if os.path.exists(tmp_path):
+        if is_valid_resource_file(tmp_path):
+            os.replace(tmp_path, file_path)
+            return "restored the last save"
+        os.remove(tmp_path)
+        if is_valid_resource_file(file_path) or not os.path.exists(file_path):
+            return "discarded an incomplete save"
+
+    if os.path.exists(file_path) and not is_valid_resource_file(file_path):
+        os.replace(file_path, file_path + DAMAGED_SUFFIX)
+        return f"damaged, moved aside to '{os.path.basename(file_path)}{DAMAGED_SUFFIX}'"
+    return None
+
+
+def recover_project(project_dir, file_paths=None):
+    """
+    Repairs interrupted writes in a project folder.
+
+    Only the given files are checked; without them every resource of the
+    project is. Returns a list of (file path, description) for what was fixed.
+    """
+    if file_paths is None:
+        file_paths = set()
+        for resource_type in RESOURCE_TYPES:
+            resource_dir = os.path.join(project_dir, resource_type)
+            if not os.path.isdir(resource_dir):
+                continue
+            for file_name in os.listdir(resource_dir):
+                if file_name.endswith('.json'):
+                    file_paths.add(os.path.join(resource_dir, file_name))
+                elif file_name.startswith('.') and file_name.endswith('.json' + TEMP_SUFFIX):
+                    file_paths.add(os.path.join(resource_dir, file_name[1:-len(TEMP_SUFFIX)]))
+
+    repairs = []
+    for file_path in sorted(file_paths):
+        outcome = recover_resource_file(file_path)
+        if outcome:
+            repairs.append((file_path, outcome))
+    return repairs
+
+
+def recover_packed_project(project_dir):
+    """
+    Cleans up after an interrupted pack_project or unpack_project.
+
+    The database stays authoritative: an unfinished database is discarded (the
+    loose files are still complete then) and loose files that merely duplicate
+    a database row are removed. Loose files that differ are left alone.
+    """
+    repairs = []
+    tmp_db_path = os.path.join(project_dir, PACKED_DB_NAME + TEMP_SUFFIX)
+    if os.path.exists(tmp_db_path):
+        os.remove(tmp_db_path)
+        repairs.append((tmp_db_path, "discarded an unfinished conversion"))
+    if not is_packed_project(project_dir):
+        return repairs
+
+    conn = None
+    try:
+        for resource_type in RESOURCE_TYPES:
+            resource_dir = os.path.join(project_dir, resource_type)
+            if not os.path.isdir(resource_dir):
+                continue
+            if conn is None:
+                conn = sqlite3.connect(os.path.join(project_dir, PACKED_DB_NAME))
+            for file_name in os.listdir(resource_dir):
+                file_path = os.path.join(resource_dir, file_name)
+                if not file_name.endswith('.json') or not is_valid_resource_file(file_path):
+                    continue
+                row = conn.execute("SELECT content, extra FROM resources WHERE type = ? AND name = ?",
+                                   (resource_type, file_name[:-len('.json')])).fetchone()
+                if row is None:
+                    continue
+                try:
+                    packed = (unpack_body(row[0]), json.loads(row[1]) if row[1] else {})
+                except ValueError:
+                    continue  # a damaged row; the loose file may be all that is left
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    loose = decode_resource(f.read())
+                if loose == packed:
+                    os.remove(file_path)
+                    repairs.append((file_path, "removed a copy left by an unfinished conversion"))
+            try:
+                os.rmdir(resource_dir)
+            except OSError:
+                pass
+    finally:
+        if conn is not None:
+            conn.close()
+    return repairs
+
+
+def recover_workspace(project_path):
+    """
+    Startup recovery pass: repairs the writes journaled as in flight in any project.
+
+    Costs one small read per project unless a crash actually interrupted a write.
+    """
+    repairs = []
+    for project in list_projects(project_path):
+        project_dir = os.path.join(project_path, project)
+        journal_path = os.path.join(project_dir, JOURNAL_NAME)
+        file_paths = WriteJournal.read(journal_path)
+        if file_paths:
+            repairs.extend(recover_project(project_dir, set(file_paths)))
+            open(journal_path, 'w').close()
+        repairs.extend(recover_packed_project(project_dir))
+    return repairs
+
+
+class BodyCache:
+    """
+    Bounded LRU of parsed resource bodies, keyed by the identity of their file
+    (device and inode) and revalidated against its mtime and size.
+
+    Keyed this way, a resource shared by several projects through the blob
+    store (see blobs.py) is parsed once for all of them, a renamed file keeps
+    its entry, and a project opened again finds its bodies still cached.
+    """
+
+    def __init__(self, max_chars=RESOURCE_CACHE_CHARS):
+        self.max_chars = max_chars
+        self._bodies = OrderedDict()  # identity -> ((mtime, size), content)
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def identity(path, stat):
+        """Returns the key of a file; the path where the file system has no inode numbers."""
+        return (stat.st_dev, stat.st_ino) if stat.st_ino else path
+
+    def get(self, identity, signature):
+        """Returns the cached body of a file, or None if it is not cached or has changed."""
+        with self._lock:
+            cached = self._bodies.get(identity)
+            if cached is None or cached[0] != signature:
+                return None
+            self._bodies.move_to_end(identity)
+            return cached[1]
+
+    def put(self, identity, signature, content):
+        """Caches a body, evicting the least recently used ones over the limit."""
+        with self._lock:
+            self._pop(identity)
+            self._bodies[identity] = (signature, content)
+            self._chars += len(content)
+            while self._chars > self.max_chars and len(self._bodies) > 1:
+                _, (_, evicted) = self._bodies.popitem(last=False)
+                self._chars -= len(evicted)
+
+    def discard(self, identity):
+        with self._lock:
+            self._pop(identity)
+
+    def _pop(self, identity):
+        cached = self._bodies.pop(identity, None)
+        if cached is not None:
+            self._chars -= len(cached[1])
+
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+            self._chars = 0
+
+
+# Shared by the folder projects of the process
+SHARED_BODY_CACHE = BodyCache()
+
+
+def check_template(template):
+    """
+    Returns a remix template in its stored form, raising ValueError if it is
+    not one. A template is {"items": [[resource_type, name], ...],
+    "with_links": bool, "header_format": preset name, format or None}.
+    """
+    if not isinstance(template, dict) or not isinstance(template.get("items"), list):
+        raise ValueError("A template needs a list of \"items\".")
+    items = []
+    for item in template["items"]:
+        if not isinstance(item, (list, tuple)) or len(item) != 2 or item[0] not in RESOURCE_TYPES \
+                or not isinstance(item[1], str):
+            raise ValueError(f"Invalid template item {item!r}.")
+        items.append([item[0], item[1]])
+    header_format = template.get("header_format") or None
+    if header_format is not None:
+        resolve_header_format(header_format)
+    return {"items": items, "with_links": bool(template.get("with_links")), "header_format": header_format}
+
+
+class RemixTemplates:
+    """
+    The saved Remix Station templates of a project, kept in one small JSON
+    file next to its resources (in either layout). Rendered templates are
+    cached by bundles.BundleCache.
+    """
+
+    def __init__(self, project_dir):
+        self.path = os.path.join(project_dir, TEMPLATES_NAME)
+        self._lock = threading.Lock()
+
+    def all(self):
+        """Returns {name: template} of every saved template, by name."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                templates = json.load(f)["templates"]
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError, TypeError) as e:
+            raise OSError(f"Damaged remix templates file '{self.path}': {e}") from e
+        return dict(sorted(templates.items()))
+
+    def names(self):
+        return list(self.all())
+
+    def get(self, name):
+        """Returns a saved template."""
+        try:
+            return self.all()[name]
+        except KeyError:
+            raise FileNotFoundError(f"Template '{name}' not found.") from None
+
+    def save(self, name, template):
+        """Saves a template under a name, replacing one of the same name. Returns it as stored."""
+        check_resource_name(name)
+        template = check_template(template)
+        with self._lock:
+            templates = self.all()
+            templates[name] = template
+            atomic_write(self.path, json.dumps({"templates": templates}, indent=4, ensure_ascii=False))
+        return template
+
+    def delete(self, name):
+        with self._lock:
+            templates = self.all()
+            if templates.pop(name, None) is None:
+                raise FileNotFoundError(f"Template '{name}' not found.")
+            atomic_write(self.path, json.dumps({"templates": templates}, indent=4, ensure_ascii=False))
+
+
+class ResourceStore:
+    """
+    In-memory view of a single project's resources.
+
+    Each category is listed once and only rescanned when its directory changes;
+    listings and headers are also kept in the project's manifest (see
+    manifest.py), so opening the project again needs no scan. Resource bodies
+    are kept in a BodyCache (the one shared by all folder projects unless
+    cache_chars asks for a private one), so repeated previews and remix
+    appends skip the JSON parse. Headers (see schema.py) are cached per
+    project, by file mtime and size, but read on their own from the start of
+    the file. The store is safe to use from the background I/O threads.
+    """
+
+    def __init__(self, project_dir, cache_chars=None):
+        self.project_dir = project_dir
+        self._bodies = SHARED_BODY_CACHE if cache_chars is None else BodyCache(cache_chars)
+        self._listings = {}  # resource_type -> [directory mtime, set of names, sorted names or None]
+        self._headers = {}  # (resource_type, name) -> ((mtime, size), fields, excerpt)
+        self._lock = threading.RLock()  # guards the caches; file I/O happens outside it
+        self._write_lock = threading.Lock()  # lets one check-then-write at a time in; readers never wait on it
+        self._journal = WriteJournal(os.path.join(project_dir, JOURNAL_NAME))
+        self.history = ResourceHistory(project_dir)
+        self.manifest = ProjectManifest(project_dir)
+        self.templates = RemixTemplates(project_dir)
+
+    def resource_path(self, resource_type, name):
+        """Returns the path of the JSON file backing a resource, refusing any that would lie outside its category."""
+        if resource_type not in RESOURCE_TYPES:
+            raise OSError(f"Unknown category: '{resource_type}'")
+        check_resource_name(name)
+        return os.path.join(self.project_dir, resource_type, f"{name}.json")
+
+    def _listing(self, resource_type):
+        """Returns the cached listing of a category, rescanning it only if its directory changed."""
+        resource_dir = os.path.join(self.project_dir, resource_type)
+        with self._lock:
+            try:
+                dir_mtime = os.stat(resource_dir).st_mtime_ns
+            except FileNotFoundError:
+                listing = self._listings[resource_type] = [None, set(), []]
+                return listing
+
+            listing = self._listings.get(resource_type)
+            if listing is None or listing[0] != dir_mtime:
+                # The manifest holds the names as long as nobody else changed the directory
+                sorted_names = self.manifest.names(resource_type, dir_mtime)
+                if sorted_names is not None:
+                    listing = self._listings[resource_type] = [dir_mtime, set(sorted_names), sorted_names]
+                    return listing
+                names = set()
+                with instrument.timed("storage.listdir"):
+                    with os.scandir(resource_dir) as entries:
+                        for entry in entries:
+                            if entry.name.endswith('.json') and entry.is_file():
+                                names.add(entry.name[:-len('.json')])
+                self.manifest.set_names(resource_type, dir_mtime, names)
+                listing = self._listings[resource_type] = [dir_mtime, names, None]
+            else:
+                instrument.record("storage.listdir.cache_hit")
+            return listing
+
+    def _touch_listing(self, resource_type, added=(), removed=()):
+        """Applies our own changes to a cached listing without rescanning the directory."""
+        with self._lock:
+            listing = self._listings.get(resource_type)
+            if listing is None:
+                return
+            listing[1].difference_update(removed)
+            listing[1].update(added)
+            listing[2] = None
+            listing[0] = self._folder_mtime(resource_type)
+
+    def _folder_mtime(self, resource_type):
+        try:
+            return os.stat(os.path.join(self.project_dir, resource_type)).st_mtime_ns
+        except OSError:
+            return None
+
+    def list_names(self, resource_type):
+        """Returns the sorted resource names of a category."""
+        with self._lock:
+            listing = self._listing(resource_type)
+            if listing[2] is None:
+                listing[2] = sorted(listing[1])
+            return listing[2]
+
+    def exists(self, resource_type, name):
+        """Checks whether a resource exists on disk."""
+        try:
+            return os.path.exists(self.resource_path(resource_type, name))
+        except OSError:
+            return False  # a name that cannot be stored
+
+    def read(self, resource_type, name, cache=True):
+        """
+        Returns the content of a resource, served from memory while the file is unchanged.
+
+        cache=False leaves the memory cache as it was, for one-off passes over
+        many resources such as exports.
+        """
+        key = (resource_type, name)
+        path = self.resource_path(resource_type, name)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        identity = BodyCache.identity(path, stat)
+
+        cached = self._bodies.get(identity, signature)
+        if cached is not None:
+            instrument.record("storage.read.cache_hit")
+            return cached
+
+        with instrument.timed("storage.read_file", stat.st_size):
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        with instrument.timed("json.loads", len(text)):
+            content, fields = decode_resource(text)
+        self._remember_header(key, signature, fields, content[:HEADER_EXCERPT_CHARS], persist=cache)
+        if cache:
+            self._bodies.put(identity, signature, content)
+        return content
+
+    def read_many(self, items, cache=True):
+        """Returns the contents of many (resource_type, name) resources in order, None for unreadable ones."""
+        contents = []
+        for resource_type, name in items:
+            try:
+                contents.append(self.read(resource_type, name, cache))
+            except (OSError, ValueError):
+                contents.append(None)
+        return contents
+
+    def _remember_header(self, key, signature, fields, excerpt, persist=True):
+        """
+        Caches a header read from a file and, if persist, notes it in the
+        manifest unless it is known there already. One-off passes over every
+        body (exports, search indexing) do not persist, to stay as fast as
+        they were.
+        """
+        with self._lock:
+            cached = self._headers.get(key)
+            self._headers[key] = (signature, fields, excerpt)
+        if persist and (cached is None or cached[0] != signature):
+            self.manifest.remember(*key, signature, fields, excerpt)
+
+    def _load_manifest_headers(self, items):
+        """Fills the header cache with the manifest's headers of the given resources; stat() validates them on use."""
+        by_type = {}
+        with self._lock:
+            for resource_type, name in items:
+                if (resource_type, name) not in self._headers:
+                    by_type.setdefault(resource_type, []).append(name)
+        for resource_type, names in by_type.items():
+            headers = self.manifest.headers(resource_type, names)
+            with self._lock:
+                for name, header in headers.items():
+                    self._headers.setdefault((resource_type, name), header)
+
+    def _fields(self, resource_type, name):
+        """Returns (fields, excerpt) of a resource, read no further than the start of its body."""
+        key = (resource_type, name)
+        path = self.resource_path(resource_type, name)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if key not in self._headers:
+            self._load_manifest_headers([key])
+        with self._lock:
+            cached = self._headers.get(key)
+            if cached is not None and cached[0] == signature:
+                instrument.record("storage.read_header.cache_hit")
+                return cached[1], cached[2]
+        with instrument.timed("storage.read_header"):
+            with open(path, 'r', encoding='utf-8') as f:
+                fields, excerpt = read_header_fields(f)
+        self._remember_header(key, signature, fields, excerpt)
+        return fields, excerpt
+
+    def read_header(self, resource_type, name):
+        """Returns the header of a resource (see schema.resource_header) without loading its body."""
+        return resource_header(*self._fields(resource_type, name))
+
+    def read_headers(self, items):
+        """Returns the headers of many (resource_type, name) resources in order, None for unreadable ones."""
+        self._load_manifest_headers(items)
+        headers = []
+        for resource_type, name in items:
+            try:
+                headers.append(self.read_header(resource_type, name))
+            except (OSError, ValueError):
+                headers.append(None)
+        return headers
+
+    def signatures(self, items):
+        """
+        Returns a token per (resource_type, name) that changes whenever the
+        resource does (the mtime and size of its file), None for missing ones.
+        """
+        signatures = []
+        for resource_type, name in items:
+            try:
+                stat = os.stat(self.resource_path(resource_type, name))
+                signatures.append([stat.st_mtime_ns, stat.st_size])
+            except OSError:
+                signatures.append(None)
+        return signatures
+
+    def _write_file(self, resource_type, name, content, fields=None):
+        """Writes a resource file and caches the content and header that were written."""
+        path = self.resource_path(resource_type, name)
+        # A JSON object with the header fields and the body in its 'content' key
+        with instrument.timed("json.dumps") as timer:
+            text = encode_resource(content, fields)
+            timer.size = len(text)
+        folder_before = self._folder_mtime(resource_type)
+        self._journal.begin(path)
+        try:
+            atomic_write(path, text)
+        finally:
+            self._journal.end()
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        excerpt = content[:HEADER_EXCERPT_CHARS]
+        with self._lock:
+            self._headers[(resource_type, name)] = (signature, dict(fields or {}), excerpt)
+        self._bodies.put(BodyCache.identity(path, stat), signature, content)
+        self.manifest.record(resource_type, [(name, signature, content_version(content), fields, excerpt)],
+                             (folder_before, self._folder_mtime(resource_type)))
+
+    def create(self, resource_type, name, content, fields=None):
+        """Creates a new resource, with header fields if given, failing if one with that name already exists."""
+        check_resource_name(name)
+        if fields:
+            check_fields(fields)
+        # Checked and written under the write lock, so two creators of one name cannot both succeed
+        with self._write_lock:
+            if self.exists(resource_type, name):
+                raise FileExistsError(f"Resource '{name}' already exists.")
+            self._write_file(resource_type, name, content, fields)
+        self._touch_listing(resource_type, added=[name])
+
+    def write(self, resource_type, name, content, expected_version=None):
+        """
+        Overwrites the content of an existing resource, keeping its header fields.
+
+        If expected_version is given, the write only happens while the resource
+        still has that content_version(); otherwise ConflictError is raised.
+        The previous and new content are recorded in the project's history.
+        """
+        with self._write_lock:
+            fields = None
+            try:
+                old_content = self.read(resource_type, name)
+                fields = self._fields(resource_type, name)[0]
+            except FileNotFoundError:
+                if expected_version is not None:
+                    raise
+                old_content = None
+            except ValueError:
+                old_content = None  # damaged; nothing worth keeping
+            if expected_version is not None and (old_content is None
+                                                 or content_version(old_content) != expected_version):
+                raise ConflictError(f"Resource '{name}' was changed by someone else meanwhile.")
+            self._write_file(resource_type, name, content, fields)
+            self.history.record(resource_type, name, old_content, content)
+
+    def write_header(self, resource_type, name, fields):
+        """Replaces the given header fields of a resource, keeping its body and other fields."""
+        check_fields(fields)
+        with self._write_lock:
+            content = self.read(resource_type, name)
+            merged = dict(self._fields(resource_type, name)[0])
+            merged.update(fields)
+            self._write_file(resource_type, name, content, merged)
+
+    def write_many(self, items):
+        """
+        Creates or overwrites many resources in one batch.
+
+        items are (resource_type, name, content) tuples, or (resource_type,
+        name, content, fields) to also replace the header fields. Meant for
+        bulk imports, where flushing every file on its own would dominate the
+        run time. Resources that already existed keep their header fields
+        unless new ones are given, and get a revision in the history.
+        """
+        new_fields = {(item[0], item[1]): item[3] for item in items if len(item) > 3}
+        for fields in new_fields.values():
+            check_fields(fields)
+        if not items:
+            return
+        resource_types = {item[0] for item in items}
+        # Under the write lock, like single writes, so no conditional write lands between reading and replacing
+        with self._write_lock:
+            kept_fields = {}
+            revisions = []  # recorded once the batch is written, so a failed one leaves no history behind
+            for resource_type, name, content, *_ in items:
+                if self.exists(resource_type, name):
+                    try:
+                        old_content = self.read(resource_type, name, cache=False)
+                        kept_fields[(resource_type, name)] = self._fields(resource_type, name)[0]
+                    except ValueError:
+                        old_content = None
+                    revisions.append((resource_type, name, old_content, content))
+            kept_fields.update(new_fields)
+            files = []
+            with instrument.timed("json.dumps") as timer:
+                for resource_type, name, content, *_ in items:
+                    check_resource_name(name)
+                    text = encode_resource(content, kept_fields.get((resource_type, name)))
+                    files.append((self.resource_path(resource_type, name), text))
+                timer.size = sum(len(text) for _, text in files)
+            for resource_type in resource_types:
+                os.makedirs(os.path.join(self.project_dir, resource_type), exist_ok=True)
+            folders_before = {resource_type: self._folder_mtime(resource_type) for resource_type in resource_types}
+
+            self._journal.begin(*[file_path for file_path, _ in files])
+            try:
+                with instrument.timed("storage.write_many", timer.size):
+                    atomic_write_many(files)
+            finally:
+                self._journal.end()
+            for revision in revisions:
+                self.history.record(*revision)
+
+        for resource_type in resource_types:
+            self._touch_listing(resource_type, added=[item[1] for item in items if item[0] == resource_type])
+            written = []
+            for item_type, name, content, *_ in items:
+                if item_type == resource_type:
+                    stat = os.stat(self.resource_path(resource_type, name))
+                    signature = (stat.st_mtime_ns, stat.st_size)
+                    fields = kept_fields.get((resource_type, name)) or {}
+                    with self._lock:
+                        self._headers[(resource_type, name)] = (signature, fields, content[:HEADER_EXCERPT_CHARS])
+                    written.append((name, signature, content_version(content), fields, content[:HEADER_EXCERPT_CHARS]))
+            self.manifest.record(resource_type, written,
+                                 (folders_before[resource_type], self._folder_mtime(resource_type)))
+
+    def rename(self, resource_type, old_name, new_name):
+        """
+        Renames a resource, failing if one with the new name already exists;
+        its cached body stays valid, being keyed by the file rather than the name.
+        """
+        check_resource_name(new_name)
+        old_path = self.resource_path(resource_type, old_name)
+        new_path = self.resource_path(resource_type, new_name)
+        folder_before = self._folder_mtime(resource_type)
+        # os.rename would silently replace the other resource, so the check and the move go under the write lock
+        with self._write_lock, instrument.timed("storage.rename"):
+            # Names differing only in case are one file on case-insensitive filesystems; linked blobs are not
+            if os.path.lexists(new_path) and (old_name.casefold() != new_name.casefold()
+                                              or not os.path.samefile(old_path, new_path)):
+                raise FileExistsError(f"Resource '{new_name}' already exists.")
+            os.rename(old_path, new_path)
+        with self._lock:
+            header = self._headers.pop((resource_type, old_name), None)
+            if header is not None:
+                self._headers[(resource_type, new_name)] = header
+        self._touch_listing(resource_type, added=[new_name], removed=[old_name])
+        self.manifest.rename(resource_type, old_name, new_name, (folder_before, self._folder_mtime(resource_type)))
+        self.history.rename(resource_type, old_name, new_name)
+
+    def delete(self, resource_type, name):
+        """Deletes a resource file."""
+        path = self.resource_path(resource_type, name)
+        stat = os.stat(path)
+        folder_before = self._folder_mtime(resource_type)
+        with instrument.timed("storage.delete"):
+            os.remove(path)
+        if stat.st_nlink <= 1:
+            self._bodies.discard(BodyCache.identity(path, stat))
+        with self._lock:
+            self._headers.pop((resource_type, name), None)
+        self._touch_listing(resource_type, removed=[name])
+        self.manifest.remove(resource_type, name, (folder_before, self._folder_mtime(resource_type)))
+
+    def verify_manifest(self):
+        """
+        Compares the manifest with the resource files, reading every file it
+        has a content version of. Returns sorted (problem, resource_type, name)
+        tuples, the problem being 'unlisted' (a file the manifest does not
+        list), 'missing' (listed without a file), 'changed' (the file's size or
+        mtime differ; it is read again on use) or 'differs' (same size and
+        mtime, different content).
+        """
+        problems = []
+        with instrument.timed("storage.verify_manifest"):
+            for resource_type in RESOURCE_TYPES:
+                resource_dir = os.path.join(self.project_dir, resource_type)
+                files = {}
+                if os.path.isdir(resource_dir):
+                    with os.scandir(resource_dir) as entries:
+                        for entry in entries:
+                            if entry.name.endswith('.json') and entry.is_file():
+                                stat = entry.stat()
+                                files[entry.name[:-len('.json')]] = (stat.st_mtime_ns, stat.st_size)
+                recorded = self.manifest.entries(resource_type)
+                for name in files.keys() - recorded.keys():
+                    problems.append(("unlisted", resource_type, name))
+                for name, (mtime, size, version) in recorded.items():
+                    if name not in files:
+                        problems.append(("missing", resource_type, name))
+                    elif mtime is not None and files[name] != (mtime, size):
+                        problems.append(("changed", resource_type, name))
+                    elif version is not None:
+                        # Read from the file itself: the body cache trusts the same size and mtime too
+                        try:
+                            with open(self.resource_path(resource_type, name), 'r', encoding='utf-8') as f:
+                                content, _ = decode_resource(f.read())
+                            if content_version(content) != version:
+                                problems.append(("differs", resource_type, name))
+                        except (OSError, ValueError):
+                            problems.append(("differs", resource_type, name))
+        return sorted(problems)
+
+    def rebuild_manifest(self, progress=None):
+        """
+        Writes the manifest anew from every resource file; damaged files are
+        listed without a header. Returns the number of resources listed.
+        progress, if given, is called as progress(done, total).
+        """
+        with self._lock:
+            self._listings.clear()
+            self._headers.clear()
+        self.manifest.clear()
+        names = {resource_type: self.list_names(resource_type) for resource_type in RESOURCE_TYPES}
+        total = sum(len(category) for category in names.values())
+        done = 0
+        with instrument.timed("storage.rebuild_manifest"):
+            for resource_type in RESOURCE_TYPES:
+                folder_mtime = self._folder_mtime(resource_type)
+                written = []
+                for name in names[resource_type]:
+                    path = self.resource_path(resource_type, name)
+                    try:
+                        stat = os.stat(path)
+                        with open(path, 'r', encoding='utf-8') as f:
+                            content, fields = decode_resource(f.read())
+                        written.append((name, (stat.st_mtime_ns, stat.st_size), content_version(content), fields,
+                                        content[:HEADER_EXCERPT_CHARS]))
+                    except (OSError, ValueError):
+                        pass
+                    done += 1
+                    if progress is not None and (done % 100 == 0 or done == total):
+                        progress(done, total)
+                self.manifest.record(resource_type, written, (folder_mtime, folder_mtime))
+        return total
+
+    def close(self):
+        """Releases the store and its history database. Bodies stay in the shared cache for the next project."""
+        with self._lock:
+            self._headers.clear()
+        if self._bodies is not SHARED_BODY_CACHE:
+            self._bodies.clear()
+        self.manifest.close()
+        self.history.close()
+
+
+class PackedResourceStore:
+    """
+    Resources of a project packed into a single SQLite database.
+
+    Offers the same interface as ResourceStore but keeps the whole project in one
+    file instead of one JSON file per resource. Long bodies are stored as gzip
+    BLOBs in the content column (see pack_body). Database errors are raised as
+    OSError so callers handle both layouts the same way. The connection is
+    shared by the background I/O threads, one statement at a time.
+    """
+
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        self.db_path = os.path.join(project_dir, PACKED_DB_NAME)
+        self._listings = {}  # resource_type -> sorted names
+        self._data_version = None
+        self._lock = threading.RLock()
+        self.history = ResourceHistory(project_dir)
+        self.templates = RemixTemplates(project_dir)
+        try:
+            self._conn = create_packed_database(self.db_path)
+        except sqlite3.Error as e:
+            raise OSError(f"Could not open packed project: {e}") from e
+
+    def _query(self, sql, params=()):
+        """Runs a query and returns all its rows, reporting database errors as OSError."""
+        with self._lock, instrument.timed("sqlite.query"):
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                raise OSError(f"Packed project error: {e}") from e
+
+    def _commit(self, sql, params=()):
+        """Runs a statement in its own transaction and drops the cached listings it affects."""
+        with self._lock, instrument.timed("sqlite.commit"):
+            try:
+                with self._conn:
+                    cursor = self._conn.execute(sql, params)
+            except sqlite3.IntegrityError as e:
+                raise FileExistsError(f"Resource already exists: {e}") from e
+            except sqlite3.Error as e:
+                raise OSError(f"Packed project error: {e}") from e
+            return cursor
+
+    def _check_external_changes(self):
+        """Drops cached listings when another connection has modified the database."""
+        data_version = self._query("PRAGMA data_version")[0][0]
+        if data_version != self._data_version:
+            self._listings.clear()
+            self._data_version = data_version
+
+    def list_names(self, resource_type):
+        """Returns the sorted resource names of a category."""
+        with self._lock:
+            self._check_external_changes()
+            names = self._listings.get(resource_type)
+            if names is None:
+                with instrument.timed("storage.listdir"):
+                    rows = self._query("SELECT name FROM resources WHERE type = ? ORDER BY name", (resource_type,))
+                    names = self._listings[resource_type] = [row[0] for row in rows]
+            else:
+                instrument.record("storage.listdir.cache_hit")
+            return names
+
+    def exists(self, resource_type, name):
+        """Checks whether a resource exists in the database."""
+        return bool(self._query("SELECT 1 FROM resources WHERE type = ? AND name = ?", (resource_type, name)))
+
+    def read_many(self, items, cache=True):
+        """Returns the contents of many (resource_type, name) resources in order, None for missing ones."""
+        contents = []
+        for resource_type, name in items:
+            try:
+                contents.append(self.read(resource_type, name))
+            except (FileNotFoundError, ValueError):
+                contents.append(None)
+        return contents
+
+    def read(self, resource_type, name, cache=True):
+        """Returns the content of a resource. cache is accepted for parity with ResourceStore."""
+        with instrument.timed("storage.read_file") as timer:
+            rows = self._query("SELECT content FROM resources WHERE type = ? AND name = ?", (resource_type, name))
+            if not rows:
+                raise FileNotFoundError(f"Resource '{name}' not found.")
+            timer.size = len(rows[0][0])
+            return unpack_body(rows[0][0])
+
+    def read_header(self, resource_type, name):
+        """Returns the header of a resource (see schema.resource_header) without loading its body."""
+        with instrument.timed("storage.read_header"):
+            # substr() counts characters of text and bytes of a compressed body
+            rows = self._query("""SELECT extra, CASE typeof(content) WHEN 'blob' THEN substr(content, 1, ?)
+                                                                    ELSE substr(content, 1, ?) END
+                                  FROM resources WHERE type = ? AND name = ?""",
+                               (HEADER_READ_CHARS, HEADER_EXCERPT_CHARS, resource_type, name))
+        if not rows:
+            raise FileNotFoundError(f"Resource '{name}' not found.")
+        excerpt = rows[0][1]
+        if isinstance(excerpt, bytes):
+            excerpt = inflate_excerpt(excerpt)
+        return resource_header(json.loads(rows[0][0]) if rows[0][0] else {}, excerpt)
+
+    def read_headers(self, items):
+        """Returns the headers of many (resource_type, name) resources in order, None for missing ones."""
+        headers = []
+        for resource_type, name in items:
+            try:
+                headers.append(self.read_header(resource_type, name))
+            except (FileNotFoundError, ValueError):
+                headers.append(None)
+        return headers
+
+    def signatures(self, items):
+        """
+        Returns a token per (resource_type, name) that changes whenever the
+        resource does, None for missing ones. Rows keep no modification time,
+        so this is a fingerprint of the stored body and header fields.
+        """
+        signatures = []
+        for resource_type, name in items:
+            rows = self._query("SELECT content, extra FROM resources WHERE type = ? AND name = ?",
+                               (resource_type, name))
+            if not rows:
+                signatures.append(None)
+            elif isinstance(rows[0][0], bytes):
+                signatures.append(hashlib.sha1(rows[0][0] + f"\0{rows[0][1] or ''}".encode('utf-8')).hexdigest())
+            else:
+                signatures.append(content_version(f"{rows[0][0]}\0{rows[0][1] or ''}"))
+        return signatures
+
+    def create(self, resource_type, name, content, fields=None):
+        """Creates a new resource, with header fields if given, failing if one with that name already exists."""
+        check_resource_name(name)
+        if fields:
+            check_fields(fields)
+        stored = pack_body(content)
+        with self._lock:
+            self._commit("INSERT INTO resources (type, name, content, extra) VALUES (?, ?, ?, ?)",
+                         (resource_type, name, stored, json.dumps(fields) if fields else None))
+            self._listings.pop(resource_type, None)
+
+    def write(self, resource_type, name, content, expected_version=None):
+        """
+        Overwrites the content of an existing resource, if given only while it is still expected_version.
+
+        The old content is read, checked and replaced in one transaction, so no
+        other writer can get in between; once it is committed, both are
+        recorded in the history.
+        """
+        stored = pack_body(content)
+        with self._lock, instrument.timed("sqlite.commit"):
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    rows = self._conn.execute("SELECT content FROM resources WHERE type = ? AND name = ?",
+                                              (resource_type, name)).fetchall()
+                    if not rows:
+                        raise FileNotFoundError(f"Resource '{name}' not found.")
+                    try:
+                        old_content = unpack_body(rows[0][0])
+                    except ValueError:
+                        old_content = None  # damaged; nothing worth keeping
+                    if expected_version is not None and (old_content is None
+                                                         or content_version(old_content) != expected_version):
+                        raise ConflictError(f"Resource '{name}' was changed by someone else meanwhile.")
+                    self._conn.execute("UPDATE resources SET content = ? WHERE type = ? AND name = ?",
+                                       (stored, resource_type, name))
+            except sqlite3.Error as e:
+                raise OSError(f"Packed project error: {e}") from e
+            self.history.record(resource_type, name, old_content, content)
+
+    def write_header(self, resource_type, name, fields):
+        """Replaces the given header fields of a resource, keeping its body and other fields."""
+        check_fields(fields)
+        with self._lock, instrument.timed("sqlite.commit"):
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    rows = self._conn.execute("SELECT extra FROM resources WHERE type = ? AND name = ?",
+                                              (resource_type, name)).fetchall()
+                    if not rows:
+                        raise FileNotFoundError(f"Resource '{name}' not found.")
+                    merged = json.loads(rows[0][0]) if rows[0][0] else {}
+                    merged.update(fields)
+                    self._conn.execute("UPDATE resources SET extra = ? WHERE type = ? AND name = ?",
+                                       (json.dumps(merged) if merged else None, resource_type, name))
+            except sqlite3.Error as e:
+                raise OSError(f"Packed project error: {e}") from e
+
+    def write_many(self, items):
+        """
+        Creates or overwrites many (resource_type, name, content) resources in a
+        single transaction; (resource_type, name, content, fields) items also
+        replace the header fields.
+        """
+        for item in items:
+            check_resource_name(item[1])
+            if len(item) > 3:
+                check_fields(item[3])
+        with self._lock, instrument.timed("storage.write_many", sum(len(item[2]) for item in items)):
+            revisions = []
+            try:
+                with self._conn:
+                    for resource_type, name, content, *_ in items:
+                        rows = self._conn.execute("SELECT content FROM resources WHERE type = ? AND name = ?",
+                                                  (resource_type, name)).fetchall()
+                        if rows:
+                            try:
+                                old_content = unpack_body(rows[0][0])
+                            except ValueError:
+                                old_content = None
+                            revisions.append((resource_type, name, old_content, content))
+                    self._conn.executemany("""INSERT INTO resources (type, name, content) VALUES (?, ?, ?)
+                                              ON CONFLICT (type, name) DO UPDATE SET content = excluded.content""",
+                                           [(*item[:2], pack_body(item[2])) for item in items if len(item) == 3])
+                    self._conn.executemany("""INSERT INTO resources (type, name, content, extra) VALUES (?, ?, ?, ?)
+                                              ON CONFLICT (type, name) DO UPDATE SET content = excluded.content,
+                                                                                     extra = excluded.extra""",
+                                           [(*item[:2], pack_body(item[2]), json.dumps(item[3]) if item[3] else None)
+                                            for item in items if len(item) > 3])
+            except sqlite3.Error as e:
+                raise OSError(f"Packed project error: {e}") from e
+            for revision in revisions:
+                self.history.record(*revision)
+            self._listings.clear()
+
+    def rename(self, resource_type, old_name, new_name):
+        """Renames a resource, failing if one with the new name already exists."""
+        check_resource_name(new_name)
+        with self._lock:
+            try:
+                cursor = self._commit("UPDATE resources SET name = ? WHERE type = ? AND name = ?",
+                                      (new_name, resource_type, old_name))
+            except FileExistsError as e:
+                raise FileExistsError(f"Resource '{new_name}' already exists.") from e
+            if cursor.rowcount == 0:
+                raise FileNotFoundError(f"Resource '{old_name}' not found.")
+            self._listings.pop(resource_type, None)
+        self.history.rename(resource_type, old_name, new_name)
+
+    def delete(self, resource_type, name):
+        """Deletes a resource."""
+        with self._lock:
+            cursor = self._commit("DELETE FROM resources WHERE type = ? AND name = ?", (resource_type, name))
+            if cursor.rowcount == 0:
+                raise FileNotFoundError(f"Resource '{name}' not found.")
+            self._listings.pop(resource_type, None)
+
+    def close(self):
+        """Closes the database connections."""
+        with self._lock:
+            self._conn.close()
+        self.history.close()
+
+
+def check_resource_name(name):
+    """Rejects names that could not be stored as a file in the folder layout."""
+    if not name or name in (".", "..") or "/" in name or os.sep in name or "\0" in name:
+        raise OSError(f"Invalid resource name: '{name}'")
+
+
+def pack_body(content):
+    """Returns what a packed database stores for a body: gzip bytes if it is long, otherwise the text itself."""
+    compressed = compress_body(content)
+    return content if compressed is None else compressed
+
+
+def unpack_body(value):
+    """Returns the body stored in a packed database's content column, raising ValueError if it is damaged."""
+    return inflate_body(value) if isinstance(value, bytes) else value
+
+
+def create_packed_database(db_path):
+    """Opens (creating if needed) a packed project database and returns the connection."""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("""CREATE TABLE IF NOT EXISTS resources (
+                        type TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        extra TEXT,
+                        PRIMARY KEY (type, name))""")
+    conn.commit()
+    return conn
+
+
+def create_project(project_dir, packed=False):
+    """Creates an empty project folder, with a category folder each or a packed database."""
+    if packed:
+        os.makedirs(project_dir)
+        try:
+            create_packed_database(os.path.join(project_dir, PACKED_DB_NAME)).close()
+        except sqlite3.Error as e:
+            raise OSError(f"Could not create packed project: {e}") from e
+    else:
+        for resource_type in RESOURCE_TYPES:
+            os.makedirs(os.path.join(project_dir, resource_type))
+
+
+def is_packed_project(project_dir):
+    """Checks whether a project keeps its resources in a packed database."""
+    return os.path.isfile(os.path.join(project_dir, PACKED_DB_NAME))
+
+
+def open_resource_store(project_dir):
+    """Returns the store matching the layout of a project folder."""
+    if is_packed_project(project_dir):
+        return PackedResourceStore(project_dir)
+    return ResourceStore(project_dir)
+
+
+def pack_project(project_dir):
+    """
+    Converts a folder-layout project into a packed one.
+
+    Every JSON resource is copied into the database, keys other than 'content'
+    included, before any file is removed. Category folders are only deleted
+    once they are empty, so unrelated files are left alone.
+    """
+    db_path = os.path.join(project_dir, PACKED_DB_NAME)
+    tmp_path = db_path + TEMP_SUFFIX
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    packed_files = []
+    conn = create_packed_database(tmp_path)
+    try:
+        with conn:
+            for resource_type in RESOURCE_TYPES:
+                resource_dir = os.path.join(project_dir, resource_type)
+                if not os.path.isdir(resource_dir):
+                    continue
+                for file_name in sorted(os.listdir(resource_dir)):
+                    file_path = os.path.join(resource_dir, file_name)
+                    if not file_name.endswith('.json') or not os.path.isfile(file_path):
+                        continue
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        try:
+                            content, data = decode_resource(f.read())
+                        except ValueError as e:
+                            raise ValueError(f"'{file_path}' does not contain a resource object: {e}") from e
+                    extra = json.dumps(data) if data else None
+                    conn.execute("INSERT INTO resources (type, name, content, extra) VALUES (?, ?, ?, ?)",
+                                 (resource_type, file_name[:-len('.json')], pack_body(content), extra))
+                    packed_files.append(file_path)
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, db_path)
+    fsync_directory(project_dir)
+
+    # The database is in place; the loose files can go now
+    for file_path in packed_files:
+        os.remove(file_path)
+    for resource_type in RESOURCE_TYPES:
+        try:
+            os.rmdir(os.path.join(project_dir, resource_type))
+        except OSError:
+            pass
+
+
+def unpack_project(project_dir):
+    """Converts a packed project back into one JSON file per resource."""
+    db_path = os.path.join(project_dir, PACKED_DB_NAME)
+    conn = sqlite3.connect(db_path)
+    try:
+        for resource_type in RESOURCE_TYPES:
+            os.makedirs(os.path.join(project_dir, resource_type), exist_ok=True)
+        rows = conn.execute("SELECT type, name, content, extra FROM resources")
+        for resource_type, name, content, extra in rows:
+            resource_dir = os.path.join(project_dir, resource_type)
+            os.makedirs(resource_dir, exist_ok=True)
+            atomic_write(os.path.join(resource_dir, f"{name}.json"),
+                         encode_resource(unpack_body(content), json.loads(extra) if extra else None))
+    finally:
+        conn.close()
+    os.remove(db_path)
+
+
+def remove_tree(path, progress=None):
+    """
+    Deletes a directory tree file by file.
+
+    Unlike shutil.rmtree this reports progress as progress(done, total) while it
+    goes, which matters for huge projects on slow storage.
+    """
+    total = sum(len(files) for _, _, files in os.walk(path))
+    done = 0
+    for dir_path, _, files in os.walk(path, topdown=False):
+        for file_name in files:
+            os.remove(os.path.join(dir_path, file_name))
+            done += 1
+            if progress is not None and (done % 100 == 0 or done == total):
+                progress(done, total)
+        os.rmdir(dir_path)
+
+
+def list_projects(project_path):
+    """Returns the sorted names of the project folders, leaving out hidden ones like the blob store."""
+    with os.scandir(project_path) as entries:
+        return sorted(entry.name for entry in entries if entry.is_dir() and not entry.name.startswith('.'))
+
+
+def write_text_file(file_path, content):
+    """Writes a text file in one go."""
+    atomic_write(file_path, content)
@@ -0,0 +1,174 @@
+"""
+Token counting and token budgets for Remix Station contexts.
+
+Counts are estimates made without any tokenizer library, close to what BPE
+tokenizers used by chat models produce for English prose and JSON: a short
+word is one token, long words and runs of punctuation take several, and a line
+break with its indentation is one.
+"""
+
+import re
+
+from .remix import format_remix_header
+
+# Characters of a word, and of a run of punctuation, that make up one token on average
+TOKEN_WORD_CHARS = 6
+TOKEN_PUNCTUATION_CHARS = 2
+TRUNCATION_NOTE = "[... shortened to fit the token budget]"
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]+|\n\s*")
+_SECTION_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"[.!?](?=\s|$)")
+
+
+def _piece_tokens(piece):
+    """Returns the estimated tokens of one word, punctuation run or line break."""
+    if piece[0] == "\n":
+        return 1
+    if piece[0].isalnum() or piece[0] == "_":
+        return -(-len(piece) // TOKEN_WORD_CHARS)
+    return -(-len(piece) // TOKEN_PUNCTUATION_CHARS)
+
+
+def count_tokens(text):
+    """Returns the estimated number of tokens of a text."""
+    return sum(_piece_tokens(match.group()) for match in _TOKEN_PATTERN.finditer(text))
+
+
+def truncate_tokens(text, budget):
+    """Returns the longest start of a text that fits in the given number of tokens, cut between tokens."""
+    if budget <= 0:
+        return ""
+    tokens = 0
+    end = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece_tokens = _piece_tokens(match.group())
+        if tokens + piece_tokens > budget:
+            if match.group()[0].isalnum():
+                # A very long word (e.g. an encoded blob) is cut inside
+                end = match.start() + max(budget - tokens, 0) * TOKEN_WORD_CHARS
+            break
+        tokens += piece_tokens
+        end = match.end()
+    return text[:end].rstrip()
+
+
+class TokenCounter:
+    """Running character and token totals of a text that grows by appends."""
+
+    def __init__(self):
+        self.chars = 0
+        self.tokens = 0
+
+    def add(self, text, tokens=None):
+        """Counts appended text; only the new part is tokenized, and not at all if its tokens are given."""
+        self.chars += len(text)
+        self.tokens += count_tokens(text) if tokens is None else tokens
+
+    def reset(self, text="", tokens=None):
+        """Starts over, counting the given text."""
+        self.chars = 0
+        self.tokens = 0
+        self.add(text, tokens)
+
+
+def split_sections(content):
+    """
+    Splits a resource into sections, the units a budget keeps or drops.
+
+    Sections are paragraphs separated by blank lines. Content without blank
+    lines, such as pretty printed JSON, is split into lines instead. Returns
+    the sections and the separator to join them with.
+    """
+    sections = [section for section in _SECTION_BREAK.split(content) if section.strip()]
+    if len(sections) > 1:
+        return sections, "\n\n"
+    return content.splitlines(), "\n"
+
+
+def _lead(section):
+    """Returns the first line of a section, or its first sentence if that line is long."""
+    line = section.strip().splitlines()[0]
+    sentence_end = _SENTENCE_END.search(line)
+    return line[:sentence_end.end()].rstrip() if sentence_end else line
+
+
+def _shorten(content, budget):
+    """
+    Shortens a resource to a token budget, section by section.
+
+    Whole sections are kept in order while they fit. If the first line (or
+    sentence) of each remaining paragraph still fits, the rest of the budget is
+    shared among those paragraphs so each keeps its beginning as a summary;
+    otherwise the next section is cut off where the budget runs out. A budget
+    too small for the truncation note gets the beginning of the resource only.
+    """
+    note_tokens = count_tokens(TRUNCATION_NOTE) + 1
+    if budget <= note_tokens:
+        return truncate_tokens(content, budget)
+    budget -= note_tokens
+    sections, separator = split_sections(content)
+    kept = []
+    used = 0
+    for section in sections:
+        cost = count_tokens(section) + 1
+        if used + cost > budget:
+            break
+        kept.append(section)
+        used += cost
+
+    rest = sections[len(kept):]
+    leads = [_lead(section) for section in rest] if separator == "\n\n" else []
+    if leads and used + sum(count_tokens(lead) + 1 for lead in leads) <= budget:
+        share = (budget - used) // len(rest) - 1
+        summaries = [max(truncate_tokens(section, share), lead, key=len) for section, lead in zip(rest, leads)]
+        if used + sum(count_tokens(summary) + 1 for summary in summaries) > budget:
+            summaries = leads
+        kept.extend(summaries)
+    elif rest:
+        partial = truncate_tokens(rest[0], budget - used - 1)
+        if partial.strip():
+            kept.append(partial)
+    kept.append(TRUNCATION_NOTE)
+    return separator.join(kept)
+
+
+def fit_to_budget(blocks, budget, header_format=None):
+    """
+    Fits remix blocks into a token budget.
+
+    blocks are (resource_type, name, content) in remix order. Every resource
+    gets an equal share of the budget, and what small resources leave unused
+    goes to the larger ones; a resource over its share is shortened section by
+    section. Resources at the end are dropped when not even their header fits.
+    header_format is the format the blocks' headers will be written in.
+    Returns the fitted blocks and the number of dropped ones.
+    """
+    headers = [count_tokens(format_remix_header(name, resource_type, header_format)) + 2
+               for resource_type, name, _ in blocks]
+    needs = [count_tokens(content) for _, _, content in blocks]
+
+    # Select: keep resources in order while their headers fit
+    selected = 0
+    header_total = 0
+    while selected < len(blocks) and header_total + headers[selected] <= budget:
+        header_total += headers[selected]
+        selected += 1
+
+    # Share what is left after the headers, handing unused shares on to larger resources
+    remaining = budget - header_total
+    shares = [0] * selected
+    open_blocks = sorted(range(selected), key=lambda index: needs[index])
+    while open_blocks:
+        share = remaining // len(open_blocks)
+        index = open_blocks.pop(0)
+        shares[index] = min(needs[index], share)
+        remaining -= shares[index]
+
+    fitted = []
+    for index in range(selected):
+        resource_type, name, content = blocks[index]
+        if needs[index] > shares[index]:
+            content = _shorten(content, shares[index])
+        fitted.append((resource_type, name, content))
+    return fitted, len(blocks) - selected
@@ -0,0 +1,523 @@
+"""
+Watching the workspace for changes made outside the app.
+
+When a project lives in a shared or synced folder, other people and tools add,
+change and remove its resources while it is open. A ProjectWatcher follows
+the workspace folder (for projects coming and going) and the open project,
+and reports what changed as WatchEvent tuples, so the window can apply them
+one by one instead of rescanning everything.
+
+On Linux, inotify (through the C library, no extra packages) reports changes
+as they happen; elsewhere, or if inotify is unavailable, folders are polled
+for modification times. Either way a burst of changes, such as a sync tool
+writing hundreds of files, is collected for a short quiet period and then
+reported as one batch with each resource mentioned once:
+
+    added / removed / modified   a resource of a folder project
+    renamed                      name is the old name, new_name the new one
+    changed                      a packed project was written to; its new
+                                 and deleted resources come as added and
+                                 removed, other content changes only as this
+    projects                     projects were added, removed or renamed
+
+Hidden files, such as the temporary files of crash-safe writes, are ignored.
+"""
+
+import os
+import time
+import queue
+import select
+import struct
+import sqlite3
+import threading
+from collections import namedtuple
+from urllib.request import pathname2url
+
+from . import instrument
+from .storage import RESOURCE_TYPES, PACKED_DB_NAME, is_packed_project
+
+# Seconds without further changes before a batch is reported, and the longest a
+# batch is held back while changes keep coming
+WATCH_DEBOUNCE = 0.3
+WATCH_MAX_DELAY = 2.0
+# Polling fallback: seconds between checks of folder modification times, and
+# between full rescans that also catch files rewritten in place
+WATCH_POLL_INTERVAL = 1.0
+WATCH_FULL_SCAN_INTERVAL = 30.0
+# Seconds the watcher thread waits at most before looking at its requests
+WATCH_TICK = 0.1
+
+WatchEvent = namedtuple("WatchEvent", "kind project_dir resource_type name new_name")
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_ONLYDIR = 0x1000000
+IN_ISDIR = 0x40000000
+
+_DIRECTORY_CHANGES = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+_WORKSPACE_MASK = _DIRECTORY_CHANGES | IN_ONLYDIR
+_PROJECT_MASK = _DIRECTORY_CHANGES | IN_MODIFY | IN_CLOSE_WRITE | IN_ONLYDIR
+_CATEGORY_MASK = _DIRECTORY_CHANGES | IN_CLOSE_WRITE | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """A minimal inotify instance, used through ctypes. Raises OSError where inotify is unavailable."""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            init = self._libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify is not available: {e}") from e
+        self._ctypes = ctypes
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify is not available: {os.strerror(error)}")
+
+    def add(self, path, mask):
+        """Starts watching a folder and returns its watch descriptor."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = self._ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def remove(self, wd):
+        """Stops a watch; a folder that is already gone has no watch left to stop."""
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self):
+        """Returns the pending (watch descriptor, flags, file name) events."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _signature(path):
+    """Returns (mtime, size) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _resource_name(file_name):
+    """Returns the resource name of a category folder entry, or None for other files."""
+    if file_name.endswith(".json") and not file_name.startswith("."):
+        return file_name[:-len(".json")]
+    return None
+
+
+def scan_category(resource_dir):
+    """Returns {name: (mtime, size)} of the resource files in a category folder."""
+    files = {}
+    try:
+        with os.scandir(resource_dir) as entries:
+            for entry in entries:
+                name = _resource_name(entry.name)
+                if name is not None and entry.is_file():
+                    stat = entry.stat()
+                    files[name] = (stat.st_mtime_ns, stat.st_size)
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    return files
+
+
+def _pair_renames(removed, added):
+    """
+    Finds renames among removed and added files: a renamed file keeps its
+    modification time and size. Returns [(old, new)] and drops them from both.
+    """
+    by_signature = {}
+    for name, signature in removed.items():
+        by_signature.setdefault(signature, []).append(name)
+    added_by_signature = {}
+    for name, signature in added.items():
+        added_by_signature.setdefault(signature, []).append(name)
+    renames = []
+    for signature, old_names in by_signature.items():
+        new_names = added_by_signature.get(signature, [])
+        # Only unambiguous pairs; anything else stays a removal and an addition
+        if len(old_names) == 1 and len(new_names) == 1:
+            renames.append((old_names[0], new_names[0]))
+            del removed[old_names[0]]
+            del added[new_names[0]]
+    return renames
+
+
+class ProjectWatcher:
+    """
+    Reports changes to the workspace and to one project folder from a background thread.
+
+    Batches of WatchEvent are collected with drain(), typically from a timer on
+    the Tk thread. watch_project() switches the watched project (None for
+    none) and may be called from any thread.
+    """
+
+    def __init__(self, workspace, debounce=WATCH_DEBOUNCE, poll_interval=WATCH_POLL_INTERVAL, use_inotify=True):
+        self.workspace = workspace
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.backend = None  # "inotify" or "polling" once started
+        self._events = queue.Queue()
+        self._wanted = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Everything below belongs to the watcher thread
+        self._inotify = None
+        self._watches = {}  # watch descriptor -> (role, resource_type)
+        self._project = None
+        self._packed = False
+        self._files = {}  # resource_type -> {name: (mtime, size)}
+        self._packed_names = {}  # resource_type -> set of names
+        self._conn = None
+        self._data_version = None
+        self._polled_version = None
+        self._mtimes = {}  # folder -> mtime, for polling
+        self._next_poll = 0.0
+        self._next_full_scan = 0.0
+        self._clear_pending()
+
+    def start(self):
+        """Starts the watcher thread."""
+        if self._thread is not None:
+            return
+        if self.use_inotify:
+            try:
+                self._inotify = Inotify()
+                self._watches[self._inotify.add(self.workspace, _WORKSPACE_MASK)] = ("workspace", None)
+                self.backend = "inotify"
+            except OSError:
+                self._close_inotify()
+        if self._inotify is None:
+            self.backend = "polling"
+            self._mtimes[self.workspace] = _signature(self.workspace)
+        self._thread = threading.Thread(target=self._run, name="narrative-guru-watcher", daemon=True)
+        self._thread.start()
+
+    def watch_project(self, project_dir):
+        """Starts watching a project folder instead of the previous one; None stops watching projects."""
+        self._wanted = project_dir
+
+    def stop(self):
+        """Stops the watcher thread and releases what it holds."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def drain(self):
+        """Returns the events reported since the last call, oldest first, without waiting."""
+        events = []
+        while True:
+            try:
+                events.extend(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _clear_pending(self):
+        """Forgets the changes noticed but not yet reported."""
+        self._pending_projects = False
+        self._pending_names = {}  # resource_type -> set of names
+        self._pending_scans = set()  # resource types to rescan completely
+        self._pending_packed = False
+        self._first_change = None
+        self._last_change = None
+
+    def _noticed(self):
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        self._last_change = now
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                if self._wanted != self._project:
+                    self._switch(self._wanted)
+                if self._inotify is not None:
+                    if select.select([self._inotify.fd], [], [], WATCH_TICK)[0]:
+                        self._read_inotify()
+                else:
+                    self._stop.wait(WATCH_TICK)
+                    if time.monotonic() >= self._next_poll:
+                        self._poll()
+                if self._last_change is not None:
+                    now = time.monotonic()
+                    if now - self._last_change >= self.debounce or now - self._first_change >= WATCH_MAX_DELAY:
+                        self._flush()
+        finally:
+            self._switch(None)
+            self._close_inotify()
+
+    def _close_inotify(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._watches.clear()
+
+    def _fall_back_to_polling(self):
+        """Switches to polling, e.g. when the system's limit of inotify watches is reached."""
+        self._close_inotify()
+        self.backend = "polling"
+        self._mtimes = {self.workspace: _signature(self.workspace)}
+        if self._project is not None:
+            self._remember_mtimes()
+            self._pending_scans.update(RESOURCE_TYPES)
+            self._pending_packed = self._packed
+            self._noticed()
+
+    # --- Switching projects
+
+    def _switch(self, project_dir):
+        """Stops watching the current project and starts on another one, taking stock of its resources."""
+        if self._inotify is not None:
+            for wd, (role, _) in list(self._watches.items()):
+                if role != "workspace":
+                    self._inotify.remove(wd)
+                    del self._watches[wd]
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._project = project_dir
+        self._files = {}
+        self._packed_names = {}
+        self._data_version = None
+        pending_projects = self._pending_projects
+        self._clear_pending()
+        if pending_projects:
+            self._pending_projects = True
+            self._noticed()
+        if project_dir is None:
+            return
+
+        self._packed = is_packed_project(project_dir)
+        if self._inotify is not None:
+            try:
+                self._watches[self._inotify.add(project_dir, _PROJECT_MASK)] = ("project", None)
+                if not self._packed:
+                    for resource_type in RESOURCE_TYPES:
+                        self._watch_category(resource_type)
+            except (FileNotFoundError, NotADirectoryError):
+                pass  # The project is gone already; the workspace watch reports that
+            except OSError:
+                self._fall_back_to_polling()
+        with instrument.timed("watch.scan"):
+            if self._packed:
+                self._packed_names = self._read_packed_names() or {}
+            else:
+                for resource_type in RESOURCE_TYPES:
+                    self._files[resource_type] = scan_category(os.path.join(project_dir, resource_type))
+        self._polled_version = self._data_version
+        if self._inotify is None:
+            self._remember_mtimes()
+            self._next_full_scan = time.monotonic() + WATCH_FULL_SCAN_INTERVAL
+
+    def _watch_category(self, resource_type):
+        """Adds an inotify watch for a category folder, if the folder exists."""
+        try:
+            wd = self._inotify.add(os.path.join(self._project, resource_type), _CATEGORY_MASK)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        self._watches[wd] = ("category", resource_type)
+
+    def _remember_mtimes(self):
+        """Notes the modification times polling compares against."""
+        self._mtimes[self._project] = _signature(self._project)
+        for resource_type in RESOURCE_TYPES:
+            resource_dir = os.path.join(self._project, resource_type)
+            self._mtimes[resource_dir] = _signature(resource_dir)
+
+    # --- Noticing changes
+
+    def _read_inotify(self):
+        """Turns inotify events into pending changes."""
+        for wd, mask, file_name in self._inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; only a rescan can tell what happened
+                self._pending_projects = True
+                self._pending_scans.update(RESOURCE_TYPES)
+                self._pending_packed = self._packed
+                self._noticed()
+                continue
+            role, resource_type = self._watches.get(wd, (None, None))
+            if role == "workspace":
+                if mask & IN_ISDIR:
+                    self._pending_projects = True
+                    self._noticed()
+                    if self._project is not None and file_name == os.path.basename(self._project):
+                        self._pending_scans.update(RESOURCE_TYPES)
+                        self._pending_packed = self._packed
+            elif role == "project":
+                if file_name in RESOURCE_TYPES and mask & IN_ISDIR and not self._packed:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        try:
+                            self._watch_category(file_name)
+                        except OSError:
+                            self._fall_back_to_polling()
+                            return
+                    self._pending_scans.add(file_name)
+                    self._noticed()
+                elif file_name.startswith(PACKED_DB_NAME) and self._packed:
+                    self._pending_packed = True
+                    self._noticed()
+            elif role == "category":
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    del self._watches[wd]
+                    self._pending_scans.add(resource_type)
+                    self._noticed()
+                    continue
+                name = _resource_name(file_name)
+                if name is not None:
+                    self._pending_names.setdefault(resource_type, set()).add(name)
+                    self._noticed()
+
+    def _poll(self):
+        """Compares folder modification times (and, now and then, every file) with what was seen last."""
+        now = time.monotonic()
+        self._next_poll = now + self.poll_interval
+        mtime = _signature(self.workspace)
+        if mtime != self._mtimes.get(self.workspace):
+            self._mtimes[self.workspace] = mtime
+            self._pending_projects = True
+            self._noticed()
+        if self._project is None:
+            return
+        if self._packed:
+            data_version = self._read_data_version()
+            if data_version != self._polled_version:
+                self._polled_version = data_version
+                self._pending_packed = True
+                self._noticed()
+            return
+        full_scan = now >= self._next_full_scan
+        if full_scan:
+            self._next_full_scan = now + WATCH_FULL_SCAN_INTERVAL
+        for resource_type in RESOURCE_TYPES:
+            resource_dir = os.path.join(self._project, resource_type)
+            mtime = _signature(resource_dir)
+            if full_scan or mtime != self._mtimes.get(resource_dir):
+                self._mtimes[resource_dir] = mtime
+                self._pending_scans.add(resource_type)
+                self._noticed()
+
+    # --- Reporting changes
+
+    def _flush(self):
+        """Works out what the pending changes amount to and reports them as one batch."""
+        events = []
+        with instrument.timed("watch.flush"):
+            if self._pending_projects:
+                events.append(WatchEvent("projects", None, None, None, None))
+            if self._project is not None:
+                if self._packed:
+                    if self._pending_packed:
+                        events.extend(self._diff_packed())
+                else:
+                    for resource_type in RESOURCE_TYPES:
+                        if resource_type in self._pending_scans:
+                            events.extend(self._diff_category(resource_type, None))
+                        elif resource_type in self._pending_names:
+                            events.extend(self._diff_category(resource_type, self._pending_names[resource_type]))
+        self._clear_pending()
+        if events:
+            instrument.record("watch.events", count=len(events))
+            self._events.put(events)
+
+    def _diff_category(self, resource_type, names):
+        """Compares the given files of a category (all if names is None) with what was seen last."""
+        known = self._files.setdefault(resource_type, {})
+        resource_dir = os.path.join(self._project, resource_type)
+        if names is None:
+            current = scan_category(resource_dir)
+            names = set(known) | set(current)
+        else:
+            current = {name: _signature(os.path.join(resource_dir, f"{name}.json")) for name in names}
+
+        added, removed, modified = {}, {}, []
+        for name in sorted(names):
+            old, new = known.get(name), current.get(name)
+            if new is None:
+                if old is not None:
+                    removed[name] = known.pop(name)
+            elif old is None:
+                added[name] = known[name] = new
+            elif old != new:
+                modified.append(name)
+                known[name] = new
+
+        project_dir = self._project
+        events = [WatchEvent("renamed", project_dir, resource_type, old_name, new_name)
+                  for old_name, new_name in _pair_renames(removed, added)]
+        events.extend(WatchEvent("removed", project_dir, resource_type, name, None) for name in removed)
+        events.extend(WatchEvent("added", project_dir, resource_type, name, None) for name in added)
+        events.extend(WatchEvent("modified", project_dir, resource_type, name, None) for name in modified)
+        return events
+
+    def _read_data_version(self):
+        """Returns the packed database's data version, which changes with every commit by anyone else."""
+        try:
+            if self._conn is None:
+                db_path = os.path.abspath(os.path.join(self._project, PACKED_DB_NAME))
+                if not os.path.isfile(db_path):
+                    return None
+                self._conn = sqlite3.connect(f"file:{pathname2url(db_path)}?mode=ro", uri=True)
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    def _read_packed_names(self):
+        """Returns {resource_type: set of names} of the packed project, or None if it can't be read."""
+        self._data_version = self._read_data_version()
+        if self._conn is None:
+            return None
+        names = {resource_type: set() for resource_type in RESOURCE_TYPES}
+        try:
+            for resource_type, name in self._conn.execute("SELECT type, name FROM resources"):
+                names.setdefault(resource_type, set()).add(name)
+        except sqlite3.Error:
+            return None
+        return names
+
+    def _diff_packed(self):
+        """Compares the names in a packed project with what was seen last."""
+        version = self._data_version
+        names = self._read_packed_names()
+        if names is None or self._data_version == version:
+            return []
+        project_dir = self._project
+        events = [WatchEvent("changed", project_dir, None, None, None)]
+        for resource_type in RESOURCE_TYPES:
+            old, new = self._packed_names.get(resource_type, set()), names[resource_type]
+            events.extend(WatchEvent("removed", project_dir, resource_type, name, None) for name in sorted(old - new))
+            events.extend(WatchEvent("added", project_dir, resource_type, name, None) for name in sorted(new - old))
+        self._packed_names = names
+        return events
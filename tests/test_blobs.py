@@ -0,0 +1,135 @@
+import os
+import json
+
+import pytest
+
+from narrative_guru.blobs import (
+    LIBRARY_LINKS_NAME, BlobStore, file_digest, link_from_library, read_library_links, refresh_library_links,
+)
+from narrative_guru.storage import create_project, open_resource_store
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = str(tmp_path / "workspace")
+    for project, contents in (("One", {"Ann": "A hero.", "Bob": "A smith."}),
+                              ("Two", {"Ann": "A hero.", "Carl": "A thief."})):
+        project_dir = os.path.join(root, project)
+        create_project(project_dir)
+        store = open_resource_store(project_dir)
+        try:
+            for name, content in contents.items():
+                store.create("characters", name, content)
+        finally:
+            store.close()
+    return root
+
+
+def resource_file(root, project, name, resource_type="characters"):
+    return os.path.join(root, project, resource_type, f"{name}.json")
+
+
+def test_dedupe_links_identical_resources(workspace):
+    blobs = BlobStore(workspace)
+    shared, saved = blobs.dedupe([os.path.join(workspace, "One"), os.path.join(workspace, "Two")])
+    assert shared == 1
+    assert saved == os.path.getsize(resource_file(workspace, "One", "Ann"))
+    assert os.path.samefile(resource_file(workspace, "One", "Ann"), resource_file(workspace, "Two", "Ann"))
+    assert not os.path.samefile(resource_file(workspace, "One", "Bob"), resource_file(workspace, "Two", "Carl"))
+    assert blobs.dedupe([os.path.join(workspace, "One"), os.path.join(workspace, "Two")]) == (0, 0)
+
+
+def test_editing_a_shared_resource_detaches_it(workspace):
+    BlobStore(workspace).dedupe([os.path.join(workspace, "One"), os.path.join(workspace, "Two")])
+    store = open_resource_store(os.path.join(workspace, "One"))
+    try:
+        store.write("characters", "Ann", "A changed hero.")
+    finally:
+        store.close()
+    assert not os.path.samefile(resource_file(workspace, "One", "Ann"), resource_file(workspace, "Two", "Ann"))
+    store = open_resource_store(os.path.join(workspace, "Two"))
+    try:
+        assert store.read("characters", "Ann") == "A hero."
+    finally:
+        store.close()
+
+
+def test_copy_project_links_resources(workspace):
+    blobs = BlobStore(workspace)
+    blobs.copy_project(os.path.join(workspace, "One"), os.path.join(workspace, "Copy"))
+    assert os.path.samefile(resource_file(workspace, "One", "Bob"), resource_file(workspace, "Copy", "Bob"))
+    assert not os.path.exists(os.path.join(workspace, "Copy", ".history.db"))
+    with pytest.raises(FileExistsError):
+        blobs.copy_project(os.path.join(workspace, "One"), os.path.join(workspace, "Copy"))
+
+
+def test_garbage_collection(workspace):
+    blobs = BlobStore(workspace)
+    blobs.dedupe([os.path.join(workspace, "One"), os.path.join(workspace, "Two")])
+    count, _ = blobs.stats()
+    assert count >= 1
+    for project in ("One", "Two"):
+        os.remove(resource_file(workspace, project, "Ann"))
+    assert blobs.collect_garbage() == 1
+    assert blobs.stats()[0] == count - 1
+    assert blobs.collect_garbage() == 0
+
+
+def test_library_links_follow_the_library(workspace):
+    project_dir = os.path.join(workspace, "Two")
+    link_from_library(workspace, project_dir, "One", [("characters", "Bob")])
+    assert list(read_library_links(project_dir)) == ["characters/Bob"]
+    assert os.path.samefile(resource_file(workspace, "One", "Bob"), resource_file(workspace, "Two", "Bob"))
+
+    library = open_resource_store(os.path.join(workspace, "One"))
+    try:
+        library.write("characters", "Bob", "A master smith.")
+    finally:
+        library.close()
+    assert refresh_library_links(workspace, project_dir) == [("characters", "Bob")]
+    store = open_resource_store(project_dir)
+    try:
+        assert store.read("characters", "Bob") == "A master smith."
+        # Edited in the project: it stops following the library
+        store.write("characters", "Bob", "Our own smith.")
+    finally:
+        store.close()
+    assert refresh_library_links(workspace, project_dir) == []
+    assert read_library_links(project_dir) == {}
+    assert not os.path.exists(os.path.join(project_dir, LIBRARY_LINKS_NAME))
+
+
+def test_library_links_refuse_clashes(workspace):
+    project_dir = os.path.join(workspace, "Two")
+    with pytest.raises(FileExistsError):
+        link_from_library(workspace, project_dir, "One", [("characters", "Ann")])
+    with pytest.raises(FileNotFoundError):
+        link_from_library(workspace, project_dir, "One", [("characters", "Nobody")])
+    with pytest.raises(ValueError):
+        link_from_library(workspace, project_dir, "Two", [("characters", "Carl")])
+
+
+@pytest.mark.parametrize("key, library", [
+    ("characters/../../../outside", "One"),
+    ("../../outside/Ann", "One"),
+    ("characters/Ann", "../outside"),
+    ("characters/Ann", "One/../../outside"),
+    ("characters/Ann", None),
+])
+def test_library_links_leading_outside_are_dropped(workspace, tmp_path, key, library):
+    (tmp_path / "outside.json").write_text(json.dumps({"content": "secret"}), encoding='utf-8')
+    os.makedirs(tmp_path / "outside" / "characters")
+    (tmp_path / "outside" / "characters" / "Ann.json").write_text(json.dumps({"content": "secret"}), encoding='utf-8')
+    project_dir = os.path.join(workspace, "Two")
+    link_from_library(workspace, project_dir, "One", [("characters", "Bob")])
+    links = read_library_links(project_dir)
+    # Claiming the content the project holds, so only the check stops the link
+    links[key] = {"library": library, "digest": file_digest(resource_file(workspace, "Two", "Ann"))}
+    with open(os.path.join(project_dir, LIBRARY_LINKS_NAME), 'w', encoding='utf-8') as f:
+        json.dump(links, f)
+    assert refresh_library_links(workspace, project_dir) == []
+    assert list(read_library_links(project_dir)) == ["characters/Bob"]
+    for root, _, files in os.walk(project_dir):
+        for file_name in files:
+            with open(os.path.join(root, file_name), 'rb') as f:
+                assert b"secret" not in f.read()
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from narrative_guru.bundles import BUNDLES_DIR_NAME, BundleCache, render_bundle
+from narrative_guru.storage import check_template, create_project, open_resource_store
+
+
+@pytest.fixture(params=[False, True], ids=["folder", "packed"])
+def store(request, tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir, packed=request.param)
+    store = open_resource_store(project_dir)
+    store.create("characters", "Ann", "A hero.", {"relations": {"clothing": ["Red Scarf"]}})
+    store.create("locations", "Inn", "Busy.")
+    store.create("clothing", "Red Scarf", "Warm.")
+    yield store
+    store.close()
+
+
+@pytest.fixture(params=["disk", "memory"])
+def cache(request, tmp_path):
+    return BundleCache(str(tmp_path / BUNDLES_DIR_NAME) if request.param == "disk" else None)
+
+
+TEMPLATE = check_template({"items": [["characters", "Ann"], ["locations", "Inn"], ["props", "Map"]]})
+
+
+def test_render_bundle(store):
+    bundle = render_bundle(store, TEMPLATE)
+    assert bundle["text"] == "--- Ann (Characters) ---\nA hero.\n\n--- Inn (Locations) ---\nBusy.\n\n"
+    assert bundle["members"] == [["characters", "Ann"], ["locations", "Inn"]]
+    assert bundle["tokens"] > 0
+    linked = render_bundle(store, check_template(dict(TEMPLATE, with_links=True, header_format="{name}:")))
+    assert linked["text"] == "Ann:\nA hero.\n\nRed Scarf:\nWarm.\n\nInn:\nBusy.\n\n"
+
+
+def test_unchanged_resources_hit_the_cache(store, cache):
+    bundle, hit = cache.render(store, "Cast", TEMPLATE)
+    assert not hit
+    assert cache.render(store, "Cast", TEMPLATE) == (bundle, True)
+
+
+@pytest.mark.parametrize("change", [
+    lambda store: store.write("characters", "Ann", "A tired hero."),
+    lambda store: store.delete("locations", "Inn"),
+    lambda store: store.create("props", "Map", "Of the valley."),
+    lambda store: store.rename("locations", "Inn", "Tavern"),
+], ids=["written", "deleted", "created", "renamed"])
+def test_changed_resources_render_again(store, cache, change):
+    cache.render(store, "Cast", TEMPLATE)
+    change(store)
+    bundle, hit = cache.render(store, "Cast", TEMPLATE)
+    assert not hit
+    assert bundle == render_bundle(store, TEMPLATE)
+    assert cache.render(store, "Cast", TEMPLATE) == (bundle, True)
+
+
+def test_linked_resources_are_watched(store, cache):
+    template = check_template(dict(TEMPLATE, with_links=True))
+    cache.render(store, "Cast", template)
+    store.write("clothing", "Red Scarf", "Warm and red.")
+    bundle, hit = cache.render(store, "Cast", template)
+    assert not hit and "Warm and red." in bundle["text"]
+    store.write_header("characters", "Ann", {"relations": {}})
+    bundle, hit = cache.render(store, "Cast", template)
+    assert not hit and "Red Scarf" not in bundle["text"]
+
+
+def test_changed_template_renders_again(store, cache):
+    cache.render(store, "Cast", TEMPLATE)
+    template = check_template(dict(TEMPLATE, header_format="{name}:"))
+    bundle, hit = cache.render(store, "Cast", template)
+    assert not hit and bundle["text"].startswith("Ann:\n")
+    cache.discard("Cast")
+    cache.discard("Cast")
+    assert not cache.render(store, "Cast", template)[1]
+
+
+def test_bundles_on_disk_outlive_the_cache(store, tmp_path):
+    directory = str(tmp_path / BUNDLES_DIR_NAME)
+    bundle, _ = BundleCache(directory).render(store, "Cast", TEMPLATE)
+    assert BundleCache(directory).render(store, "Cast", TEMPLATE) == (bundle, True)
+    for file_name in os.listdir(directory):
+        with open(os.path.join(directory, file_name), 'w', encoding='utf-8') as f:
+            f.write("{damaged")
+    assert BundleCache(directory).render(store, "Cast", TEMPLATE) == (bundle, False)
@@ -0,0 +1,85 @@
+import json
+import zipfile
+import warnings
+
+import pytest
+
+from narrative_guru.export import export_format_for, export_project, export_resources
+from narrative_guru.importer import import_resources
+from narrative_guru.schema import decode_resource
+from narrative_guru.storage import create_project, open_resource_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    store = open_resource_store(project_dir)
+    store.create("characters", "Ann", "A hero.", {"summary": "The hero", "tags": ["main"]})
+    store.create("characters", "Bob", "A smith.")
+    store.create("locations", "Inn", '{"rooms": 3}')
+    yield store
+    store.close()
+
+
+def test_format_follows_the_extension():
+    assert export_format_for("remix.MD") == "md"
+    assert export_format_for("remix.ndjson") == "jsonl"
+    assert export_format_for("remix.zip") == "zip"
+    assert export_format_for("remix.unknown") == "txt"
+
+
+def test_txt_and_jsonl(store, tmp_path):
+    items = [("characters", "Ann"), ("locations", "Inn")]
+    assert export_resources(store, items, str(tmp_path / "remix.txt")) == 2
+    assert (tmp_path / "remix.txt").read_text(encoding='utf-8') == (
+        "--- Ann (Characters) ---\nA hero.\n\n--- Inn (Locations) ---\n{\"rooms\": 3}\n\n")
+    export_resources(store, items, str(tmp_path / "remix.jsonl"))
+    lines = (tmp_path / "remix.jsonl").read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == [{"type": "characters", "name": "Ann", "content": "A hero."},
+                                                    {"type": "locations", "name": "Inn", "content": '{"rooms": 3}'}]
+
+
+def test_markdown_fences_json(store, tmp_path):
+    export_project(store, str(tmp_path / "story.md"))
+    text = (tmp_path / "story.md").read_text(encoding='utf-8')
+    assert text.startswith("# Characters\n\n## Ann\n\nA hero.\n\n## Bob\n\n")
+    assert "# Locations\n\n## Inn\n\n```json\n{\"rooms\": 3}\n```\n" in text
+
+
+def test_zip_keeps_header_fields_and_imports_again(store, tmp_path):
+    assert export_project(store, str(tmp_path / "story.zip")) == 3
+    with zipfile.ZipFile(tmp_path / "story.zip") as archive:
+        assert sorted(archive.namelist()) == ["characters/Ann.json", "characters/Bob.json", "locations/Inn.json"]
+        assert decode_resource(archive.read("characters/Ann.json").decode('utf-8')) == (
+            "A hero.", {"summary": "The hero", "tags": ["main"]})
+
+    create_project(str(tmp_path / "Copy"))
+    copy = open_resource_store(str(tmp_path / "Copy"))
+    try:
+        report = import_resources(copy, [str(tmp_path / "story.zip")])
+        assert not report.errors
+        assert copy.list_names("characters") == ["Ann", "Bob"]
+        assert copy.read("locations", "Inn") == '{"rooms": 3}'
+        assert copy.read_header("characters", "Ann")["tags"] == ["main"]
+    finally:
+        copy.close()
+
+
+def test_zip_holds_a_repeated_resource_once(store, tmp_path):
+    items = [("characters", "Ann"), ("characters", "Bob"), ("characters", "Ann")]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert export_resources(store, items, str(tmp_path / "remix.zip")) == 2
+    with zipfile.ZipFile(tmp_path / "remix.zip") as archive:
+        assert archive.namelist() == ["characters/Ann.json", "characters/Bob.json"]
+    # Text formats keep the remix as it is
+    assert export_resources(store, items, str(tmp_path / "remix.txt")) == 3
+
+
+def test_failed_export_leaves_no_file(store, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        export_resources(store, [("characters", "Ann"), ("characters", "Nobody")], str(tmp_path / "remix.txt"))
+    assert not (tmp_path / "remix.txt").exists()
+    with pytest.raises(ValueError):
+        export_resources(store, [("characters", "Ann")], str(tmp_path / "remix.txt"), "pdf")
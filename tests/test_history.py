@@ -0,0 +1,171 @@
+import random
+
+import pytest
+
+from narrative_guru import storage
+from narrative_guru.history import (
+    HISTORY_KEYFRAME_INTERVAL, ResourceHistory, apply_delta, diff_lines, make_delta,
+)
+from narrative_guru.storage import create_project, open_resource_store
+
+
+def edited(text, rng):
+    lines = text.splitlines(keepends=True)
+    for _ in range(rng.randint(1, 5)):
+        position = rng.randint(0, len(lines))
+        action = rng.choice(["insert", "delete", "replace"])
+        if action == "insert" or not lines:
+            lines.insert(position, f"line {rng.random()}\n")
+        elif action == "delete":
+            del lines[min(position, len(lines) - 1)]
+        else:
+            lines[min(position, len(lines) - 1)] = f"changed {rng.random()}\n"
+    return "".join(lines)
+
+
+@pytest.mark.parametrize("base, text", [
+    ("", ""),
+    ("", "new\ntext"),
+    ("old\ntext\n", ""),
+    ("one\ntwo\nthree\n", "one\n2\nthree\nfour"),
+    ("no line end", "no line end either"),
+    ("crlf\r\nlines\r\n", "crlf\r\nmore\r\nlines\r\n"),
+    ("unicode é\n☃\n", "unicode é\n\U0001f600\n"),
+])
+def test_delta_round_trip(base, text):
+    assert apply_delta(base, make_delta(base, text)) == text
+
+
+def test_delta_round_trip_random_edits():
+    rng = random.Random(7)
+    text = "".join(f"line {index}\n" for index in range(200))
+    for _ in range(50):
+        new_text = edited(text, rng)
+        assert apply_delta(text, make_delta(text, new_text)) == new_text
+        text = new_text
+
+
+def test_delta_of_small_edit_is_small():
+    base = "".join(f"a long line of lore number {index}\n" for index in range(5000))
+    text = base.replace("number 2500\n", "number 2500, edited\n")
+    assert len(make_delta(base, text)) < 200
+
+
+def test_diff_lines():
+    assert diff_lines("a\nb\n", "a\nc\n") == ["--- revision", "+++ current", "@@ -1,2 +1,2 @@", " a", "-b", "+c"]
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = ResourceHistory(str(tmp_path))
+    yield history
+    history.close()
+
+
+def test_history_reads_every_revision(history):
+    rng = random.Random(3)
+    contents = ["".join(f"line {index}\n" for index in range(50))]
+    for _ in range(HISTORY_KEYFRAME_INTERVAL * 2 + 3):
+        contents.append(edited(contents[-1], rng))
+    history.record("characters", "Ann", None, contents[0])
+    for old, new in zip(contents, contents[1:]):
+        history.record("characters", "Ann", old, new)
+    revisions = history.revisions("characters", "Ann")
+    assert [rev for rev, _, _ in revisions] == list(range(len(contents), 0, -1))
+    for rev, content in enumerate(contents, 1):
+        assert history.get("characters", "Ann", rev) == content
+
+
+def test_history_records_outside_edits(history):
+    history.record("characters", "Ann", None, "first")
+    history.record("characters", "Ann", "edited by hand", "second")
+    assert [history.get("characters", "Ann", rev) for rev in (1, 2, 3)] == ["first", "edited by hand", "second"]
+
+
+def test_history_follows_renames(history):
+    history.record("characters", "Ann", None, "first")
+    history.rename("characters", "Ann", "Anna")
+    assert history.revisions("characters", "Ann") == []
+    assert history.get("characters", "Anna", 1) == "first"
+    with pytest.raises(FileNotFoundError):
+        history.get("characters", "Anna", 2)
+
+
+def test_compact_keeps_newest_revisions(history):
+    contents = [f"revision {index}\n" * 20 for index in range(40)]
+    history.record("characters", "Ann", None, contents[0])
+    for old, new in zip(contents, contents[1:]):
+        history.record("characters", "Ann", old, new)
+    assert history.compact(max_revisions=10) == 30
+    assert [rev for rev, _, _ in history.revisions("characters", "Ann")] == list(range(40, 30, -1))
+    for rev in range(31, 41):
+        assert history.get("characters", "Ann", rev) == contents[rev - 1]
+
+
+def test_compact_bounds_the_size(history):
+    rng = random.Random(5)
+    latest = {}
+    for name in ("Ann", "Bob"):
+        content = "".join(f"{rng.random()}\n" for _ in range(2000))
+        history.record("characters", name, None, content)
+        for _ in range(5):
+            new_content = edited(content, rng)
+            history.record("characters", name, content, new_content)
+            content = new_content
+        latest[name] = content
+    history.compact(max_bytes=1)
+    for name, content in latest.items():
+        assert [rev for rev, _, _ in history.revisions("characters", name)] == [6]
+        assert history.get("characters", name, 6) == content
+
+
+def test_compact_counts_the_new_keyframe(history):
+    rng = random.Random(9)
+    contents = ["".join(f"{rng.random()}\n" for _ in range(2000))]
+    for _ in range(5):
+        contents.append(edited(contents[-1], rng))
+    history.record("characters", "Ann", None, contents[0])
+    for old, new in zip(contents, contents[1:]):
+        history.record("characters", "Ann", old, new)
+    keyframe = len(history._execute("SELECT data FROM revisions WHERE rev = 1")[0][0])
+    max_bytes = keyframe + (history.size() - keyframe) // 2
+    history.compact(max_bytes=max_bytes)
+    assert history.size() <= max_bytes
+    revisions = [rev for rev, _, _ in history.revisions("characters", "Ann")]
+    assert revisions[0] == 6 and 1 not in revisions
+    for rev in revisions:
+        assert history.get("characters", "Ann", rev) == contents[rev - 1]
+
+
+@pytest.mark.parametrize("packed", [False, True], ids=["folder", "packed"])
+def test_store_writes_are_recorded(tmp_path, packed):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir, packed)
+    store = open_resource_store(project_dir)
+    try:
+        store.create("characters", "Ann", "first")
+        store.write("characters", "Ann", "second")
+        store.write_many([("characters", "Ann", "third")])
+        assert [store.history.get("characters", "Ann", rev) for rev in (1, 2, 3)] == ["first", "second", "third"]
+    finally:
+        store.close()
+
+
+def test_failed_batch_leaves_no_revisions(tmp_path, monkeypatch):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    store = open_resource_store(project_dir)
+    try:
+        store.write_many([("characters", "Ann", "first")])
+        store.write_many([("characters", "Ann", "second")])
+
+        def fail(files):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(storage, "atomic_write_many", fail)
+        with pytest.raises(OSError):
+            store.write_many([("characters", "Ann", "third")])
+        assert len(store.history.revisions("characters", "Ann")) == 2
+        assert store.read("characters", "Ann") == "second"
+    finally:
+        store.close()
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from narrative_guru import importer
+from narrative_guru.importer import import_resources, normalize_type, parse_task, plan_import
+from narrative_guru.storage import create_project, open_resource_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    store = open_resource_store(project_dir)
+    store.create("characters", "Ann", "The hero we have.")
+    yield store
+    store.close()
+
+
+def write_json(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(value), encoding='utf-8')
+    return str(path)
+
+
+def test_normalize_type():
+    assert normalize_type(" Character ") == "characters"
+    assert normalize_type("outfit") == "clothing"
+    assert normalize_type("dragons") is None and normalize_type(5) is None
+
+
+def test_parse_task_shapes(tmp_path):
+    path = write_json(tmp_path / "characters" / "Bob.json", {"content": "A smith.", "summary": "Smith",
+                                                            "tags": "not a list"})
+    assert parse_task((path, path, None, "characters")) == ([("characters", "Bob", "A smith.",
+                                                              {"summary": "Smith"})], [])
+    # Any other object is an AI export kept whole, placed by its own type
+    value = {"name": "Inn", "type": "Location", "rooms": 3}
+    records, errors = parse_task(("line", None, json.dumps(value), None))
+    assert errors == [] and records == [("locations", "Inn", json.dumps(value, indent=4), {})]
+    assert parse_task(("bad", None, "{not json", None))[1][0][1].startswith("not valid JSON")
+    assert parse_task(("list", None, "[1]", None))[1] == [("list", "expected a JSON object")]
+
+
+def test_plan_import_policies(store):
+    records = [("characters", "Ann", "An imported hero.", {}), ("characters", "Bob", "A smith.", {"summary": "S"}),
+               (None, "Nobody", "No category.", {}), ("characters", "../x", "Bad name.", {})]
+    writes, report = plan_import(store, records, policy="skip")
+    assert writes == [("characters", "Bob", "A smith.", {"summary": "S"})]
+    assert report.skipped == [("characters", "Ann", "already exists")]
+    assert [source for source, _ in report.errors] == ["Nobody", "../x"]
+
+    writes, report = plan_import(store, records[:2] + [("characters", "Ann", "Another.", {})], policy="rename")
+    assert [write[1] for write in writes] == ["Ann (2)", "Bob", "Ann (3)"]
+    assert report.renamed == [("characters", "Ann", "Ann (2)"), ("characters", "Ann", "Ann (3)")]
+
+    writes, _ = plan_import(store, records[:1], policy="replace")
+    assert writes == [("characters", "Ann", "An imported hero.")]
+    with pytest.raises(ValueError):
+        plan_import(store, records, policy="merge")
+
+
+def test_import_sources(store, tmp_path):
+    folder = tmp_path / "export"
+    write_json(folder / "characters" / "Bob.json", {"content": "A smith.", "summary": "The smith"})
+    write_json(folder / "Props" / "Cup.json", {"description": "A cup."})
+    write_json(folder / "broken.json", {"content": "Needs a category."})
+    (folder / "notes.txt").write_text("ignored", encoding='utf-8')
+    lines = tmp_path / "more.jsonl"
+    lines.write_text('{"name": "Inn", "type": "locations", "content": "Warm."}\n\n{"name": "Ann", "content": "x"}\n',
+                     encoding='utf-8')
+    report = import_resources(store, [str(folder), str(lines), str(tmp_path / "missing.json")],
+                              default_type=None)
+    assert sorted((resource_type, name) for resource_type, name, _ in report.imported) == [
+        ("characters", "Bob"), ("locations", "Inn"), ("props", "Cup")]
+    assert len(report.errors) == 3  # no category (twice) and the missing file
+    assert store.read_header("characters", "Bob")["summary"] == "The smith"
+    assert json.loads(store.read("props", "Cup")) == {"description": "A cup."}
+    assert store.read("characters", "Ann") == "The hero we have."
+    assert report.summary().startswith("3 resource(s) imported.")
+
+
+def test_large_batches_are_parsed_in_processes(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, "PARALLEL_IMPORT_THRESHOLD", 4)
+    for index in range(10):
+        write_json(tmp_path / "export" / "props" / f"Item {index}.json", {"content": f"Item number {index}."})
+    report = import_resources(store, [str(tmp_path / "export")], workers=2)
+    assert not report.errors
+    assert len(store.list_names("props")) == 10
+    assert store.read("props", "Item 7") == "Item number 7."
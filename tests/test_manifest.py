@@ -0,0 +1,122 @@
+import os
+import json
+
+import pytest
+
+from narrative_guru import instrument
+from narrative_guru.manifest import MANIFEST_DB_NAME
+from narrative_guru.schema import encode_resource
+from narrative_guru.storage import RESOURCE_TYPES, create_project, open_resource_store
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    store = open_resource_store(project_dir)
+    for resource_type in RESOURCE_TYPES:
+        store.list_names(resource_type)
+    store.create("characters", "Ann", "A hero.", {"summary": "The hero"})
+    store.create("characters", "Bob", "A smith.")
+    store.create("locations", "Inn", "Warm.")
+    store.close()
+    return project_dir
+
+
+@pytest.fixture
+def profiling():
+    was_enabled = instrument.enabled
+    instrument.enable()
+    instrument.reset()
+    yield
+    instrument.enable(was_enabled)
+
+
+def counts():
+    return {row["name"]: row["count"] for row in instrument.snapshot()}
+
+
+def touch_later(path, seconds=5):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def test_reopened_project_needs_no_scan(project_dir, profiling):
+    store = open_resource_store(project_dir)
+    try:
+        assert store.list_names("characters") == ["Ann", "Bob"]
+        assert store.read_header("characters", "Ann")["summary"] == "The hero"
+        assert store.read_header("characters", "Bob")["excerpt"] == "A smith."
+        seen = counts()
+        assert "storage.listdir" not in seen
+        assert "storage.read_header" not in seen
+    finally:
+        store.close()
+
+
+def test_folder_changed_elsewhere_is_scanned_again(project_dir):
+    resource_dir = os.path.join(project_dir, "characters")
+    with open(os.path.join(resource_dir, "Carl.json"), 'w', encoding='utf-8') as f:
+        json.dump({"content": "added by hand"}, f)
+    os.remove(os.path.join(resource_dir, "Bob.json"))
+    touch_later(resource_dir)
+    store = open_resource_store(project_dir)
+    try:
+        assert store.list_names("characters") == ["Ann", "Carl"]
+        assert store.read_header("characters", "Carl")["excerpt"] == "added by hand"
+    finally:
+        store.close()
+
+
+def test_file_changed_elsewhere_is_read_again(project_dir):
+    path = os.path.join(project_dir, "characters", "Ann.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"summary": "Edited by hand", "content": "Changed."}, f)
+    touch_later(path)
+    store = open_resource_store(project_dir)
+    try:
+        header = store.read_header("characters", "Ann")
+        assert header["summary"] == "Edited by hand"
+        assert header["excerpt"] == "Changed."
+    finally:
+        store.close()
+
+
+def test_verify_and_rebuild(project_dir):
+    resource_dir = os.path.join(project_dir, "characters")
+    store = open_resource_store(project_dir)
+    try:
+        assert store.verify_manifest() == []
+        with open(os.path.join(resource_dir, "Carl.json"), 'w', encoding='utf-8') as f:
+            json.dump({"content": "added by hand"}, f)
+        os.remove(os.path.join(resource_dir, "Bob.json"))
+        path = os.path.join(resource_dir, "Ann.json")
+        stat = os.stat(path)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(encode_resource("A HERO.", {"summary": "The hero"}))  # the same size as before
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert store.verify_manifest() == [("differs", "characters", "Ann"), ("missing", "characters", "Bob"),
+                                           ("unlisted", "characters", "Carl")]
+        assert store.rebuild_manifest() == 3
+        assert store.verify_manifest() == []
+        assert store.read_header("characters", "Ann")["excerpt"] == "A HERO."
+    finally:
+        store.close()
+
+
+def test_damaged_manifest_is_built_again(project_dir):
+    with open(os.path.join(project_dir, MANIFEST_DB_NAME), 'wb') as f:
+        f.write(b"not a database" * 100)
+    store = open_resource_store(project_dir)
+    try:
+        assert store.list_names("characters") == ["Ann", "Bob"]
+        assert store.read_header("characters", "Ann")["summary"] == "The hero"
+    finally:
+        store.close()
+    store = open_resource_store(project_dir)
+    try:
+        for resource_type in RESOURCE_TYPES:
+            store.list_names(resource_type)
+        assert store.verify_manifest() == []
+    finally:
+        store.close()
@@ -0,0 +1,86 @@
+import pytest
+
+from narrative_guru.relations import (
+    RelationIndex, expand_links, relation_items, relations_from_items, rename_references,
+)
+from narrative_guru.storage import create_project, open_resource_store
+
+
+@pytest.fixture(params=[False, True], ids=["folder", "packed"])
+def store(request, tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir, packed=request.param)
+    store = open_resource_store(project_dir)
+    store.create("characters", "Ann", "A hero.", {"relations": {"clothing": ["Red Scarf"], "locations": ["Inn"]}})
+    store.create("characters", "Bob", "A smith.", {"relations": {"locations": ["Inn", "Forge"]}})
+    store.create("clothing", "Red Scarf", "Warm.")
+    store.create("locations", "Inn", "Busy.", {"relations": {"characters": ["Bob"]}})
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def index(store):
+    index = RelationIndex(store)
+    index.build()
+    return index
+
+
+def test_relation_items():
+    relations = {"locations": ["Inn", "Inn"], "characters": ["Ann"], "dragons": ["Smaug"]}
+    assert relation_items(relations) == [("characters", "Ann"), ("locations", "Inn")]
+    assert relations_from_items(relation_items(relations)) == {"characters": ["Ann"], "locations": ["Inn"]}
+
+
+def test_build(index):
+    assert len(index) == 3
+    assert index.links("characters", "Ann") == [("locations", "Inn"), ("clothing", "Red Scarf")]
+    assert index.backlinks("locations", "Inn") == [("characters", "Ann"), ("characters", "Bob")]
+    assert index.backlinks("characters", "Bob") == [("locations", "Inn")]
+    assert index.backlinks("locations", "Forge") == [("characters", "Bob")]
+    assert index.links("clothing", "Red Scarf") == [] and index.backlinks("characters", "Ann") == []
+
+
+def test_set_links_and_remove(index):
+    index.set_links("characters", "Ann", {"locations": ["Forge"]})
+    assert index.backlinks("clothing", "Red Scarf") == []
+    assert index.backlinks("locations", "Inn") == [("characters", "Bob")]
+    assert index.backlinks("locations", "Forge") == [("characters", "Ann"), ("characters", "Bob")]
+    index.remove("characters", "Bob")
+    assert index.backlinks("locations", "Forge") == [("characters", "Ann")]
+    assert index.links("characters", "Bob") == []
+    # Links to a removed resource stay until their sources change
+    assert index.backlinks("characters", "Bob") == [("locations", "Inn")]
+
+
+def test_rename_moves_links_both_ways(store, index):
+    sources = index.backlinks("locations", "Inn")
+    store.rename("locations", "Inn", "Tavern")
+    index.rename("locations", "Inn", "Tavern")
+    for source, relations in rename_references(store, sources, "locations", "Inn", "Tavern"):
+        index.set_links(*source, relations)
+
+    assert store.read_header("characters", "Bob")["relations"] == {"locations": ["Tavern", "Forge"]}
+    assert index.backlinks("locations", "Inn") == []
+    assert index.backlinks("locations", "Tavern") == [("characters", "Ann"), ("characters", "Bob")]
+    assert index.links("locations", "Tavern") == [("characters", "Bob")]
+    assert index.backlinks("characters", "Bob") == [("locations", "Tavern")]
+
+    # The same as an index built again from the headers
+    rebuilt = RelationIndex(store)
+    rebuilt.build()
+    for item in [("characters", "Ann"), ("characters", "Bob"), ("locations", "Tavern"), ("locations", "Forge")]:
+        assert index.links(*item) == rebuilt.links(*item)
+        assert index.backlinks(*item) == rebuilt.backlinks(*item)
+
+
+def test_rename_references_skips_resources_gone_meanwhile(store):
+    store.delete("characters", "Ann")
+    updated = rename_references(store, [("characters", "Ann"), ("characters", "Bob")], "locations", "Inn", "Tavern")
+    assert updated == [(("characters", "Bob"), {"locations": ["Tavern", "Forge"]})]
+
+
+def test_expand_links(store):
+    # Forge does not exist and is left out; every resource appears once
+    assert expand_links(store, [("characters", "Bob"), ("characters", "Ann")]) == [
+        ("characters", "Bob"), ("locations", "Inn"), ("characters", "Ann"), ("clothing", "Red Scarf")]
@@ -0,0 +1,159 @@
+import io
+import json
+import sqlite3
+import random
+
+import pytest
+
+from narrative_guru import schema
+from narrative_guru.schema import (
+    COMPRESS_MIN_CHARS, COMPRESSED_CONTENT_KEY, HEADER_EXCERPT_CHARS, _scan_header, compress_content,
+    decode_resource, encode_resource, read_header_fields, resource_header, stored_fields,
+)
+from narrative_guru.storage import PACKED_DB_NAME, create_project, open_resource_store, pack_project, unpack_project
+
+
+def long_text(chars, seed=1):
+    rng = random.Random(seed)
+    words = ["the", "old", "innkeeper", "sang", "loudly", "café", "☃", "\"quoted\"", "back\\slash"]
+    lines = []
+    size = 0
+    while size < chars:
+        line = " ".join(rng.choice(words) for _ in range(12))
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def test_scan_header_reads_fields_before_the_body():
+    text = encode_resource("A hero.", {"summary": "The hero", "tags": ["main", "brave"],
+                                       "relations": {"locations": ["Inn"]}, "custom": [1, {"x": None}]})
+    fields, excerpt = _scan_header(text, True)
+    assert fields == {"summary": "The hero", "tags": ["main", "brave"], "relations": {"locations": ["Inn"]},
+                      "custom": [1, {"x": None}]}
+    assert excerpt == "A hero."
+
+
+@pytest.mark.parametrize("text, fields, excerpt", [
+    ('{"content": "only a body"}', {}, "only a body"),
+    ('{}', {}, ""),
+    (' {\n "summary" : "s" ,\n "content" : "b" \n} ', {"summary": "s"}, "b"),
+    ('{"content": "body", "summary": "after the body"}', {}, "body"),
+    ('{"summary": "no body"}', {"summary": "no body"}, ""),
+    ('{"content": 5}', {}, ""),
+    ('{"content": "line\\nbreak \\"quoted\\" \\u2603"}', {}, 'line\nbreak "quoted" \u2603'),
+])
+def test_scan_header_shapes(text, fields, excerpt):
+    assert _scan_header(text, True) == (fields, excerpt)
+
+
+def test_scan_header_excerpt_is_cut_cleanly():
+    content = "\u2603\n" * HEADER_EXCERPT_CHARS
+    for length in range(len(encode_resource(content)) - 50, len(encode_resource(content))):
+        try:
+            _, excerpt = _scan_header(encode_resource(content)[:length], False)
+        except schema._Incomplete:
+            continue
+        assert content.startswith(excerpt)
+    assert _scan_header(encode_resource(content), True)[1] == content[:HEADER_EXCERPT_CHARS]
+
+
+@pytest.mark.parametrize("text", ['[1, 2]', '"text"', '{"summary": }', '{"summary": "s" "content": ""}', ''])
+def test_scan_header_rejects_other_json(text):
+    with pytest.raises(ValueError):
+        _scan_header(text, True)
+
+
+def test_read_header_fields_reads_on_when_the_header_is_long(monkeypatch):
+    monkeypatch.setattr(schema, "HEADER_READ_CHARS", 16)
+    fields = {"summary": "s" * 1000, "tags": [f"tag {index}" for index in range(100)]}
+    content = "body " * 10000
+    f = io.StringIO(encode_resource(content, fields))
+    assert read_header_fields(f) == (fields, content[:HEADER_EXCERPT_CHARS])
+    # Stopped soon after the start of the body
+    assert f.tell() < len(encode_resource(content, fields)) / 2
+
+
+def test_resource_header_defaults():
+    header = resource_header({"summary": 5, "tags": ["a"], "custom": "kept"}, "start")
+    assert header == {"summary": "", "tags": ["a"], "relations": {}, "attachments": [], "custom": "kept",
+                      "excerpt": "start"}
+    assert stored_fields(header) == {"tags": ["a"], "custom": "kept"}
+
+
+def test_short_bodies_are_stored_as_text():
+    text = encode_resource("A hero.", {"summary": "The hero"})
+    assert json.loads(text) == {"summary": "The hero", "content": "A hero."}
+    assert decode_resource(text) == ("A hero.", {"summary": "The hero"})
+
+
+def test_long_bodies_are_compressed():
+    content = long_text(COMPRESS_MIN_CHARS * 2)
+    text = encode_resource(content, {"tags": ["draft"]})
+    data = json.loads(text)
+    assert "content" not in data and COMPRESSED_CONTENT_KEY in data
+    assert len(text) < len(content) / 3
+    assert decode_resource(text) == (content, {"tags": ["draft"]})
+    # Equal bodies give equal files
+    assert encode_resource(content, {"tags": ["draft"]}) == text
+
+
+def test_incompressible_bodies_stay_text():
+    rng = random.Random(2)
+    content = "".join(chr(rng.randint(0x4e00, 0x9fff)) for _ in range(COMPRESS_MIN_CHARS))
+    assert compress_content(content) is None
+    assert json.loads(encode_resource(content))["content"] == content
+
+
+def test_damaged_compressed_body_is_reported():
+    text = json.dumps({COMPRESSED_CONTENT_KEY: "bm90IGd6aXA="})
+    with pytest.raises(ValueError):
+        decode_resource(text)
+
+
+def test_header_of_compressed_body():
+    content = long_text(COMPRESS_MIN_CHARS * 2)
+    fields, excerpt = read_header_fields(io.StringIO(encode_resource(content, {"summary": "Long"})))
+    assert fields == {"summary": "Long"}
+    assert excerpt == content[:HEADER_EXCERPT_CHARS]
+
+
+@pytest.mark.parametrize("packed", [False, True], ids=["folder", "packed"])
+def test_stores_keep_long_bodies_compressed(tmp_path, packed):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir, packed)
+    content = long_text(COMPRESS_MIN_CHARS * 2)
+    store = open_resource_store(project_dir)
+    try:
+        store.create("characters", "Draft", content, {"summary": "Chapter one"})
+        store.write_many([("characters", "Copy", content)])
+        for name in ("Draft", "Copy"):
+            assert store.read("characters", name) == content
+            assert store.read_header("characters", name)["excerpt"] == content[:HEADER_EXCERPT_CHARS]
+        store.write("characters", "Draft", content + "\nThe end.")
+        assert store.read("characters", "Draft") == content + "\nThe end."
+        assert store.history.get("characters", "Draft", 1) == content
+    finally:
+        store.close()
+    if packed:
+        with sqlite3.connect(str(tmp_path / "Story" / PACKED_DB_NAME)) as conn:
+            assert {kind for kind, in conn.execute("SELECT typeof(content) FROM resources")} == {"blob"}
+    else:
+        assert (tmp_path / "Story" / "characters" / "Copy.json").stat().st_size < len(content) / 3
+
+
+def test_pack_and_unpack_keep_compressed_bodies(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    content = long_text(COMPRESS_MIN_CHARS * 2)
+    store = open_resource_store(project_dir)
+    store.create("props", "Map", content, {"summary": "The map"})
+    store.close()
+    for convert in (pack_project, unpack_project):
+        convert(project_dir)
+        store = open_resource_store(project_dir)
+        try:
+            assert store.read("props", "Map") == content
+            assert store.read_header("props", "Map")["summary"] == "The map"
+        finally:
+            store.close()
@@ -0,0 +1,70 @@
+import pytest
+
+from narrative_guru.search import SearchIndex
+from narrative_guru.storage import create_project, open_resource_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    store = open_resource_store(project_dir)
+    store.create("characters", "Ann", "A hero with a silver sword.")
+    store.create("characters", "Bob", "A smith. He forges a sword, then another sword, then a third sword.")
+    store.create("characters", "Carl", "A thief who stole the silver crown from the old king.")
+    store.create("props", "Silver Sword", "Forged long ago.")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def index(store):
+    index = SearchIndex(store)
+    index.build()
+    return index
+
+
+def names(results):
+    return [(resource_type, name) for _, resource_type, name in results]
+
+
+def test_ranking(index):
+    assert len(index) == 4
+    results = index.search("silver sword")
+    # Only resources with every word match; a word in the name counts more than one in the body
+    assert names(results) == [("props", "Silver Sword"), ("characters", "Ann")]
+    assert results[0][0] > results[1][0]
+    # More occurrences rank higher
+    assert names(index.search("sword"))[1:] == [("characters", "Bob"), ("characters", "Ann")]
+    assert index.search("SWORD", limit=1) == index.search("sword")[:1]
+    assert index.search("dragon") == [] and index.search("") == []
+
+
+def test_phrases(index):
+    assert names(index.search('"silver crown"')) == [("characters", "Carl")]
+    assert names(index.search('"silver sword" hero')) == [("characters", "Ann")]
+    assert index.search('"sword silver"') == []
+
+
+def test_incremental_updates(store, index):
+    store.write("characters", "Ann", "A hero with a golden shield.")
+    index.add("characters", "Ann", "A hero with a golden shield.")
+    assert names(index.search("silver sword")) == [("props", "Silver Sword")]
+    assert names(index.search("shield")) == [("characters", "Ann")]
+
+    store.rename("characters", "Bob", "Dora")
+    index.rename("characters", "Bob", "Dora")
+    assert index.search("bob") == []
+    assert names(index.search("dora forges")) == [("characters", "Dora")]
+
+    store.delete("characters", "Carl")
+    index.remove("characters", "Carl")
+    index.remove("characters", "Carl")
+    assert index.search("crown") == []
+    assert len(index) == 3
+
+    # The same results as an index built from scratch
+    rebuilt = SearchIndex(store)
+    rebuilt.build()
+    for query in ("sword", "hero", "a", "dora", "forged long"):
+        assert index.search(query) == pytest.approx(rebuilt.search(query))
@@ -0,0 +1,160 @@
+import os
+import json
+import threading
+import http.client
+
+import pytest
+
+from narrative_guru.client import RemoteWorkspace
+from narrative_guru.server import WorkspaceServer
+from narrative_guru.storage import ConflictError, content_version, create_project, open_resource_store
+
+
+@pytest.fixture(params=[False, True], ids=["folder", "packed"])
+def server(request, tmp_path):
+    root = tmp_path / "workspace"
+    create_project(str(root / "Story"), packed=request.param)
+    # Files next to the workspace that no request may reach
+    (tmp_path / "outside.json").write_text(json.dumps({"content": "secret"}), encoding='utf-8')
+    server = WorkspaceServer(str(root), ("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def remote(server):
+    workspace = RemoteWorkspace(f"http://127.0.0.1:{server.server_address[1]}")
+    yield workspace.open_store("Story")
+    workspace.close()
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        data = None if body is None else json.dumps(body).encode('utf-8')
+        connection.request(method, path, data, headers or {})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+TRAVERSAL = "..%2F..%2F..%2Foutside"
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("GET", f"/projects/Story/resources/characters/{TRAVERSAL}", None),
+    ("PUT", f"/projects/Story/resources/characters/{TRAVERSAL}", {"content": "pwned"}),
+    ("DELETE", f"/projects/Story/resources/characters/{TRAVERSAL}", None),
+    ("GET", f"/projects/Story/history/characters/{TRAVERSAL}", None),
+    ("GET", f"/projects/Story/history/characters/{TRAVERSAL}/1", None),
+    ("POST", "/projects/Story/read", {"items": [["characters", "../../../outside"]]}),
+    ("POST", "/projects/Story/headers", {"items": [["characters", "../../../outside"]]}),
+    ("POST", "/projects/Story/signatures", {"items": [["characters", "../../../outside"]]}),
+    ("POST", "/projects/Story/signatures", {"items": [["..", "outside"]]}),
+    ("POST", "/projects/Story/write", {"items": [["characters", "../../../pwned", "pwned"]]}),
+    ("POST", "/projects/Story/write_header", {"type": "characters", "name": "../../../outside", "fields": {}}),
+    ("POST", "/projects/Story/rename", {"type": "characters", "name": "Ann", "new_name": "../../../pwned"}),
+])
+def test_names_leading_outside_are_refused(server, tmp_path, method, path, body):
+    status, data = request(server, method, path, body)
+    assert status == 400
+    assert b"secret" not in data
+    assert (tmp_path / "outside.json").read_text(encoding='utf-8') == json.dumps({"content": "secret"})
+    assert not (tmp_path / "pwned.json").exists()
+
+
+def test_store_refuses_names_leading_outside(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    (tmp_path / "outside.json").write_text(json.dumps({"content": "secret"}), encoding='utf-8')
+    store = open_resource_store(project_dir)
+    try:
+        for call in (lambda: store.read("characters", "../../outside"),
+                     lambda: store.read("..", "outside"),
+                     lambda: store.read_header("characters", "../../outside"),
+                     lambda: store.write("characters", "../../outside", "pwned"),
+                     lambda: store.delete("characters", "../../outside")):
+            with pytest.raises(OSError):
+                call()
+        assert store.signatures([("characters", "../../outside")]) == [None]
+        assert not store.exists("characters", "../../outside")
+        assert os.path.exists(tmp_path / "outside.json")
+    finally:
+        store.close()
+
+
+def test_round_trip(remote):
+    remote.create("characters", "Ann", "A hero.", {"summary": "The hero"})
+    assert remote.list_names("characters") == ["Ann"]
+    assert remote.read("characters", "Ann") == "A hero."
+    assert remote.read_header("characters", "Ann")["summary"] == "The hero"
+    remote.write("characters", "Ann", "A tired hero.")
+    assert remote.read("characters", "Ann") == "A tired hero."
+    remote.delete("characters", "Ann")
+    with pytest.raises(FileNotFoundError):
+        remote.read("characters", "Ann")
+
+
+def test_creating_an_existing_resource_conflicts(remote):
+    remote.create("characters", "Ann", "first")
+    with pytest.raises(FileExistsError):
+        remote.create("characters", "Ann", "second")
+    assert remote.read("characters", "Ann") == "first"
+
+
+def test_concurrent_creates_let_one_through(server):
+    results = []
+
+    def create(index):
+        status, _ = request(server, "PUT", "/projects/Story/resources/characters/Ann", {"content": f"writer {index}"},
+                            {"If-None-Match": "*"})
+        results.append((status, index))
+
+    threads = [threading.Thread(target=create, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    winners = [index for status, index in results if status == 200]
+    assert len(winners) == 1
+    assert sorted(status for status, _ in results) == [200] + [409] * 7
+    status, data = request(server, "GET", "/projects/Story/resources/characters/Ann")
+    assert json.loads(data)["content"] == f"writer {winners[0]}"
+
+
+def test_renaming_onto_an_existing_resource_conflicts(server, remote):
+    remote.create("characters", "Ann", "first")
+    remote.write("characters", "Ann", "Ann text")
+    remote.create("characters", "Bob", "Bob text")
+    status, _ = request(server, "POST", "/projects/Story/rename",
+                        {"type": "characters", "name": "Bob", "new_name": "Ann"})
+    assert status == 409
+    with pytest.raises(FileExistsError):
+        remote.rename("characters", "Bob", "Ann")
+    assert remote.list_names("characters") == ["Ann", "Bob"]
+    assert remote.read("characters", "Ann") == "Ann text"
+    assert remote.read("characters", "Bob") == "Bob text"
+    assert len(remote.history.revisions("characters", "Ann")) == 2
+
+
+def test_stale_update_is_refused(remote):
+    remote.create("characters", "Ann", "first")
+    version = content_version("first")
+    remote.write("characters", "Ann", "second", expected_version=version)
+    with pytest.raises(ConflictError):
+        remote.write("characters", "Ann", "third", expected_version=version)
+    assert remote.read("characters", "Ann") == "second"
+
+
+def test_etag_answers_not_modified(server, remote):
+    remote.create("characters", "Ann", "first")
+    path = "/projects/Story/resources/characters/Ann"
+    status, _ = request(server, "GET", path, headers={"If-None-Match": f'"{content_version("first")}"'})
+    assert status == 304
+    status, _ = request(server, "GET", path, headers={"If-None-Match": '"stale"'})
+    assert status == 200
@@ -0,0 +1,227 @@
+import os
+import json
+import threading
+
+import pytest
+
+from narrative_guru.storage import (
+    RESOURCE_TYPES, ConflictError, PackedResourceStore, ResourceStore, content_version, create_project,
+    is_packed_project, open_resource_store, pack_project, recover_project, temp_path_for, unpack_project,
+)
+
+
+@pytest.fixture(params=[False, True], ids=["folder", "packed"])
+def store(request, tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir, packed=request.param)
+    store = open_resource_store(project_dir)
+    yield store
+    store.close()
+
+
+def test_layout_decides_the_store(tmp_path):
+    create_project(str(tmp_path / "Folder"))
+    create_project(str(tmp_path / "Packed"), packed=True)
+    assert not is_packed_project(str(tmp_path / "Folder"))
+    assert is_packed_project(str(tmp_path / "Packed"))
+    for name, store_class in (("Folder", ResourceStore), ("Packed", PackedResourceStore)):
+        store = open_resource_store(str(tmp_path / name))
+        try:
+            assert isinstance(store, store_class)
+        finally:
+            store.close()
+
+
+def test_round_trip(store):
+    for resource_type in RESOURCE_TYPES:
+        assert store.list_names(resource_type) == []
+    store.create("characters", "Bob", "A smith.")
+    store.create("characters", "Ann", "A hero.\nWith two lines, \"quotes\" and ünïcode ☃.")
+    store.create("props", "Sword", "")
+    assert store.list_names("characters") == ["Ann", "Bob"]
+    assert store.list_names("props") == ["Sword"]
+    assert store.read("characters", "Ann") == "A hero.\nWith two lines, \"quotes\" and ünïcode ☃."
+    assert store.read("props", "Sword") == ""
+    assert store.exists("characters", "Bob")
+    assert not store.exists("characters", "Carl")
+    assert store.read_many([("characters", "Bob"), ("characters", "Carl")]) == ["A smith.", None]
+
+
+def test_write_rename_delete(store):
+    store.create("characters", "Ann", "first")
+    store.write("characters", "Ann", "second")
+    assert store.read("characters", "Ann") == "second"
+    store.rename("characters", "Ann", "Anna")
+    assert store.list_names("characters") == ["Anna"]
+    assert store.read("characters", "Anna") == "second"
+    with pytest.raises(FileNotFoundError):
+        store.read("characters", "Ann")
+    store.delete("characters", "Anna")
+    assert store.list_names("characters") == []
+    with pytest.raises(FileNotFoundError):
+        store.delete("characters", "Anna")
+
+
+def test_rename_refuses_an_existing_name(store):
+    store.create("characters", "Ann", "first")
+    store.write("characters", "Ann", "Ann text")
+    store.create("characters", "Bob", "Bob text")
+    with pytest.raises(FileExistsError):
+        store.rename("characters", "Bob", "Ann")
+    assert store.list_names("characters") == ["Ann", "Bob"]
+    assert store.read("characters", "Ann") == "Ann text"
+    assert store.read("characters", "Bob") == "Bob text"
+    assert [store.history.get("characters", "Ann", rev) for rev in (1, 2)] == ["first", "Ann text"]
+
+
+def test_create_refuses_existing_and_invalid_names(store):
+    store.create("characters", "Ann", "first")
+    with pytest.raises(FileExistsError):
+        store.create("characters", "Ann", "second")
+    assert store.read("characters", "Ann") == "first"
+    for name in ("", ".", "..", "a/b", "a\0b"):
+        with pytest.raises(OSError):
+            store.create("characters", name, "text")
+
+
+def test_expected_version(store):
+    store.create("characters", "Ann", "first")
+    store.write("characters", "Ann", "second", expected_version=content_version("first"))
+    with pytest.raises(ConflictError):
+        store.write("characters", "Ann", "third", expected_version=content_version("first"))
+    with pytest.raises(FileNotFoundError):
+        store.write("characters", "Carl", "text", expected_version=content_version("first"))
+    assert store.read("characters", "Ann") == "second"
+
+
+def test_header_fields(store):
+    store.create("characters", "Ann", "A hero.", {"summary": "The hero", "tags": ["main"]})
+    header = store.read_header("characters", "Ann")
+    assert header == {"summary": "The hero", "tags": ["main"], "relations": {}, "attachments": [],
+                      "excerpt": "A hero."}
+    store.write("characters", "Ann", "A tired hero.")
+    store.write_header("characters", "Ann", {"relations": {"locations": ["Inn"]}})
+    header = store.read_header("characters", "Ann")
+    assert header["summary"] == "The hero"
+    assert header["relations"] == {"locations": ["Inn"]}
+    assert header["excerpt"] == "A tired hero."
+    assert store.read_headers([("characters", "Ann"), ("characters", "Carl")])[1] is None
+    with pytest.raises(ValueError):
+        store.write_header("characters", "Ann", {"tags": "main"})
+
+
+def test_write_many(store):
+    store.create("characters", "Ann", "first", {"summary": "kept"})
+    store.write_many([("characters", "Ann", "second"), ("characters", "Bob", "new"),
+                      ("props", "Cup", "with fields", {"tags": ["kitchen"]})])
+    assert store.read("characters", "Ann") == "second"
+    assert store.read_header("characters", "Ann")["summary"] == "kept"
+    assert store.list_names("characters") == ["Ann", "Bob"]
+    assert store.read_header("props", "Cup")["tags"] == ["kitchen"]
+
+
+def test_batch_waits_for_a_conditional_write(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    store = open_resource_store(project_dir)
+    write_file = store._write_file
+    batch = threading.Thread(target=store.write_many, args=([("characters", "Ann", "batch")],))
+
+    def write_file_meanwhile(*args):
+        # A batch arriving between the version check and the write must not slip in
+        if not batch.is_alive() and args[2] == "conditional":
+            batch.start()
+            batch.join(0.2)
+            assert batch.is_alive()
+        write_file(*args)
+
+    try:
+        store.create("characters", "Ann", "first")
+        store._write_file = write_file_meanwhile
+        store.write("characters", "Ann", "conditional", expected_version=content_version("first"))
+        batch.join()
+        assert store.read("characters", "Ann") == "batch"
+        assert [store.history.get("characters", "Ann", rev) for rev in (1, 2, 3)] == ["first", "conditional", "batch"]
+    finally:
+        store.close()
+
+
+def test_signatures_follow_changes(store):
+    store.create("characters", "Ann", "first")
+    before = store.signatures([("characters", "Ann"), ("characters", "Carl")])
+    assert before[1] is None
+    assert store.signatures([("characters", "Ann")]) == before[:1]
+    store.write("characters", "Ann", "second, longer")
+    assert store.signatures([("characters", "Ann")]) != before[:1]
+
+
+def test_folder_store_sees_outside_edits(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    store = open_resource_store(project_dir)
+    try:
+        store.create("characters", "Ann", "first")
+        assert store.read("characters", "Ann") == "first"
+        path = store.resource_path("characters", "Ann")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"summary": "by hand", "content": "edited elsewhere"}, f)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert store.read("characters", "Ann") == "edited elsewhere"
+        assert store.read_header("characters", "Ann")["summary"] == "by hand"
+
+        with open(os.path.join(project_dir, "characters", "Bob.json"), 'w', encoding='utf-8') as f:
+            json.dump({"content": "added elsewhere"}, f)
+        os.utime(os.path.join(project_dir, "characters"), ns=(0, stat.st_mtime_ns + 2_000_000_000))
+        assert store.list_names("characters") == ["Ann", "Bob"]
+    finally:
+        store.close()
+
+
+def test_pack_and_unpack(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    store = open_resource_store(project_dir)
+    store.create("characters", "Ann", "A hero.", {"summary": "The hero", "custom": {"kept": True}})
+    store.create("locations", "Inn", "Warm.")
+    store.close()
+
+    pack_project(project_dir)
+    assert is_packed_project(project_dir)
+    assert not os.path.exists(os.path.join(project_dir, "characters"))
+    store = open_resource_store(project_dir)
+    try:
+        assert store.read("characters", "Ann") == "A hero."
+        assert store.read_header("characters", "Ann")["custom"] == {"kept": True}
+        assert store.list_names("locations") == ["Inn"]
+    finally:
+        store.close()
+
+    unpack_project(project_dir)
+    assert not is_packed_project(project_dir)
+    with open(os.path.join(project_dir, "characters", "Ann.json"), encoding='utf-8') as f:
+        assert json.load(f) == {"summary": "The hero", "custom": {"kept": True}, "content": "A hero."}
+
+
+def test_recover_interrupted_writes(tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    resource_dir = os.path.join(project_dir, "characters")
+    saved = os.path.join(resource_dir, "Ann.json")
+    with open(saved, 'w', encoding='utf-8') as f:
+        json.dump({"content": "old"}, f)
+    with open(temp_path_for(saved), 'w', encoding='utf-8') as f:
+        json.dump({"content": "new"}, f)
+    half_written = os.path.join(resource_dir, "Bob.json")
+    with open(half_written, 'w', encoding='utf-8') as f:
+        f.write('{"content": "cut sho')
+
+    repairs = dict(recover_project(project_dir))
+    assert repairs[saved] == "restored the last save"
+    assert repairs[half_written].startswith("damaged")
+    store = open_resource_store(project_dir)
+    try:
+        assert store.list_names("characters") == ["Ann"]
+        assert store.read("characters", "Ann") == "new"
+    finally:
+        store.close()
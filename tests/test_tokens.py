@@ -0,0 +1,65 @@
+import pytest
+
+from narrative_guru.remix import format_remix_block
+from narrative_guru.tokens import TRUNCATION_NOTE, count_tokens, fit_to_budget, truncate_tokens
+
+
+def remix_text(blocks):
+    return "".join(format_remix_block(name, resource_type, content) for resource_type, name, content in blocks)
+
+
+def prose(words, paragraph=50):
+    paragraphs = []
+    for start in range(0, words, paragraph):
+        paragraphs.append(" ".join(f"word{index}." if index % 10 == 9 else f"word{index}"
+                                   for index in range(start, min(start + paragraph, words))))
+    return "\n\n".join(paragraphs)
+
+
+def test_count_tokens():
+    assert count_tokens("") == 0
+    assert count_tokens("a short line") == 3
+    assert count_tokens("x" * 13) == 3
+    assert count_tokens("one\n    two") == 3
+
+
+@pytest.mark.parametrize("budget", [-3, 0])
+def test_truncate_tokens_without_budget(budget):
+    assert truncate_tokens("hello world " * 50, budget) == ""
+
+
+@pytest.mark.parametrize("budget", [1, 2, 5, 17])
+def test_truncate_tokens_fits(budget):
+    for text in ["hello world " * 50, "x" * 200, "{\n    \"key\": [1, 2, 3]\n}" * 10]:
+        result = truncate_tokens(text, budget)
+        assert count_tokens(result) <= budget
+        assert text.startswith(result)
+
+
+def test_fit_to_budget_keeps_what_fits():
+    blocks = [("characters", "Ann", "A short description."), ("locations", "Inn", "Warm and loud.")]
+    fitted, dropped = fit_to_budget(blocks, 1000)
+    assert fitted == blocks
+    assert dropped == 0
+
+
+@pytest.mark.parametrize("budget", [0, 5, 12, 30, 150, 400, 2000])
+@pytest.mark.parametrize("count", [1, 3, 10])
+def test_fit_to_budget_stays_within_small_budgets(budget, count):
+    blocks = [("characters", f"Character {index}", prose(2000)) for index in range(count)]
+    fitted, dropped = fit_to_budget(blocks, budget)
+    assert count_tokens(remix_text(fitted)) <= budget
+    assert len(fitted) + dropped == count
+
+
+def test_fit_to_budget_marks_shortened_resources():
+    fitted, _ = fit_to_budget([("characters", "Ann", prose(2000))], 400)
+    assert fitted[0][2].startswith("word0 ")
+    assert fitted[0][2].endswith(TRUNCATION_NOTE)
+
+
+def test_fit_to_budget_drops_resources_whose_header_does_not_fit():
+    blocks = [("characters", f"Character {index}", "text") for index in range(5)]
+    fitted, dropped = fit_to_budget(blocks, 20)
+    assert dropped > 0
+    assert [name for _, name, _ in fitted] == [f"Character {index}" for index in range(len(fitted))]
@@ -0,0 +1,111 @@
+import os
+import time
+
+import pytest
+
+from narrative_guru.storage import create_project, open_resource_store
+from narrative_guru.watcher import ProjectWatcher, WatchEvent
+
+
+@pytest.fixture(params=[False, True], ids=["polling", "inotify"])
+def watcher(request, tmp_path):
+    watcher = ProjectWatcher(str(tmp_path), debounce=0.1, poll_interval=0.05, use_inotify=request.param)
+    watcher.start()
+    yield watcher
+    watcher.stop()
+
+
+def watch(watcher, project_dir, timeout=5):
+    """Switches the watcher to a project and waits until it has taken stock of it."""
+    watcher.watch_project(project_dir)
+    deadline = time.monotonic() + timeout
+    while watcher._project != project_dir:
+        assert time.monotonic() < deadline, "the watcher did not switch projects"
+        time.sleep(0.01)
+    watcher.drain()
+
+
+def events_until(watcher, expected, timeout=5):
+    """Collects events until all the expected ones arrived (or the timeout), then a little longer for strays."""
+    events = []
+    deadline = time.monotonic() + timeout
+    while not set(expected) <= set(events) and time.monotonic() < deadline:
+        time.sleep(0.05)
+        events.extend(watcher.drain())
+    time.sleep(0.3)
+    events.extend(watcher.drain())
+    return events
+
+
+def test_polling_is_used_when_asked(tmp_path):
+    watcher = ProjectWatcher(str(tmp_path), use_inotify=False)
+    watcher.start()
+    try:
+        assert watcher.backend == "polling"
+    finally:
+        watcher.stop()
+
+
+def test_folder_project_changes(watcher, tmp_path):
+    project_dir = str(tmp_path / "Story")
+    create_project(project_dir)
+    store = open_resource_store(project_dir)
+    try:
+        store.create("characters", "Ann", "first")
+        store.create("props", "Cup", "a cup")
+        watch(watcher, project_dir)
+
+        store.create("characters", "Bob", "new")
+        for text in ("second", "third", "fourth"):
+            store.write("characters", "Ann", text)
+        store.rename("props", "Cup", "Mug")
+        with open(os.path.join(project_dir, "locations", ".scratch.json.tmp"), 'w', encoding='utf-8') as f:
+            f.write("hidden")
+        expected = [WatchEvent("added", project_dir, "characters", "Bob", None),
+                    WatchEvent("modified", project_dir, "characters", "Ann", None),
+                    WatchEvent("renamed", project_dir, "props", "Cup", "Mug")]
+        events = events_until(watcher, expected)
+        # Each resource is reported once, however often it changed; hidden files not at all
+        assert sorted(event for event in events if event.kind != "projects") == sorted(expected)
+
+        store.delete("characters", "Bob")
+        expected = [WatchEvent("removed", project_dir, "characters", "Bob", None)]
+        assert [event for event in events_until(watcher, expected) if event.kind != "projects"] == expected
+    finally:
+        store.close()
+
+
+def test_packed_project_changes(watcher, tmp_path):
+    project_dir = str(tmp_path / "Packed")
+    create_project(project_dir, packed=True)
+    store = open_resource_store(project_dir)
+    try:
+        store.create("characters", "Ann", "first")
+        watch(watcher, project_dir)
+        store.create("props", "Hat", "a hat")
+        store.delete("characters", "Ann")
+        expected = [WatchEvent("changed", project_dir, None, None, None),
+                    WatchEvent("added", project_dir, "props", "Hat", None),
+                    WatchEvent("removed", project_dir, "characters", "Ann", None)]
+        events = events_until(watcher, expected)
+        assert set(expected) <= set(events)
+    finally:
+        store.close()
+
+
+def test_projects_coming_and_going(watcher, tmp_path):
+    watch(watcher, None)
+    create_project(str(tmp_path / "New"))
+    expected = [WatchEvent("projects", None, None, None, None)]
+    assert events_until(watcher, expected) == expected
+    os.rename(str(tmp_path / "New"), str(tmp_path / "Renamed"))
+    assert events_until(watcher, expected) == expected
+
+
+def test_stopped_watcher_reports_nothing(tmp_path):
+    watcher = ProjectWatcher(str(tmp_path), debounce=0.05, poll_interval=0.05, use_inotify=False)
+    watcher.start()
+    watcher.stop()
+    create_project(str(tmp_path / "New"))
+    time.sleep(0.2)
+    assert watcher.drain() == []